@@ -0,0 +1 @@
+"""Importable building blocks for the AI Data Analyst Demo"""
@@ -0,0 +1,280 @@
+"""Headless HTTP API over the NL-to-SQL pipeline
+
+Run it with:
+
+    uvicorn data_chat.api:create_app --factory --port 8000
+
+Endpoints:
+
+- POST /datasets                       register a CSV ({"path": ...} inside the data directory, or
+                                       {"csv": "<text>"})
+- GET /datasets/{dataset_id}           row/column counts and schema of a registered dataset
+- DELETE /datasets/{dataset_id}        forget a dataset and close its query engine
+- POST /datasets/{dataset_id}/ask      answer {"question": ...}
+- POST /datasets/{dataset_id}/favorites/{favorite_id}/run
+                                       replay a saved favorite from the favorites file
+
+Common data-quality questions ("How many null values are in each column?")
+are answered straight from the data without a model call (see intents);
+the answer's "intent" names the catalog entry that was used.
+
+Handlers are async and never block the event loop: model calls (generation
+and repair) run on a thread pool sized to the gateway's concurrency, and
+CSV loading, favorites file reads and SQL execution on a separate worker
+pool, so slow queries cannot starve generation and the other way round.
+Request bodies are Pydantic models, so malformed ones get a 422 and the
+OpenAPI schema describes them. Registered paths must lie inside
+API_DATA_DIR (default "data"), so clients cannot make the server read
+arbitrary files. Each dataset's SQL runs in its own worker process with
+a timeout, row limit and memory cap (see query_worker) unless
+QUERY_WORKER_PROCESS=false.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from data_chat.dataset_cache import load_csv_cached
+from data_chat.llm_cache import ResponseCache
+from data_chat.llm_gateway import LLMGateway, LLMGatewayError
+from data_chat.optimize import optimize_dtypes
+from data_chat.pipeline import Pipeline, format_result
+from data_chat.prompt_builder import DEFAULT_TOKEN_BUDGET
+from data_chat.query_worker import QueryAbortedError
+
+try:
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+except ImportError as e:
+    raise ImportError("The HTTP API requires the 'fastapi' package (pip install fastapi uvicorn)") from e
+
+FAVORITES_FILE = "data/favorites.json"
+DATA_DIR = "data"
+DEFAULT_SQL_WORKERS = 4
+DEFAULT_LLM_WORKERS = 8
+
+
+class DatasetRequest(BaseModel):
+    """Body of POST /datasets: a CSV file inside the data directory, or the CSV text itself"""
+
+    path: Optional[str] = None
+    csv: Optional[str] = None
+
+
+class AskRequest(BaseModel):
+    """Body of POST /datasets/{dataset_id}/ask"""
+
+    question: str
+
+
+def result_payload(result):
+    """JSON-ready answer: the formatted text, or the first page of a table result"""
+    formatted = format_result(result)
+    if isinstance(formatted, dict):
+        page = formatted["data"]
+        return {
+            "type": "table",
+            "message": formatted["message"],
+            "total_rows": formatted["rows"],
+            "columns": [str(col) for col in page.columns],
+            # to_json converts numpy scalars, NaN and timestamps to plain JSON
+            "rows": json.loads(page.to_json(orient="records", date_format="iso"))
+        }
+    return {"type": "text", "message": formatted}
+
+
+def resolve_data_path(data_dir, path):
+    """Absolute path of a file inside data_dir, or None when path leads outside it"""
+    root = os.path.realpath(data_dir)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        return None
+    return full
+
+
+def _load_favorites(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_app(gateway=None, cache=None, sql_workers=None, llm_workers=None, favorites_file=FAVORITES_FILE,
+               token_budget=None, engine_name=None, isolated=None, data_dir=None):
+    """Build the FastAPI app; pass a gateway with a FakeProvider to run without OpenAI"""
+    if gateway is None:
+        gateway = LLMGateway(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", str(DEFAULT_LLM_WORKERS))),
+            deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+        )
+    if cache is None:
+        cache = ResponseCache()
+    if isolated is None:
+        isolated = os.getenv("QUERY_WORKER_PROCESS", "true").lower() != "false"
+    data_dir = data_dir or os.getenv("API_DATA_DIR", DATA_DIR)
+    token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+    sql_pool = ThreadPoolExecutor(sql_workers or int(os.getenv("SQL_WORKERS", str(DEFAULT_SQL_WORKERS))),
+                                  thread_name_prefix="sql-worker")
+    llm_pool = ThreadPoolExecutor(llm_workers or int(os.getenv("LLM_MAX_CONCURRENCY", str(DEFAULT_LLM_WORKERS))),
+                                  thread_name_prefix="llm-worker")
+    datasets = {}
+    datasets_lock = threading.Lock()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        for pipeline in list(datasets.values()):
+            pipeline.close()
+        sql_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+
+    app = FastAPI(title="AI Data Analyst API", lifespan=lifespan)
+    app.state.datasets = datasets
+    app.state.gateway = gateway
+
+    async def run_in(pool, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+    def get_pipeline(dataset_id):
+        pipeline = datasets.get(dataset_id)
+        if pipeline is None:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'")
+        return pipeline
+
+    def load(source):
+        df, _ = optimize_dtypes(load_csv_cached(source))
+        pipeline = Pipeline(df, gateway, cache=cache, token_budget=token_budget, engine_name=engine_name,
+                            isolated=isolated)
+        pipeline.profile  # profile here rather than on the event loop
+        return pipeline
+
+    def describe(dataset_id, pipeline):
+        profile = pipeline.profile
+        return {
+            "dataset_id": dataset_id,
+            "rows": profile.rows,
+            "columns": [{"name": col.name, "dtype": col.dtype, "null_count": col.null_count}
+                        for col in profile.columns],
+            "schema_fingerprint": profile.schema_fingerprint
+        }
+
+    async def execute(pipeline, question, sql_query):
+        """Run SQL on the SQL pool, repairing it on the LLM pool; returns (sql_query, result, repair log)"""
+        try:
+            result = await run_in(sql_pool, pipeline.execute, sql_query)
+            return result.sql_query, result, None
+        except QueryAbortedError as e:
+            # Stopped for time or size, not broken: a rewrite would likely be stopped too
+            raise HTTPException(status_code=422, detail=f"Query failed: {e}")
+        except Exception as e:
+            error = e
+        if not pipeline.repair_attempts:
+            raise HTTPException(status_code=422, detail=f"Query failed: {error}")
+
+        def check(candidate):
+            # The repair loop waits for the model on the LLM pool; its candidates still run on the SQL pool
+            return sql_pool.submit(pipeline.execute, candidate).result()
+
+        try:
+            _, result, log = await run_in(llm_pool, pipeline.repair, question, sql_query, error, check)
+        except LLMGatewayError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Query failed: {e}")
+        if result is None:
+            raise HTTPException(status_code=422, detail=f"Query failed: {error}")
+        return result.sql_query, result, log.as_dict()
+
+    async def generate_and_execute(pipeline, question):
+        """Generate SQL on the LLM pool, then run it on the SQL pool"""
+        try:
+            sql_query, tokens = await run_in(llm_pool, pipeline.generate_sql, question)
+        except LLMGatewayError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        if not sql_query:
+            raise HTTPException(status_code=502, detail="The model did not return a SQL query")
+        sql_query, result, repair = await execute(pipeline, question, sql_query)
+        return sql_query, result, tokens, repair
+
+    async def response(question, sql_query, result, tokens, repair=None, replayed=False, intent=None):
+        return {
+            "question": question,
+            "sql_query": sql_query,
+            "replayed": replayed,
+            "intent": intent,
+            "prompt_tokens": tokens,
+            "repair": repair,
+            "answer": await run_in(sql_pool, result_payload, result)
+        }
+
+    async def answer(pipeline, question):
+        """Answer from the intent catalog when it knows the question, otherwise through the model"""
+        intent, result = await run_in(sql_pool, pipeline.answer_intent, question)
+        if result is not None:
+            return await response(question, result.sql_query, result, None, intent=intent)
+        return await response(question, *await generate_and_execute(pipeline, question))
+
+    @app.post("/datasets", status_code=201)
+    async def register_dataset(body: DatasetRequest):
+        if body.csv is not None:
+            source = io.BytesIO(body.csv.encode("utf-8"))
+        elif body.path:
+            source = resolve_data_path(data_dir, body.path)
+            if source is None:
+                raise HTTPException(status_code=403, detail="'path' must be inside the data directory")
+            if not os.path.isfile(source):
+                raise HTTPException(status_code=400, detail=f"No such file: {body.path}")
+        else:
+            raise HTTPException(status_code=400, detail="Provide either 'path' or 'csv'")
+        try:
+            pipeline = await run_in(sql_pool, load, source)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not load the CSV: {e}")
+        dataset_id = uuid.uuid4().hex
+        with datasets_lock:
+            datasets[dataset_id] = pipeline
+        return describe(dataset_id, pipeline)
+
+    @app.get("/datasets/{dataset_id}")
+    async def get_dataset(dataset_id: str):
+        return describe(dataset_id, get_pipeline(dataset_id))
+
+    @app.delete("/datasets/{dataset_id}", status_code=204)
+    async def delete_dataset(dataset_id: str):
+        with datasets_lock:
+            pipeline = datasets.pop(dataset_id, None)
+        if pipeline is None:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'")
+        await run_in(sql_pool, pipeline.close)
+
+    @app.post("/datasets/{dataset_id}/ask")
+    async def ask(dataset_id: str, body: AskRequest):
+        pipeline = get_pipeline(dataset_id)
+        question = body.question.strip()
+        if not question:
+            raise HTTPException(status_code=400, detail="'question' is required")
+        return await answer(pipeline, question)
+
+    @app.post("/datasets/{dataset_id}/favorites/{favorite_id}/run")
+    async def run_favorite(dataset_id: str, favorite_id: int):
+        pipeline = get_pipeline(dataset_id)
+        favorites = await run_in(sql_pool, _load_favorites, favorites_file)
+        favorite = next((f for f in favorites if f.get("id") == favorite_id), None)
+        if favorite is None:
+            raise HTTPException(status_code=404, detail=f"Unknown favorite {favorite_id}")
+        intent, result = await run_in(sql_pool, pipeline.answer_intent, favorite["question"])
+        if result is not None:
+            return await response(favorite["question"], result.sql_query, result, None, intent=intent)
+        # Stored SQL is replayed without a model call while the schema matches
+        result = await run_in(sql_pool, pipeline.replay, favorite)
+        if result is not None:
+            return await response(favorite["question"], result.sql_query, result, None, replayed=True)
+        return await response(favorite["question"], *await generate_and_execute(pipeline, favorite["question"]))
+
+    return app
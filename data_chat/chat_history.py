@@ -0,0 +1,145 @@
+"""Chat history that keeps message records light and result tables on disk
+
+ChatHistory is the list stored in st.session_state.messages. Table results
+stay in memory only up to a per-session byte cap, counting both the stored
+first page and whatever rows the message's ResultHandle has fetched since;
+beyond it the oldest tables are written to Parquet files in a per-session
+temporary directory and read back only when a message is rendered again.
+The directory is removed when the history is cleared or garbage collected
+with its session. The last few tables read back are kept per session, up to
+read_back_cap_bytes, so reruns do not read them from disk every time.
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MEMORY_CAP_BYTES = 50 * 1024 * 1024
+DEFAULT_READ_BACK_CAP_BYTES = 8 * 1024 * 1024
+
+
+def _table_content(message):
+    content = message.get("content")
+    if isinstance(content, dict) and content.get("type") == "table" and content.get("data") is not None:
+        return content
+    return None
+
+
+def _table_bytes(content):
+    """Bytes a table message holds: its stored page plus the rows its result handle fetched"""
+    data, handle = content.get("data"), content.get("result")
+    size = 0
+    if data is not None and (handle is None or handle.first_page is not data):
+        size += int(data.memory_usage(deep=True).sum())
+    if handle is not None:
+        size += handle.memory_bytes()
+    return size
+
+
+class ChatHistory(list):
+    """List of chat messages whose table results spill to disk past memory_cap_bytes"""
+
+    def __init__(self, memory_cap_bytes=DEFAULT_MEMORY_CAP_BYTES, spill_dir=None,
+                 read_back_cap_bytes=DEFAULT_READ_BACK_CAP_BYTES):
+        super().__init__()
+        self.memory_cap_bytes = memory_cap_bytes
+        self.read_back_cap_bytes = read_back_cap_bytes
+        self._read_back = OrderedDict()  # spill file -> (rows, bytes), least recently read first
+        self.spilled = 0
+        self._spill_dir = spill_dir
+        self._tables = OrderedDict()  # table id -> content, oldest first, spilled or not
+        self._ids = itertools.count()
+        self._finalizer = None
+
+    @property
+    def spill_dir(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="chat_history_")
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    @property
+    def resident_bytes(self):
+        """Bytes of rows the history's tables hold in memory right now"""
+        return sum(_table_bytes(content) for content in self._tables.values())
+
+    def append(self, message):
+        content = _table_content(message)
+        if content is not None:
+            table_id = next(self._ids)
+            content["table_id"] = table_id
+            self._tables[table_id] = content
+        super().append(message)
+        self.enforce_cap()
+
+    def enforce_cap(self):
+        """Spill the oldest tables, then drop their handles' pages, until the history fits its cap
+
+        Handles fetch more pages as results are browsed, so the sizes are
+        measured again on every call.
+        """
+        sizes = {table_id: _table_bytes(content) for table_id, content in self._tables.items()}
+        total = sum(sizes.values())
+        for table_id, content in self._tables.items():
+            if total <= self.memory_cap_bytes:
+                break
+            if content.get("data") is not None:
+                self._spill(table_id, content)
+            elif content.get("result") is not None:
+                content["result"].release()
+            size = _table_bytes(content)
+            total -= sizes[table_id] - size
+
+    def _spill(self, table_id, content):
+        path = os.path.join(self.spill_dir, f"{table_id}.parquet")
+        try:
+            content["data"].to_parquet(path, index=False)
+        except Exception:
+            # Unserializable tables (or no pyarrow) stay in memory
+            return
+        content["data"] = None
+        content["data_file"] = path
+        if content.get("result") is not None:
+            content["result"].release()
+        self.spilled += 1
+
+    def table_data(self, content):
+        """The rows of a table message, read back from disk if it was spilled"""
+        if content.get("data") is not None:
+            return content["data"]
+        path = content["data_file"]
+        entry = self._read_back.get(path)
+        if entry is not None:
+            self._read_back.move_to_end(path)
+            return entry[0]
+        data = pd.read_parquet(path)
+        size = int(data.memory_usage(deep=True).sum())
+        if size <= self.read_back_cap_bytes:
+            self._read_back[path] = (data, size)
+            while sum(size for _, size in self._read_back.values()) > self.read_back_cap_bytes:
+                self._read_back.popitem(last=False)
+        return data
+
+    def _discard(self, message):
+        content = message.get("content")
+        if not isinstance(content, dict):
+            return
+        self._tables.pop(content.get("table_id"), None)
+        self._read_back.pop(content.get("data_file"), None)
+        if content.get("data_file") and os.path.exists(content["data_file"]):
+            os.remove(content["data_file"])
+
+    def pop(self, index=-1):
+        message = super().pop(index)
+        self._discard(message)
+        return message
+
+    def clear(self):
+        for message in self:
+            self._discard(message)
+        super().clear()
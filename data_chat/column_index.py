@@ -0,0 +1,92 @@
+"""Lexical index over a dataset's columns for picking the ones a question needs
+
+Each column is a small document made of its name (weighted double) and its
+most frequent values. Questions are scored against it with BM25, where a
+query word also matches a column word it is a prefix of or starts with, so
+"business transaction types" finds "Bus. Transac. Type". The index is built
+once per dataset profile.
+"""
+
+import functools
+import math
+import re
+from collections import Counter
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+NAME_WEIGHT = 2
+MIN_PREFIX_LENGTH = 3
+
+# Words that say nothing about which columns a question needs, including
+# the vocabulary of the analysis itself (counts, nulls, averages, ...)
+STOP_WORDS = {
+    "a", "all", "an", "and", "are", "by", "can", "could", "df", "do", "does", "each", "for", "from",
+    "give", "how", "in", "is", "it", "list", "many", "me", "much", "of", "on", "or", "per", "please",
+    "show", "table", "tell", "that", "the", "there", "to", "what", "which", "with", "would", "you",
+    "average", "column", "columns", "count", "data", "dataset", "distinct", "duplicate", "duplicates",
+    "missing", "null", "nulls", "number", "records", "row", "rows", "sum", "top", "total", "unique",
+    "values"
+}
+
+
+def tokenize(text):
+    """Lowercase word tokens, splitting camelCase and punctuation"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOP_WORDS]
+
+
+def _matches(query_word, term):
+    if query_word == term:
+        return True
+    if min(len(query_word), len(term)) < MIN_PREFIX_LENGTH:
+        return False
+    return term.startswith(query_word) or query_word.startswith(term)
+
+
+class ColumnIndex:
+    """BM25 scores of a profile's columns against free-text questions"""
+
+    def __init__(self, profile):
+        self.columns = [col.name for col in profile.columns]
+        self._documents = []
+        for col in profile.columns:
+            terms = tokenize(col.name) * NAME_WEIGHT
+            for value in getattr(col, "top_values", []):
+                terms += tokenize(value)
+            self._documents.append(Counter(terms))
+        lengths = [sum(doc.values()) for doc in self._documents]
+        self._lengths = lengths
+        self._average_length = (sum(lengths) / len(lengths)) if lengths else 0
+        self._vocabulary = set().union(*self._documents) if self._documents else set()
+
+    def scores(self, question):
+        """{column: score} for every column matching at least one question word"""
+        scores = {}
+        count = len(self._documents)
+        for word in set(tokenize(question)):
+            terms = [term for term in self._vocabulary if _matches(word, term)]
+            if not terms:
+                continue
+            frequencies = [sum(doc[term] for term in terms) for doc in self._documents]
+            document_frequency = sum(1 for f in frequencies if f)
+            idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for i, frequency in enumerate(frequencies):
+                if not frequency:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / max(self._average_length, 1))
+                name = self.columns[i]
+                scores[name] = scores.get(name, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+    def top_columns(self, question, k):
+        """Up to k best-matching column names, best first; empty when nothing matches"""
+        scores = self.scores(question)
+        order = {name: i for i, name in enumerate(self.columns)}
+        ranked = sorted(scores, key=lambda name: (-scores[name], order[name]))
+        return ranked[:k]
+
+
+@functools.lru_cache(maxsize=8)
+def get_column_index(profile):
+    """Return the column index of a dataset profile, building it on first use"""
+    return ColumnIndex(profile)
@@ -0,0 +1,92 @@
+"""On-disk Parquet cache of parsed CSV files, keyed by file content
+
+The first load of a CSV parses it in chunks (see ingest.read_csv_chunked)
+and writes the typed, compact result to CACHE_DIR. Every later load of the
+same bytes reads (memory-maps) the Parquet file instead of parsing the CSV
+again.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from data_chat.ingest import read_csv_chunked
+
+CACHE_DIR = "data/.cache"
+INDEX_FILE = "index.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _hash_stream(stream):
+    digest = hashlib.blake2b(digest_size=20)
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(source, cache_dir=CACHE_DIR):
+    """Hash of a CSV's bytes; source is a file path or a binary file-like object
+
+    For paths the hash is remembered against (size, mtime), so reloading an
+    unchanged file does not read it again.
+    """
+    if hasattr(source, "read"):
+        position = source.tell()
+        source.seek(0)
+        try:
+            return _hash_stream(source)
+        finally:
+            source.seek(position)
+
+    stat = os.stat(source)
+    stat_key = f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    index = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception:
+            index = {}
+    if stat_key in index:
+        return index[stat_key]
+
+    with open(source, "rb") as f:
+        digest = _hash_stream(f)
+    index[stat_key] = digest
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    except OSError:
+        pass
+    return digest
+
+
+def load_csv_cached(source, cache_dir=CACHE_DIR, progress_callback=None):
+    """Load a CSV through the Parquet cache, parsing it only on a cache miss"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return read_csv_chunked(source, progress_callback=progress_callback)
+
+    cache_path = os.path.join(cache_dir, f"{content_hash(source, cache_dir)}.parquet")
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path, memory_map=True)
+        except Exception:
+            # A truncated or unreadable cache file is rebuilt below
+            pass
+
+    df = read_csv_chunked(source, progress_callback=progress_callback)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        pass
+    return df
@@ -0,0 +1,186 @@
+"""Memory-bounded CSV ingestion
+
+The file is read in chunks. A sample taken from the start decides which
+string columns are low-cardinality codes (Currency, Country Key,
+Debit/Credit ind, ...); those are parsed straight into categoricals, and
+integer columns are downcast chunk by chunk. Every chunk is parsed with the
+sample's text and float dtypes, so a column does not change type from one
+chunk to the next, and a categorical whose values turn out to be mostly
+distinct further down the file is converted back to text. Only compact column pieces are
+kept between chunks, so peak memory stays close to the final frame size
+instead of the several-fold overhead of object-dtype strings. The memory
+and dtypes a plain read_csv would have produced are kept in the frame's
+attrs for optimize_dtypes to report against.
+"""
+
+import io
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_chat.optimize import (
+    PARSED_DTYPES_ATTR, PARSED_MEMORY_ATTR, downcast_integer, is_low_cardinality, is_text_dtype
+)
+
+DEFAULT_CHUNK_ROWS = 200_000
+SAMPLE_ROWS = 10_000
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _total_bytes(source):
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer().nbytes
+    if hasattr(source, "size"):
+        return source.size
+    if hasattr(source, "seek"):
+        position = source.tell()
+        size = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return size
+    return os.path.getsize(source)
+
+
+def infer_category_columns(sample):
+    """Pick the string columns of a sample that should be dictionary-encoded"""
+    return [col for col in sample.columns
+            if is_text_dtype(sample[col].dtype) and is_low_cardinality(sample[col])]
+
+
+def parsed_bytes(chunk, dtypes):
+    """Memory the chunk would take with the dtypes of a plain read_csv, before any compaction"""
+    total = 0
+    for col in chunk.columns:
+        series = chunk[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(dtypes[col])
+        total += int(series.memory_usage(deep=True, index=False))
+    return total
+
+
+def narrow_chunk(chunk):
+    """Downcast integer columns of one chunk; returns {column: Series}"""
+    narrowed = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            series = downcast_integer(series)
+        narrowed[col] = series
+    return narrowed
+
+
+def _combine(pieces):
+    """Concatenate one column's chunk pieces, merging categorical dictionaries"""
+    if all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+        try:
+            return pd.Series(union_categoricals(pieces), name=pieces[0].name)
+        except TypeError:
+            # Category dtypes differ between chunks (e.g. an all-null chunk
+            # or numeric-looking codes); fall back to re-encoding the values
+            return pd.concat([piece.astype(object) for piece in pieces], ignore_index=True).astype("category")
+    return pd.concat(pieces, ignore_index=True)
+
+
+def concat_frames(frames):
+    """Append frames column by column, keeping categoricals categorical"""
+    data = {}
+    for col in frames[0].columns:
+        pieces = [frame[col].reset_index(drop=True) for frame in frames]
+        if any(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+            pieces = [piece if isinstance(piece.dtype, pd.CategoricalDtype) else piece.astype("category")
+                      for piece in pieces]
+        data[col] = _combine(pieces)
+    return pd.DataFrame(data, copy=False)
+
+
+def sample_dtypes(sample, category_columns):
+    """dtype argument that parses every chunk the way the sample was parsed
+
+    Text columns keep the sample's text dtype and float columns stay
+    float64, so no chunk infers its own type for them. Integer columns are
+    left to inference, since a later chunk may have gaps that need floats.
+    """
+    dtypes = {col: "category" for col in category_columns}
+    for col, dtype in sample.dtypes.items():
+        if col in dtypes:
+            continue
+        if is_text_dtype(dtype):
+            dtypes[col] = dtype
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[col] = "float64"
+    return dtypes
+
+
+def _read_chunks(source, chunk_rows, dtypes, parsed_dtypes, total_bytes, progress_callback):
+    """Parse the whole file chunk by chunk; returns ({column: [pieces]}, rows, parsed bytes)"""
+    pieces = {col: [] for col in parsed_dtypes.index}
+    rows = 0
+    parsed_total = 0
+    _rewind(source)
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype=dtypes):
+        parsed_total += parsed_bytes(chunk, parsed_dtypes)
+        for col, series in narrow_chunk(chunk).items():
+            pieces[col].append(series.reset_index(drop=True))
+        rows += len(chunk)
+        del chunk
+        if progress_callback:
+            progress_callback(min(1.0, source.tell() / total_bytes), rows)
+    return pieces, rows, parsed_total
+
+
+def read_csv_chunked(source, chunk_rows=DEFAULT_CHUNK_ROWS, progress_callback=None):
+    """Read a CSV path or binary file-like object into a compact DataFrame
+
+    progress_callback, if given, is called as progress_callback(fraction, rows)
+    after every chunk.
+    """
+    opened = None
+    if not hasattr(source, "read"):
+        opened = source = open(source, "rb")
+    try:
+        total_bytes = max(1, _total_bytes(source))
+        _rewind(source)
+        sample = pd.read_csv(source, nrows=SAMPLE_ROWS)
+        category_columns = infer_category_columns(sample)
+        columns = list(sample.columns)
+        parsed_dtypes = sample.dtypes
+        dtypes = sample_dtypes(sample, category_columns)
+        del sample
+
+        try:
+            pieces, rows, parsed_total = _read_chunks(
+                source, chunk_rows, dtypes, parsed_dtypes, total_bytes, progress_callback
+            )
+        except (ValueError, TypeError):
+            # A float column of the sample holds text further down: pin only
+            # the text and category columns and read again
+            dtypes = {col: dtype for col, dtype in dtypes.items() if dtype != "float64"}
+            pieces, rows, parsed_total = _read_chunks(
+                source, chunk_rows, dtypes, parsed_dtypes, total_bytes, progress_callback
+            )
+
+        if rows == 0:
+            _rewind(source)
+            return pd.read_csv(source)
+
+        data = {}
+        for col in columns:
+            series = _combine(pieces.pop(col))
+            if col in category_columns and not is_low_cardinality(series):
+                # Low-cardinality only near the top of the file: a categorical no longer pays off
+                series = series.astype(parsed_dtypes[col])
+            data[col] = series
+        df = pd.DataFrame(data, copy=False)
+        # Reported by optimize_dtypes as the size before compaction
+        df.attrs[PARSED_MEMORY_ATTR] = parsed_total + int(df.index.memory_usage())
+        df.attrs[PARSED_DTYPES_ATTR] = {str(col): str(dtype) for col, dtype in parsed_dtypes.items()}
+        if progress_callback:
+            progress_callback(1.0, rows)
+        return df
+    finally:
+        if opened is not None:
+            opened.close()
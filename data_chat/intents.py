@@ -0,0 +1,271 @@
+"""Common data-quality questions answered without the model or a query engine
+
+Questions such as "How many null values are in each column?" make the model
+write one COUNT(CASE WHEN ... IS NULL ...) per column, which is slow to
+generate and often comes back in shapes format_result has to guess at.
+match_intent() recognizes a catalog of such questions and answers them with
+vectorized pandas operations (or the cached dataset profile) as a
+FrameResult, a table in the usual result interface.
+
+Matching is deliberately strict: the whole question, reduced by
+normalize_question(), must fit one of the patterns, and a question about a
+specific column must name exactly one column. Anything else goes to the
+model as before.
+"""
+
+import re
+
+import pandas as pd
+
+from data_chat.llm_cache import FILLER_WORDS, normalize_question
+from data_chat.results import FrameResult
+
+SQL_LABEL = "-- Answered directly from the data, without SQL: {description}"
+
+# Words that may end a question without changing it: "... are there in this dataset"
+_TAIL_WORDS = ("are", "is", "there", "do", "does", "we", "have", "has", "this", "that", "dataset", "data", "set",
+               "table", "file", "df", "total", "overall", "whole", "entire", "it", "contain", "contains", "currently")
+_TAIL = r"(?: (?:" + "|".join(_TAIL_WORDS) + r"))*"
+_HOW_MANY = r"(?:how many|what is (?:total )?(?:number|count)|(?:total )?(?:number|count)|count)"
+_NULL = r"(?:nulls|null|missing|empty|nan|na|blank)(?: values?| entries| cells)?"
+_EACH_COLUMN = r"(?: are| is| there)*(?: for)? (?:each|every|per|by|all) columns?"
+
+_AGGREGATES = {
+    "total": "sum", "sum": "sum",
+    "average": "mean", "avg": "mean", "mean": "mean",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max",
+}
+
+
+def _column_key(text):
+    return " ".join(word for word in re.findall(r"[a-z0-9]+", str(text).lower()) if word not in FILLER_WORDS)
+
+
+def _singular(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def resolve_column(phrase, columns):
+    """The one column a normalized phrase names, or None"""
+    words = phrase.split()
+    while words and words[0] in _TAIL_WORDS + ("column", "field"):
+        words = words[1:]
+    while words and words[-1] in _TAIL_WORDS:
+        words = words[:-1]
+    candidates = []
+    for variant in (words, words[:-1] if words and words[-1] in ("column", "field", "values") else None):
+        if variant:
+            candidates.append(" ".join(variant))
+            candidates.append(" ".join(variant[:-1] + [_singular(variant[-1])]))
+    for candidate in candidates:
+        matches = [col for col in columns if _column_key(col) == candidate]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            return None
+    return None
+
+
+def _null_counts(df, profile):
+    if profile is not None:
+        return pd.Series(profile.missing_by_column)
+    return df.isna().sum()
+
+
+def _null_table(df, counts):
+    rows = len(df)
+    return pd.DataFrame({
+        "Column": [str(col) for col in counts.index],
+        "Null Values": counts.astype("int64").to_numpy(),
+        "Null %": (counts / rows * 100).round(2).to_numpy() if rows else 0.0
+    })
+
+
+def _single(label, value):
+    if hasattr(value, "item"):
+        value = value.item()
+    return pd.DataFrame({label: [value]})
+
+
+def _row_count(df, profile, column):
+    return _single("Rows", len(df))
+
+
+def _column_count(df, profile, column):
+    return _single("Columns", len(df.columns))
+
+
+def _column_names(df, profile, column):
+    return pd.DataFrame({"Position": range(1, len(df.columns) + 1), "Column": [str(col) for col in df.columns]})
+
+
+def _data_types(df, profile, column):
+    return pd.DataFrame({"Column": [str(col) for col in df.columns], "Data Type": [str(dtype) for dtype in df.dtypes]})
+
+
+def _nulls_per_column(df, profile, column):
+    return _null_table(df, _null_counts(df, profile))
+
+
+def _total_nulls(df, profile, column):
+    return _single("Null Values", int(_null_counts(df, profile).sum()))
+
+
+def _columns_with_nulls(df, profile, column):
+    counts = _null_counts(df, profile)
+    counts = counts[counts > 0].sort_values(ascending=False)
+    if counts.empty:
+        return _single("Result", "No column has null values")
+    return _null_table(df, counts)
+
+
+def _duplicate_rows(df, profile, column):
+    return _single("Duplicate Rows", int(df.duplicated().sum()))
+
+
+def _distinct_per_column(df, profile, column):
+    if profile is not None and not profile.approximate:
+        counts = [col.unique_count for col in profile.columns]
+    else:
+        counts = df.nunique().tolist()
+    return pd.DataFrame({"Column": [str(col) for col in df.columns], "Distinct Values": counts})
+
+
+def _column_nulls(df, profile, column):
+    return _single(f"{column} null values", int(df[column].isna().sum()))
+
+
+def _column_distinct_count(df, profile, column):
+    return _single(f"Distinct {column}", int(df[column].nunique()))
+
+
+def _column_distinct_values(df, profile, column):
+    counts = df[column].value_counts()
+    return pd.DataFrame({str(column): counts.index, "Rows": counts.to_numpy()})
+
+
+def _column_aggregate(df, profile, column, aggregate):
+    return _single(f"{aggregate.upper()}({column})", getattr(df[column], aggregate)())
+
+
+class Intent:
+    """A kind of question the catalog answers, with the patterns that recognize it"""
+
+    def __init__(self, name, description, patterns, answer, column=False):
+        self.name = name
+        self.description = description
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.answer = answer
+        self.column = column
+
+
+class IntentMatch:
+    """A question matched to an intent and, for column intents, its column"""
+
+    def __init__(self, intent, column=None, aggregate=None):
+        self.intent = intent
+        self.column = column
+        self.aggregate = aggregate
+
+    @property
+    def name(self):
+        return self.intent.name
+
+    @property
+    def description(self):
+        description = self.intent.description
+        if self.aggregate:
+            description = f"{self.aggregate} of {self.column}"
+        elif self.column is not None:
+            description = f"{description} of {self.column}"
+        return description
+
+    @property
+    def sql_query(self):
+        return SQL_LABEL.format(description=self.description)
+
+    def answer(self, df, profile=None):
+        """Compute the answer as a FrameResult"""
+        if self.aggregate:
+            frame = _column_aggregate(df, profile, self.column, self.aggregate)
+        else:
+            frame = self.intent.answer(df, profile, self.column)
+        return FrameResult(frame, self.sql_query)
+
+
+INTENTS = [
+    Intent("row_count", "number of rows", [
+        rf"{_HOW_MANY} (?:rows|records|entries|lines|observations){_TAIL}",
+        rf"(?:what is )?(?:rows?|records?) count{_TAIL}",
+    ], _row_count),
+    Intent("column_count", "number of columns", [
+        rf"{_HOW_MANY} (?:columns|fields|variables){_TAIL}",
+        rf"(?:what is )?columns? count{_TAIL}",
+    ], _column_count),
+    Intent("column_names", "column names", [
+        rf"(?:what|which|show|list|give|get|display)(?: are| is| all| available)* (?:columns?|fields)(?: names?)?{_TAIL}",
+    ], _column_names),
+    Intent("data_types", "data type of each column", [
+        rf"(?:what|show|list|give|display)(?: are| is| all)* (?:columns? )?(?:data types?|types|dtypes)"
+        rf"(?: for)?(?: each| every| all)?(?: columns?)?{_TAIL}",
+    ], _data_types),
+    Intent("nulls_per_column", "null values per column", [
+        rf"(?:(?:how many|what is number|number|count|show|list|what are|check|find)(?: are)? )?{_NULL}"
+        rf"(?: counts?)?{_EACH_COLUMN}{_TAIL}",
+    ], _nulls_per_column),
+    Intent("total_nulls", "null values in the whole dataset", [
+        rf"{_HOW_MANY}(?: total)? {_NULL}(?: are| is| there)*{_TAIL}",
+    ], _total_nulls),
+    Intent("columns_with_nulls", "columns that have null values", [
+        rf"(?:which|what) columns? (?:have|has|contain|contains|with)(?: any)? {_NULL}{_TAIL}",
+    ], _columns_with_nulls),
+    Intent("duplicate_rows", "number of duplicate rows", [
+        rf"(?:(?:how many|number|count|are there(?: any)?|any|check(?: for)?|find)(?: are)? )?"
+        rf"(?:duplicate|duplicated) (?:rows|records|entries){_TAIL}",
+        rf"(?:how many|are there(?: any)?|any|check(?: for)?|find) duplicates{_TAIL}",
+    ], _duplicate_rows),
+    Intent("distinct_per_column", "distinct values per column", [
+        rf"(?:{_HOW_MANY} )?(?:unique|distinct) values?{_EACH_COLUMN}{_TAIL}",
+    ], _distinct_per_column),
+    Intent("column_nulls", "null values", [
+        rf"{_HOW_MANY} {_NULL}(?: are| is| there)*(?: for)? (?P<column>.+?){_TAIL}",
+    ], _column_nulls, column=True),
+    Intent("column_distinct_count", "number of distinct values", [
+        rf"{_HOW_MANY} (?:unique|distinct|different) (?P<column>.+?){_TAIL}",
+    ], _column_distinct_count, column=True),
+    Intent("column_distinct_values", "distinct values", [
+        rf"(?:what are|list|show|which are)(?: all)? (?:unique|distinct|different) (?P<column>.+?){_TAIL}",
+    ], _column_distinct_values, column=True),
+    Intent("column_aggregate", "aggregate", [
+        rf"(?:(?:what is|show|give|calculate|compute) )?(?P<aggregate>{'|'.join(_AGGREGATES)})(?: value)?(?: for)? "
+        rf"(?P<column>.+?){_TAIL}",
+    ], None, column=True),
+]
+
+
+def match_intent(question, df):
+    """The catalog entry answering question about df, or None to ask the model"""
+    text = normalize_question(question or "")
+    if not text:
+        return None
+    for intent in INTENTS:
+        for pattern in intent.patterns:
+            found = pattern.fullmatch(text)
+            if found is None:
+                continue
+            if not intent.column:
+                return IntentMatch(intent)
+            column = resolve_column(found.group("column"), list(df.columns))
+            if column is None:
+                continue
+            if "aggregate" in pattern.groupindex:
+                if not pd.api.types.is_numeric_dtype(df[column].dtype) or pd.api.types.is_bool_dtype(df[column].dtype):
+                    continue
+                return IntentMatch(intent, column, _AGGREGATES[found.group("aggregate")])
+            return IntentMatch(intent, column)
+    return None
@@ -0,0 +1,127 @@
+"""Persistent cache of LLM responses for repeated questions"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from data_chat.prompt_builder import stable_prefix
+
+DEFAULT_CACHE_PATH = "data/llm_cache.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+# Words that do not change what a question asks for
+FILLER_WORDS = {"please", "can", "could", "would", "you", "tell", "me", "the", "a", "an", "of", "in", "my"}
+
+
+def normalize_question(question):
+    """Reduce a question to a canonical form so trivial rewordings match"""
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with TTL expiry and LRU eviction
+
+    Responses are stored under an exact key, a hash of (model, rendered
+    prompt, schema fingerprint, temperature). When a question is passed,
+    they are also stored under a normalized-question key built from the
+    normalized question and the prompt's stable prefix only, so rewordings
+    such as "How many rows are in the dataset" hit as well, even when they
+    got a different focus hint (see prompt_builder.stable_prefix).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, clock=time.time):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _keys(self, model, prompt, schema_fingerprint, temperature, question):
+        keys = [_hash("exact", model, prompt, schema_fingerprint, temperature)]
+        if question:
+            context = stable_prefix(prompt, question)
+            keys.append(_hash("question", model, normalize_question(question), context, schema_fingerprint, temperature))
+        return keys
+
+    def lookup(self, model, prompt, schema_fingerprint, temperature, question=None):
+        """Return a cached response or None, updating hit/miss counters"""
+        now = self.clock()
+        with self._lock:
+            for key in self._keys(model, prompt, schema_fingerprint, temperature, question):
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    continue
+                response, created_at = row
+                if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    continue
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return response
+            self._conn.commit()
+            self.misses += 1
+            return None
+
+    def store(self, model, prompt, schema_fingerprint, temperature, response, question=None):
+        """Cache a response and evict the least recently used entries over the limit"""
+        now = self.clock()
+        with self._lock:
+            for key in self._keys(model, prompt, schema_fingerprint, temperature, question):
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY last_access DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def discard_response(self, response):
+        """Drop every entry that produced this response, e.g. SQL that failed to run"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE response = ?", (response,))
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for the developer report"""
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits / total) * 100, 2) if total else 0.0,
+            'entries': entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
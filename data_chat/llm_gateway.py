@@ -0,0 +1,249 @@
+"""Shared gateway for LLM calls: pooled async client, bounded concurrency, retries
+
+All sessions of the app go through one LLMGateway. It runs an asyncio event
+loop on a background thread, so the Streamlit script thread only blocks on
+its own request while the loop multiplexes every session's HTTP calls over
+one connection pool.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+DEFAULT_DEADLINE = 60.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+_STREAM_DONE = object()
+
+
+class LLMGatewayError(Exception):
+    """Raised when the LLM could not answer within the retry budget or deadline"""
+
+
+class TransientLLMError(Exception):
+    """A failure worth retrying; raised by FakeProvider to simulate 429s and timeouts"""
+
+
+def is_retryable(error):
+    """Decide whether a provider error is transient"""
+    if isinstance(error, (TransientLLMError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        openai = None
+    if openai is not None and isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, rng=random):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class OpenAIProvider:
+    """Calls the OpenAI chat API through one pooled AsyncOpenAI client"""
+
+    def __init__(self, api_key=None, request_timeout=30.0):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.request_timeout = request_timeout
+        self._client = None
+
+    def _get_client(self):
+        # Created lazily on the gateway's loop; the client's HTTP connection
+        # pool is reused by every request after that.
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key, timeout=self.request_timeout, max_retries=0)
+        return self._client
+
+    async def complete(self, model, messages, temperature, max_tokens):
+        response = await self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    async def stream(self, model, messages, temperature, max_tokens):
+        stream = await self._get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+
+class FakeProvider:
+    """Offline provider for tests
+
+    responses is either a string or a callable taking the list of chat
+    messages. failures lists errors to raise, one per call, before answering.
+    """
+
+    def __init__(self, responses="SELECT COUNT(*) FROM df", failures=None, delay=0.0, chunk_size=8):
+        self.responses = responses
+        self.failures = list(failures or [])
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    async def _answer(self, messages):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        return self.responses(messages) if callable(self.responses) else self.responses
+
+    async def complete(self, model, messages, temperature, max_tokens):
+        return await self._answer(messages)
+
+    async def stream(self, model, messages, temperature, max_tokens):
+        text = await self._answer(messages)
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i:i + self.chunk_size]
+
+
+class LLMGateway:
+    """Runs provider calls with bounded concurrency, jittered backoff and deadlines"""
+
+    def __init__(self, provider=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, deadline=DEFAULT_DEADLINE):
+        self.provider = provider or OpenAIProvider()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retries = 0
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+    async def _with_retries(self, start, deadline, limit=True):
+        """Await start() under the concurrency limit, retrying transient errors"""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        attempt = 0
+        while True:
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                raise LLMGatewayError(f"The AI service did not answer within {deadline:.0f} seconds")
+            try:
+                if not limit:
+                    return await asyncio.wait_for(start(), timeout=remaining)
+                async with self._semaphore:
+                    return await asyncio.wait_for(start(), timeout=remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if attempt >= self.max_retries:
+                    raise LLMGatewayError(f"The AI service is busy, please try again in a moment ({e})") from e
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                if loop.time() + delay >= give_up_at:
+                    raise LLMGatewayError(f"The AI service did not answer within {deadline:.0f} seconds") from e
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def acomplete(self, model, messages, temperature, max_tokens, deadline=None):
+        """Coroutine form of complete(), for callers already on the gateway loop"""
+        return await self._with_retries(
+            lambda: self.provider.complete(model, messages, temperature, max_tokens),
+            deadline or self.deadline
+        )
+
+    def complete(self, model, messages, temperature, max_tokens, deadline=None):
+        """Return the model's reply, blocking only the calling thread"""
+        return self._run(self.acomplete(model, messages, temperature, max_tokens, deadline))
+
+    def submit(self, model, messages, temperature, max_tokens, deadline=None):
+        """Start complete() without waiting; cancelling the returned future stops the request"""
+        return asyncio.run_coroutine_threadsafe(
+            self.acomplete(model, messages, temperature, max_tokens, deadline), self._loop
+        )
+
+    def _run(self, coro):
+        """Run a coroutine on the gateway loop and wait for it from this thread"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream(self, model, messages, temperature, max_tokens, deadline=None):
+        """Yield reply text chunks as they arrive
+
+        Chunks are pulled one at a time, so closing the generator early stops
+        reading and closes the underlying request. Connecting is retried like
+        complete(); errors after the first chunk are raised to the caller.
+        """
+        deadline = deadline or self.deadline
+        give_up_at = time.monotonic() + deadline
+        iterator = None
+
+        async def first_chunk():
+            nonlocal iterator
+            iterator = self.provider.stream(model, messages, temperature, max_tokens)
+            try:
+                return await iterator.__anext__()
+            except StopAsyncIteration:
+                return _STREAM_DONE
+
+        async def next_chunk():
+            remaining = give_up_at - time.monotonic()
+            try:
+                return await asyncio.wait_for(iterator.__anext__(), timeout=max(remaining, 0.001))
+            except StopAsyncIteration:
+                return _STREAM_DONE
+            except asyncio.TimeoutError as e:
+                raise LLMGatewayError(f"The AI service did not answer within {deadline:.0f} seconds") from e
+
+        # The concurrency slot is held for the whole stream, not just the connect
+        self._run(self._semaphore.acquire())
+        try:
+            chunk = self._run(self._with_retries(first_chunk, deadline, limit=False))
+            while chunk is not _STREAM_DONE:
+                yield chunk
+                chunk = self._run(next_chunk())
+        finally:
+            try:
+                if iterator is not None:
+                    self._run(iterator.aclose())
+            finally:
+                self._loop.call_soon_threadsafe(self._semaphore.release)
+
+    async def _cancel_outstanding(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Stop the gateway loop, cancelling requests nobody waits for any more"""
+        if self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._cancel_outstanding(), self._loop).result(timeout=5)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
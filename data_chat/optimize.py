@@ -0,0 +1,105 @@
+"""Compact in-memory representation of loaded datasets
+
+optimize_dtypes() runs on every DataFrame before it becomes the session's
+dataset. Repeated string codes (RFBU, USD, S/H, X) become categoricals,
+integers are downcast and float columns that only hold whole numbers (e.g.
+Fiscal Year.1, which is float64 only because of its nulls) become nullable
+small integers. Values are never changed, so the SQL engines and the schema
+prompt stay correct. For the same reason True/False text stays text (a
+categorical): as booleans SQLite would store it as 1/0, and generated SQL
+comparing with = 'True' would silently match nothing.
+
+read_csv_chunked already parses the codes into categoricals and records
+what the plain parse would have used (PARSED_MEMORY_ATTR, PARSED_DTYPES_ATTR
+in DataFrame.attrs), so the report covers the ingest savings as well.
+"""
+
+import numpy as np
+import pandas as pd
+
+# String columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# DataFrame.attrs keys set by ingest.read_csv_chunked: memory and dtypes of a plain read_csv
+PARSED_MEMORY_ATTR = "parsed_memory_bytes"
+PARSED_DTYPES_ATTR = "parsed_dtypes"
+
+NULLABLE_INT_DTYPES = ["Int8", "Int16", "Int32", "Int64"]
+
+
+def is_text_dtype(dtype):
+    return dtype == object or pd.api.types.is_string_dtype(dtype)
+
+
+def is_low_cardinality(series):
+    """Whether a string column repeats its values enough to dictionary-encode it"""
+    non_null = series.dropna()
+    return len(non_null) > 0 and non_null.nunique() <= len(non_null) * CATEGORY_MAX_UNIQUE_RATIO
+
+
+def downcast_integer(series):
+    """Smallest numpy integer dtype that holds the column"""
+    return pd.to_numeric(series, downcast="integer")
+
+
+def _as_nullable_int(series):
+    non_null = series.dropna()
+    if len(non_null) == 0 or not np.isfinite(non_null).all() or not (non_null == np.floor(non_null)).all():
+        return None
+    low, high = non_null.min(), non_null.max()
+    for dtype in NULLABLE_INT_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+    return None
+
+
+def optimize_column(series):
+    """Return a more compact equivalent of the column, or the column itself"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return series
+    if is_text_dtype(dtype):
+        if is_low_cardinality(series):
+            return series.astype("category")
+        return series
+    if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return downcast_integer(series)
+    if pd.api.types.is_float_dtype(dtype):
+        as_int = _as_nullable_int(series)
+        if as_int is not None:
+            return as_int
+    return series
+
+
+def optimize_dtypes(df):
+    """Return (optimized DataFrame, report) where report has before/after memory and conversions
+
+    "Before" is the plain read_csv parse when df comes from read_csv_chunked,
+    so conversions made while loading are counted too.
+    """
+    memory_before = df.attrs.get(PARSED_MEMORY_ATTR) or int(df.memory_usage(deep=True).sum())
+    parsed_dtypes = df.attrs.get(PARSED_DTYPES_ATTR) or {}
+    converted = {}
+    conversions = {}
+    for col in df.columns:
+        optimized = optimize_column(df[col])
+        if optimized.dtype != df[col].dtype:
+            converted[col] = optimized
+        parsed = parsed_dtypes.get(str(col), str(df[col].dtype))
+        if parsed != str(optimized.dtype):
+            conversions[col] = f"{parsed} → {optimized.dtype}"
+
+    if converted:
+        df = df.copy(deep=False)
+        for col, series in converted.items():
+            df[col] = series
+
+    memory_after = int(df.memory_usage(deep=True).sum())
+    report = {
+        'memory_before_bytes': memory_before,
+        'memory_after_bytes': memory_after,
+        'memory_saved_percentage': round((1 - memory_after / memory_before) * 100, 2) if memory_before else 0.0,
+        'conversions': conversions
+    }
+    return df, report
@@ -0,0 +1,321 @@
+"""The NL-to-SQL pipeline without any UI: prompt, model call, execution, formatting
+
+Both the Streamlit app and the HTTP service (data_chat.api) go through these
+functions, so a question produces the same prompt, SQL and answer in either.
+"""
+
+import logging
+
+from data_chat.column_index import get_column_index
+from data_chat.intents import match_intent
+from data_chat.profile import get_profile
+from data_chat.prompt_builder import (
+    DEFAULT_TOKEN_BUDGET, FOCUS_TOKEN_SHARE, build_schema_prompt, focus_schema_prompt, measure_prompt,
+    schema_token_budget
+)
+from data_chat.query_engine import create_query_engine
+from data_chat.query_worker import QueryAbortedError, WorkerQueryEngine
+from data_chat.repair import DEFAULT_MAX_ATTEMPTS, repair_sql
+from data_chat.result_cache import ResultCache
+from data_chat.results import ResultHandle
+from data_chat.sql_generation import SYSTEM_MESSAGE, request_sql
+from data_chat.sql_validation import DEFAULT_SELECT_STAR_LIMIT, get_schema_checker, validate_sql
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TEMPLATE_FILE = "system_prompt.txt"
+# Datasets wider than this send only the question's most relevant columns in detail
+DEFAULT_COLUMN_TOP_K = 15
+# Single-column results listed as bullet points stop after this many rows
+MAX_LISTED_RESULT_ROWS = 1000
+
+DEFAULT_PROMPT_TEMPLATE = """
+You are an expert SQL analyst. 
+
+Given the following database schema and a user question, generate a SQL query to answer the question.
+
+{schema_info}
+
+User Question: {user_question}
+
+Instructions:
+1. Generate ONLY the SQL query, nothing else
+2. Use the table name 'df' 
+3. Make sure the query is valid and will execute successfully
+4. For aggregation questions, use appropriate functions like COUNT(), SUM(), AVG(), etc.
+5. For data quality questions, check for nulls, duplicates, outliers, etc.
+6. Keep the query simple and focused on answering the question
+
+SQL Query:
+"""
+
+
+def read_prompt_template(path=PROMPT_TEMPLATE_FILE):
+    """The SQL prompt template in path, or the built-in one when the file is missing"""
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return DEFAULT_PROMPT_TEMPLATE
+
+
+def relevant_columns(profile, user_question, top_k=DEFAULT_COLUMN_TOP_K):
+    """Columns the question most likely needs, most relevant first, or None to send the schema alone"""
+    if not user_question or profile.column_count <= top_k:
+        return None
+    try:
+        columns = get_column_index(profile).top_columns(user_question, top_k)
+    except Exception as e:
+        logger.warning("Column retrieval failed, sending the schema without focus: %s", e)
+        return None
+    return tuple(columns) or None
+
+
+def schema_prompt_for(profile, user_question, prompt_template, token_budget=DEFAULT_TOKEN_BUDGET,
+                      top_k=DEFAULT_COLUMN_TOP_K):
+    """Schema block for a question, fitted to what the template leaves of token_budget
+
+    The block itself depends only on the dataset; on datasets wider than
+    top_k part of the budget is kept for describing the question's columns
+    after it.
+    """
+    budget = schema_token_budget(token_budget, prompt_template, SYSTEM_MESSAGE)
+    stable_budget = int(budget * (1 - FOCUS_TOKEN_SHARE)) if profile.column_count > top_k else budget
+    stable = build_schema_prompt(profile, stable_budget)
+    return focus_schema_prompt(stable, profile, relevant_columns(profile, user_question, top_k), budget)
+
+
+def favorite_matches(favorite, profile):
+    """Whether a favorite's stored SQL was written for this dataset's schema"""
+    saved_fingerprint = favorite.get("schema_fingerprint")
+    return not saved_fingerprint or saved_fingerprint == profile.schema_fingerprint
+
+
+def format_result(handle, max_listed_rows=MAX_LISTED_RESULT_ROWS):
+    """Format the query result for display"""
+    if handle is None or handle.total_rows == 0:
+        return "No results found."
+    
+    total_rows = handle.total_rows
+    result = handle.page(0)
+    
+    # Check if this is a single count result (common for null checks, totals, etc.)
+    if total_rows == 1 and len(result.columns) == 1:
+        # Single value result
+        value = result.iloc[0, 0]
+        column_name = result.columns[0]
+        return f"**Result:** {value}"
+    
+    # Check if this looks like a null count result (all numeric values in first row)
+    elif total_rows == 1 and all(isinstance(val, (int, float)) for val in result.iloc[0]):
+        # This is likely a count result - format it nicely
+        result_text = "**Null Count Results:**\n\n"
+        
+        # Check if these are null counts (columns with "_nulls" suffix)
+        null_columns = [col for col in result.columns if '_nulls' in col.lower()]
+        if null_columns:
+            # Format as null counts
+            for col, val in result.iloc[0].items():
+                if hasattr(val, 'item'):
+                    val = val.item()
+                # Clean up column name for display
+                clean_name = col.replace('_nulls', '').replace('_', ' ').title()
+                result_text += f"• **{clean_name}**: {val} null values\n"
+        else:
+            # Format as general counts
+            for col, val in result.iloc[0].items():
+                if hasattr(val, 'item'):
+                    val = val.item()
+                result_text += f"• **{col}**: {val}\n"
+        
+        return result_text
+    
+    # Check if this looks like a malformed result (all column names as headers)
+    elif total_rows == 1 and len(result.columns) > 10 and all(str(val).isdigit() for val in result.iloc[0]):
+        # This might be a malformed query result - try to interpret it as counts
+        result_text = "**Results (interpreted as counts):**\n\n"
+        for col, val in result.iloc[0].items():
+            if hasattr(val, 'item'):
+                val = val.item()
+            result_text += f"• **{col}**: {val}\n"
+        return result_text
+    
+    # Check if this is a null count result with multiple rows (one per column)
+    elif total_rows > 1 and len(result.columns) == 1 and 'null_count' in str(result.columns[0]).lower():
+        # This is likely a null count query that returned multiple rows
+        result_text = "**Null Count Results:**\n\n"
+        for i, (idx, row) in enumerate(handle.head(max_listed_rows).iterrows()):
+            val = row.iloc[0]
+            if hasattr(val, 'item'):
+                val = val.item()
+            result_text += f"• **Column {i + 1}**: {val} null values\n"
+        return result_text
+    
+    # Check if this is a simple count result with multiple rows
+    elif total_rows > 1 and len(result.columns) == 1:
+        # This might be a count query that returned multiple rows
+        result_text = "**Count Results:**\n\n"
+        for i, (idx, row) in enumerate(handle.head(max_listed_rows).iterrows()):
+            val = row.iloc[0]
+            if hasattr(val, 'item'):
+                val = val.item()
+            result_text += f"• **Count {i + 1}**: {val}\n"
+        return result_text
+    
+    else:
+        # Regular table result - keep the first page and the handle to fetch the others
+        return {
+            "type": "table",
+            "data": result,
+            "rows": total_rows,
+            "result": handle,
+            "message": f"**Results ({total_rows} rows):**"
+        }
+
+
+class Pipeline:
+    """Answers questions about one dataset; safe to share between threads
+
+    The query engine serializes access to its connection, and profiles and
+    schema prompts come from the shared caches, so one Pipeline can serve
+    concurrent requests for the same dataset.
+    """
+
+    def __init__(self, df, gateway, cache=None, token_budget=DEFAULT_TOKEN_BUDGET, top_k=DEFAULT_COLUMN_TOP_K,
+                 approximate=False, engine_name=None, prompt_template=None, isolated=False,
+                 repair_attempts=DEFAULT_MAX_ATTEMPTS, result_cache=None, engine=None,
+                 select_star_limit=DEFAULT_SELECT_STAR_LIMIT, use_intents=True):
+        self.df = df
+        self.gateway = gateway
+        self.cache = cache
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.approximate = approximate
+        self.engine_name = engine_name
+        self.repair_attempts = repair_attempts
+        self.select_star_limit = select_star_limit
+        # Recognized common questions are answered from the data without the model (see intents)
+        self.use_intents = use_intents
+        self.prompt_template = prompt_template or read_prompt_template()
+        self.results = result_cache if result_cache is not None else ResultCache()
+        # isolated runs SQL in a worker process with a timeout, row limit and memory cap;
+        # a caller's engine for df is shared and stays the caller's to close
+        self._owns_engine = engine is None
+        if engine is None:
+            engine = WorkerQueryEngine(df, engine_name) if isolated else create_query_engine(df, engine_name)
+        self.engine = engine
+
+    @property
+    def profile(self):
+        return get_profile(self.df, approximate=self.approximate)
+
+    def schema_prompt(self, user_question=None):
+        return schema_prompt_for(self.profile, user_question, self.prompt_template, self.token_budget, self.top_k)
+
+    def render_prompt(self, user_question):
+        """The full prompt for a question and the schema block in it"""
+        schema_prompt = self.schema_prompt(user_question)
+        return self.prompt_template.format(schema_info=schema_prompt.text, user_question=user_question), schema_prompt
+
+    def generate_sql(self, user_question):
+        """Ask the model for SQL; returns (sql_query, token counts of the prompt)"""
+        prompt, schema_prompt = self.render_prompt(user_question)
+        tokens = measure_prompt(prompt, user_question, SYSTEM_MESSAGE, schema_prompt)
+        sql_query = request_sql(self.gateway, prompt, schema_prompt.text, user_question, cache=self.cache)
+        return sql_query, tokens
+
+    def validate(self, sql_query):
+        """Check and repair SQL before it runs; raises SQLValidationError"""
+        return validate_sql(sql_query, self.df.columns, get_schema_checker(self.df, self.engine_name),
+                            self.select_star_limit)
+
+    def execute(self, sql_query):
+        """Validate and run SQL on the dataset; returns a ResultHandle of the (possibly rewritten) SQL
+
+        Statements that already ran on this dataset are answered from the
+        result cache.
+        """
+        fingerprint = self.profile.fingerprint
+        result = self.results.get(sql_query, fingerprint)
+        if result is None:
+            result = ResultHandle(self.engine, self.validate(sql_query).sql)
+            self.results.put(sql_query, fingerprint, result)
+            self.results.put(result.sql_query, fingerprint, result)
+        return result
+
+    def repair(self, user_question, sql_query, error, check=None):
+        """Have the model fix SQL that failed with error; returns (sql_query, result, repair log)
+
+        Candidates are run with check(sql), by default execute().
+        """
+        prompt, schema_prompt = self.render_prompt(user_question)
+        return repair_sql(self.gateway, prompt, sql_query, error, check or self.execute, question=user_question,
+                          max_attempts=self.repair_attempts, cache=self.cache, schema_info=schema_prompt.text)
+
+    def run(self, user_question, sql_query):
+        """Execute generated SQL, repairing it when it fails; returns (sql_query, result, repair log)"""
+        try:
+            result = self.execute(sql_query)
+        except QueryAbortedError:
+            # Stopped for time or size, not broken: a rewrite would likely be stopped too
+            raise
+        except Exception as e:
+            if not self.repair_attempts:
+                raise
+            _, result, log = self.repair(user_question, sql_query, e)
+            if result is None:
+                raise
+            return result.sql_query, result, log.as_dict()
+        return result.sql_query, result, None
+
+    def answer_intent(self, user_question):
+        """Answer a recognized common question from the data; returns (intent name, result) or (None, None)"""
+        match = match_intent(user_question, self.df) if self.use_intents else None
+        if match is None:
+            return None, None
+        return match.name, match.answer(self.df, self.profile)
+
+    def ask(self, user_question):
+        """Answer a question, generating and running SQL unless the intent catalog knows it
+
+        Returns a dict with the SQL, the ResultHandle, the prompt's token
+        counts, the matched intent and, when the first query failed, the
+        repair log; 'result' is None when the model returned no SQL.
+        """
+        intent, result = self.answer_intent(user_question)
+        if result is not None:
+            return {"question": user_question, "sql_query": result.sql_query, "result": result,
+                    "tokens": None, "replayed": False, "repair": None, "intent": intent}
+        sql_query, tokens = self.generate_sql(user_question)
+        result, repair = None, None
+        if sql_query:
+            sql_query, result, repair = self.run(user_question, sql_query)
+        return {"question": user_question, "sql_query": sql_query, "result": result,
+                "tokens": tokens, "replayed": False, "repair": repair, "intent": None}
+
+    def replay(self, favorite):
+        """Run a favorite's stored SQL; None when the schema changed or the SQL no longer runs"""
+        if not favorite_matches(favorite, self.profile):
+            return None
+        try:
+            return self.execute(favorite["sql_query"])
+        except Exception as e:
+            logger.info("Stored SQL of favorite failed, regenerating: %s", e)
+            return None
+
+    def run_favorite(self, favorite):
+        """Replay a favorite, regenerating its SQL when it cannot be replayed"""
+        if self.use_intents and match_intent(favorite["question"], self.df) is not None:
+            # Known questions are answered from the data, whatever SQL was saved
+            return self.ask(favorite["question"])
+        result = self.replay(favorite)
+        if result is None:
+            return self.ask(favorite["question"])
+        return {"question": favorite["question"], "sql_query": result.sql_query, "result": result,
+                "tokens": None, "replayed": True, "repair": None, "intent": None}
+
+    def close(self):
+        # Cached results read from the engine, so they go with it
+        if self._owns_engine:
+            self.results.clear()
+            self.engine.close()
@@ -0,0 +1,109 @@
+"""Dataset profile computed once per dataset and shared by every view of it"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from data_chat.query_engine import dataset_fingerprint
+from data_chat.sketches import HyperLogLog, approximate_distinct_counts
+
+PROFILE_CACHE_SIZE = 8
+TOP_VALUES = 3
+TOP_VALUES_MAX_UNIQUE = 1000
+
+
+def schema_fingerprint(df):
+    """Hash of column names and dtypes, stable while the data itself changes"""
+    digest = hashlib.sha1()
+    for col, dtype in df.dtypes.items():
+        digest.update(f"{col}\x00{dtype}\x01".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ColumnProfile:
+    """Per-column statistics used by the schema prompt, help panel and reports"""
+
+    def __init__(self, series, unique_count=None):
+        self.name = series.name
+        self.dtype = str(series.dtype)
+        self.null_count = int(series.isnull().sum())
+        self.unique_count = int(series.nunique()) if unique_count is None else unique_count
+        self.sample_values = [str(v) for v in series.dropna().head(5).tolist()]
+        # Most frequent values of code-like columns, for the schema prompt
+        self.top_values = self.sample_values[:TOP_VALUES]
+        if (isinstance(series.dtype, pd.CategoricalDtype) or self.unique_count <= TOP_VALUES_MAX_UNIQUE) and self.unique_count:
+            self.top_values = [str(v) for v in series.value_counts().head(TOP_VALUES).index.tolist()]
+        self.min = self.max = self.mean = self.std = None
+        self.is_numeric = pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+        if self.is_numeric and self.null_count < len(series):
+            self.min = float(series.min())
+            self.max = float(series.max())
+            self.mean = float(series.mean())
+            self.std = float(series.std())
+
+
+class DatasetProfile:
+    """Everything the app derives from a dataset's contents, computed in one go"""
+
+    def __init__(self, df, fingerprint=None, approximate=False):
+        self.fingerprint = fingerprint or dataset_fingerprint(df)
+        self.schema_fingerprint = schema_fingerprint(df)
+        self.rows = len(df)
+        self.column_count = len(df.columns)
+        # Approximate mode counts distinct values with HyperLogLog sketches
+        # instead of nunique(), which holds every distinct value in memory
+        self.approximate = approximate
+        self.distinct_relative_error = HyperLogLog().relative_error if approximate else 0.0
+        unique_counts = approximate_distinct_counts(df) if approximate else {}
+        self.columns = [ColumnProfile(df[col], unique_counts.get(col)) for col in df.columns]
+        self.memory_usage_bytes = int(df.memory_usage(deep=True).sum())
+        self.null_values_total = sum(col.null_count for col in self.columns)
+
+    @property
+    def missing_by_column(self):
+        return {col.name: col.null_count for col in self.columns}
+
+
+class ProfileCache:
+    """Small LRU cache of per-dataset results keyed by content fingerprint
+
+    factory(df, fingerprint) builds the cached object; by default a
+    DatasetProfile.
+    """
+
+    def __init__(self, maxsize=PROFILE_CACHE_SIZE, factory=None):
+        self.maxsize = maxsize
+        self.factory = factory or DatasetProfile
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df):
+        """Return the cached object for df, computing it on first use"""
+        fingerprint = dataset_fingerprint(df)
+        with self._lock:
+            profile = self._profiles.get(fingerprint)
+            if profile is not None:
+                self._profiles.move_to_end(fingerprint)
+                return profile
+
+        profile = self.factory(df, fingerprint)
+        with self._lock:
+            self._profiles[fingerprint] = profile
+            self._profiles.move_to_end(fingerprint)
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def __len__(self):
+        return len(self._profiles)
+
+
+_profile_cache = ProfileCache()
+_approximate_profile_cache = ProfileCache(factory=lambda df, fingerprint: DatasetProfile(df, fingerprint, approximate=True))
+
+
+def get_profile(df, approximate=False):
+    """Return the cached profile of a dataset, optionally with sketch-based distinct counts"""
+    return (_approximate_profile_cache if approximate else _profile_cache).get(df)
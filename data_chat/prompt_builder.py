@@ -0,0 +1,211 @@
+"""Schema text for the SQL prompt, fitted to a token budget
+
+The schema block is built from the cached DatasetProfile instead of dumping
+every column and df.head(3). Columns are described at the most detailed
+level that fits the budget: first with null/unique counts and
+representative values (most frequent codes, numeric ranges), then name and
+type only, and finally only the best-ranked columns in detail with the rest
+listed by name.
+
+This block depends only on the dataset and the budget, never on the
+question, and the prompt template puts the question last. Every request on
+a dataset therefore starts with the same prefix, which lets provider-side
+prompt caching reuse it. On wide datasets the columns a question needs are
+described in full in a short hint appended after the block (see
+focus_schema_prompt), so only the end of the prompt changes per question.
+"""
+
+import functools
+import math
+
+DEFAULT_TOKEN_BUDGET = 3000
+# Room kept free for the question, which follows the stable schema prefix
+QUESTION_TOKEN_RESERVE = 200
+MAX_VALUE_CHARS = 30
+# Share of a wide dataset's schema budget kept for the question's columns after the stable block
+FOCUS_TOKEN_SHARE = 0.3
+FOCUS_HEADER = "\nColumns most relevant to the question:\n"
+
+
+@functools.lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """Tokens in text; exact with tiktoken installed, else about 4 characters per token"""
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def schema_token_budget(total_budget, prompt_template, system_message=""):
+    """Tokens left for the schema block once the template, system message and question are accounted for"""
+    fixed = prompt_template.replace("{schema_info}", "").replace("{user_question}", "")
+    return total_budget - count_tokens(fixed) - count_tokens(system_message) - QUESTION_TOKEN_RESERVE
+
+
+def rank_columns(profile):
+    """Column names, most useful first: populated columns before mostly empty ones"""
+    rows = max(1, profile.rows)
+    order = {col.name: i for i, col in enumerate(profile.columns)}
+    return [col.name for col in sorted(
+        profile.columns, key=lambda col: (col.null_count / rows, order[col.name])
+    )]
+
+
+def _short(value):
+    value = str(value)
+    return value if len(value) <= MAX_VALUE_CHARS else value[:MAX_VALUE_CHARS - 1] + "…"
+
+
+def describe_values(col):
+    """Numeric range, or the most frequent values of a text column"""
+    if col.is_numeric and col.min is not None:
+        return f"range {col.min:g} to {col.max:g}"
+    if col.top_values:
+        return "e.g. " + ", ".join(_short(v) for v in col.top_values)
+    return "all null"
+
+
+def describe_column(col, detail, approximate=False):
+    if detail == "full":
+        unique_prefix = "~" if approximate else ""
+        return (f"- {col.name}: {col.dtype}, {col.null_count} null values, "
+                f"{unique_prefix}{col.unique_count} unique values, {describe_values(col)}")
+    return f"- {col.name}: {col.dtype}"
+
+
+class SchemaPrompt:
+    """Schema block for one dataset and budget, with what was left out
+
+    stable_text is the question-independent start of text; focus names the
+    columns described after it for one question.
+    """
+
+    def __init__(self, text, detail, omitted, focus=(), stable_text=None):
+        self.text = text
+        self.detail = detail
+        self.omitted = omitted
+        self.focus = tuple(focus)
+        self.stable_text = text if stable_text is None else stable_text
+        self.tokens = count_tokens(text)
+
+
+def _header(profile):
+    return (
+        "Database Schema:\n"
+        "Table name: 'df' (DataFrame)\n"
+        f"Number of rows: {profile.rows}\n"
+        f"Number of columns: {profile.column_count}\n\n"
+        "Columns:\n"
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def build_schema_prompt(profile, token_budget=DEFAULT_TOKEN_BUDGET, ranking=None):
+    """Render the schema block of profile within token_budget
+
+    ranking is an optional tuple of column names, most relevant first; it
+    decides which columns keep a description when not all of them fit.
+    Columns always appear in dataset order.
+    """
+    header = _header(profile)
+    approximate = getattr(profile, "approximate", False)
+
+    for detail in ("full", "compact"):
+        lines = [describe_column(col, detail, approximate) for col in profile.columns]
+        text = header + "\n".join(lines) + "\n"
+        if count_tokens(text) <= token_budget:
+            return SchemaPrompt(text, detail, [])
+
+    # Not even one line per column fits: name every column on one line and
+    # spend what is left describing the best-ranked ones
+    ranking = list(ranking or rank_columns(profile))
+    by_name = {col.name: col for col in profile.columns}
+    remaining = token_budget - count_tokens(header)
+
+    # Drop the lowest-ranked names until the name list itself fits
+    named = list(ranking)
+    while len(named) > 1 and count_tokens("Other columns: " + ", ".join(named) + " (and 9999 more)") > remaining:
+        named.pop()
+    omitted = [name for name in ranking if name not in set(named)]
+    remaining -= count_tokens("Other columns: " + ", ".join(named) + (f" (and {len(omitted)} more)" if omitted else ""))
+
+    described = set()
+    for name in named:
+        cost = count_tokens(describe_column(by_name[name], "compact") + "\n")
+        if cost > remaining:
+            break
+        described.add(name)
+        remaining -= cost
+
+    lines = [describe_column(col, "compact") for col in profile.columns if col.name in described]
+    others = [col.name for col in profile.columns if col.name in set(named) and col.name not in described]
+    if others:
+        lines.append("Other columns: " + ", ".join(others) + (f" (and {len(omitted)} more)" if omitted else ""))
+    return SchemaPrompt(header + "\n".join(lines) + "\n", "names", omitted)
+
+
+def focus_schema_prompt(stable, profile, focus, token_budget):
+    """The stable block followed by full descriptions of the focus columns, within token_budget
+
+    focus lists the columns a question needs, most relevant first; the
+    least relevant are left out when they do not all fit. A block that
+    already describes every column in full is returned unchanged.
+    """
+    if not focus or stable.detail == "full":
+        return stable
+    by_name = {col.name: col for col in profile.columns}
+    approximate = getattr(profile, "approximate", False)
+    remaining = token_budget - stable.tokens - count_tokens(FOCUS_HEADER)
+    lines = []
+    for name in focus:
+        line = describe_column(by_name[name], "full", approximate) + "\n"
+        cost = count_tokens(line)
+        if cost > remaining:
+            break
+        lines.append((name, line))
+        remaining -= cost
+    if not lines:
+        return stable
+    return SchemaPrompt(stable.text + FOCUS_HEADER + "".join(line for _, line in lines), stable.detail,
+                        stable.omitted, focus=[name for name, _ in lines], stable_text=stable.text)
+
+
+def stable_prefix(text, user_question=None):
+    """Start of a prompt (or schema block) before anything specific to one question
+
+    That is everything before the focus hint or, without one, before the
+    question itself.
+    """
+    ends = [text.find(FOCUS_HEADER)]
+    if user_question:
+        # The question comes last, so a column named like it cannot cut the schema short
+        ends.append(text.rfind(user_question))
+    ends = [end for end in ends if end != -1]
+    return text[:min(ends)] if ends else text
+
+
+def measure_prompt(prompt, user_question, system_message="", schema_prompt=None):
+    """Token counts of one request: total, the question-independent prefix, and the schema"""
+    # The prefix ends where the question, or the schema's hint for it, begins
+    marker = schema_prompt.text[len(schema_prompt.stable_text):] if schema_prompt else ""
+    marker = marker or user_question
+    prefix = prompt.split(marker)[0] if marker and marker in prompt else prompt
+    return {
+        'prompt_tokens': count_tokens(system_message) + count_tokens(prompt),
+        'stable_prefix_tokens': count_tokens(system_message) + count_tokens(prefix),
+        'schema_tokens': schema_prompt.tokens if schema_prompt else None,
+        'schema_detail': schema_prompt.detail if schema_prompt else None,
+        'columns_omitted': len(schema_prompt.omitted) if schema_prompt else 0,
+        'focus_columns': len(schema_prompt.focus) if schema_prompt else 0
+    }
@@ -0,0 +1,301 @@
+"""Data quality metrics computed in one vectorized pass per dataset
+
+Both the Data Quality Dashboard and the developer report read a
+QualityMetrics object from the cache below instead of rescanning the
+frame themselves.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_chat.profile import ProfileCache
+from data_chat.sketches import DuplicateEstimator, QuantileSketch, hash_values, iter_chunks
+
+QUALITY_CACHE_SIZE = 8
+OUTLIER_Z_SCORE = 3
+
+
+def quality_score(percent_missing, percent_duplicates, percent_outliers):
+    """Data Quality Score: 100 minus a weighted sum of issue percentages"""
+    score = 100 - (percent_missing * 0.5 + percent_duplicates * 0.3 + percent_outliers * 0.2)
+    return max(0, min(100, round(score, 1)))
+
+
+def merge_moments(state, count, mean, m2):
+    """Merge a batch's (count, mean, M2) into a running [count, mean, M2, ...] state (Chan et al.)"""
+    n_a, mean_a, m2_a = state[0], state[1], state[2]
+    n = n_a + count
+    delta = mean - mean_a
+    state[0] = n
+    state[1] = mean_a + delta * count / n
+    state[2] = m2_a + m2 + delta * delta * n_a * count / n
+
+
+def batch_moments(values):
+    """Per-column non-null count, mean, M2, min and max of a 2D float array"""
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # All-null columns produce "mean of empty slice" warnings
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        counts = (~np.isnan(values)).sum(axis=0)
+        means = np.nanmean(values, axis=0)
+        m2s = np.nansum((values - means) ** 2, axis=0)
+        mins = np.nanmin(values, axis=0)
+        maxs = np.nanmax(values, axis=0)
+    return counts, means, m2s, mins, maxs
+
+
+def numeric_columns(df):
+    """Numeric columns checked for outliers (booleans excluded)"""
+    return [col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col].dtype) and not pd.api.types.is_bool_dtype(df[col].dtype)]
+
+
+class QualityMetrics:
+    """Missing values, duplicates, per-column stats and z-score outliers of a dataset"""
+
+    def __init__(self, df, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.rows, self.column_count = df.shape
+        cells = self.rows * self.column_count
+
+        # Missing values: one isna() pass over the whole frame
+        self.missing = df.isna().sum()
+        self.total_missing = int(self.missing.sum())
+        self.percent_missing = (self.total_missing / cells) * 100 if cells else 0
+
+        # Duplicates: 64-bit row hashes, then a single duplicated() over them
+        if self.rows:
+            row_hashes = pd.util.hash_pandas_object(df, index=False)
+            self.duplicates = int(row_hashes.duplicated().sum())
+        else:
+            self.duplicates = 0
+        self.percent_duplicates = (self.duplicates / self.rows) * 100 if self.rows else 0
+
+        # Numeric stats and outliers on one 2D array for all numeric columns
+        self.column_stats = {}
+        self.outliers = {}
+        columns = numeric_columns(df)
+        if columns and self.rows:
+            values = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+            with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+                # All-null columns produce "mean of empty slice" warnings
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                means = np.nanmean(values, axis=0)
+                stds = np.nanstd(values, axis=0)
+                outlier_counts = (np.abs(values - means) > OUTLIER_Z_SCORE * stds).sum(axis=0)
+                mins = np.nanmin(values, axis=0)
+                maxs = np.nanmax(values, axis=0)
+            for i, col in enumerate(columns):
+                self.outliers[col] = int(outlier_counts[i])
+                if not np.isnan(means[i]):
+                    self.column_stats[col] = {
+                        'mean': float(means[i]),
+                        'std': float(stds[i]),
+                        'min': float(mins[i]),
+                        'max': float(maxs[i])
+                    }
+        self.total_outliers = sum(self.outliers.values())
+        self.percent_outliers = (
+            (self.total_outliers / (self.rows * len(self.outliers))) * 100 if self.outliers and self.rows else 0
+        )
+
+        self.score = quality_score(self.percent_missing, self.percent_duplicates, self.percent_outliers)
+
+
+_quality_cache = ProfileCache(QUALITY_CACHE_SIZE, factory=QualityMetrics)
+
+
+def get_quality_metrics(df):
+    """Return the memoized quality metrics of a dataset"""
+    return _quality_cache.get(df)
+
+
+class IncrementalQualityMetrics:
+    """Quality metrics maintained batch by batch for datasets that grow by appends
+
+    update() only looks at the new rows: null counts are added, numeric
+    mean/variance are merged with the running values (Welford/Chan), and
+    duplicate rows are found by binary search in the sorted array of 64-bit
+    digests of every row seen so far, into which a batch's new digests are
+    inserted without sorting the whole array again. Outliers in a batch are judged against the
+    running mean/std after that batch is merged; earlier rows are not
+    re-judged, so outlier counts are an approximation once stats drift.
+    Exposes the same attributes as QualityMetrics.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = None
+        self.null_counts = None
+        self.duplicates = 0
+        self.batches = 0
+        self._digests = np.empty(0, dtype="uint64")
+        # Per numeric column: count, mean, M2 (sum of squared deviations), min, max
+        self._numeric = {}
+        self.outliers = {}
+
+    def update(self, batch):
+        """Fold a batch of new rows into the running metrics"""
+        if self.columns is None:
+            self.columns = list(batch.columns)
+            self.null_counts = pd.Series(0, index=self.columns, dtype="int64")
+            self.outliers = {col: 0 for col in numeric_columns(batch)}
+            self._numeric = {col: [0, 0.0, 0.0, np.inf, -np.inf] for col in self.outliers}
+        elif list(batch.columns) != self.columns:
+            raise ValueError("Appended batch has different columns than the dataset")
+        if len(batch) == 0:
+            return self
+
+        self.null_counts += batch.isna().sum()
+
+        digests = pd.util.hash_pandas_object(batch, index=False).to_numpy()
+        # Binary search in the sorted digests seen so far: O(batch * log(seen)), no re-sort
+        positions = np.searchsorted(self._digests, digests)
+        seen_before = np.zeros(len(digests), dtype=bool)
+        found = positions < len(self._digests)
+        seen_before[found] = self._digests[positions[found]] == digests[found]
+        repeated_in_batch = pd.Series(digests).duplicated().to_numpy()
+        self.duplicates += int((seen_before | repeated_in_batch).sum())
+        new_digests = np.unique(digests[~seen_before])
+        self._digests = np.insert(self._digests, np.searchsorted(self._digests, new_digests), new_digests)
+
+        columns = list(self._numeric)
+        if columns:
+            values = batch[columns].to_numpy(dtype="float64", na_value=np.nan)
+            counts, means, m2s, mins, maxs = batch_moments(values)
+            for i, col in enumerate(columns):
+                if counts[i] == 0:
+                    continue
+                state = self._numeric[col]
+                merge_moments(state, int(counts[i]), float(means[i]), float(m2s[i]))
+                state[3] = min(state[3], float(mins[i]))
+                state[4] = max(state[4], float(maxs[i]))
+                std = np.sqrt(state[2] / state[0])
+                with np.errstate(invalid="ignore"):
+                    self.outliers[col] += int((np.abs(values[:, i] - state[1]) > OUTLIER_Z_SCORE * std).sum())
+
+        self.rows += len(batch)
+        self.batches += 1
+        return self
+
+    @property
+    def column_count(self):
+        return len(self.columns or [])
+
+    @property
+    def missing(self):
+        return self.null_counts if self.null_counts is not None else pd.Series(dtype="int64")
+
+    @property
+    def total_missing(self):
+        return int(self.missing.sum())
+
+    @property
+    def percent_missing(self):
+        cells = self.rows * self.column_count
+        return (self.total_missing / cells) * 100 if cells else 0
+
+    @property
+    def percent_duplicates(self):
+        return (self.duplicates / self.rows) * 100 if self.rows else 0
+
+    @property
+    def column_stats(self):
+        return {
+            col: {'mean': mean, 'std': float(np.sqrt(m2 / n)), 'min': low, 'max': high}
+            for col, (n, mean, m2, low, high) in self._numeric.items() if n
+        }
+
+    @property
+    def total_outliers(self):
+        return sum(self.outliers.values())
+
+    @property
+    def percent_outliers(self):
+        if not self.outliers or not self.rows:
+            return 0
+        return (self.total_outliers / (self.rows * len(self.outliers))) * 100
+
+    @property
+    def score(self):
+        return quality_score(self.percent_missing, self.percent_duplicates, self.percent_outliers)
+
+
+class ApproximateQualityMetrics:
+    """QualityMetrics estimated from fixed-size sketches, for datasets too large to scan exactly
+
+    Missing values, mean, std, min and max are still exact (they stream in
+    constant memory). Duplicates come from a Bloom filter over row digests and
+    outlier counts from the share of a uniform sample beyond mean ± 3 std.
+    error_bounds holds the 95% error of each estimate.
+    """
+
+    approximate = True
+
+    def __init__(self, df, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.rows, self.column_count = df.shape
+        cells = self.rows * self.column_count
+        columns = numeric_columns(df)
+        self.missing = pd.Series(0, index=df.columns, dtype="int64")
+        duplicates = DuplicateEstimator(self.rows)
+        sketches = {col: QuantileSketch() for col in columns}
+        moments = {col: [0, 0.0, 0.0, np.inf, -np.inf] for col in columns}
+
+        for chunk in iter_chunks(df):
+            self.missing += chunk.isna().sum()
+            duplicates.add_hashes(hash_values(chunk))
+            if columns:
+                values = chunk[columns].to_numpy(dtype="float64", na_value=np.nan)
+                counts, means, m2s, mins, maxs = batch_moments(values)
+                for i, col in enumerate(columns):
+                    sketches[col].add(values[:, i])
+                    if counts[i]:
+                        merge_moments(moments[col], int(counts[i]), float(means[i]), float(m2s[i]))
+                        moments[col][3] = min(moments[col][3], float(mins[i]))
+                        moments[col][4] = max(moments[col][4], float(maxs[i]))
+
+        self.total_missing = int(self.missing.sum())
+        self.percent_missing = (self.total_missing / cells) * 100 if cells else 0
+
+        self.duplicates = duplicates.estimate()
+        self.percent_duplicates = (self.duplicates / self.rows) * 100 if self.rows else 0
+
+        self.column_stats = {}
+        self.outliers = {}
+        outlier_bounds = {}
+        self.quantile_rank_error = 0.0
+        for col in columns:
+            count, mean, m2, low, high = moments[col]
+            if not count:
+                self.outliers[col] = 0
+                outlier_bounds[col] = 0
+                continue
+            std = float(np.sqrt(m2 / count))
+            self.column_stats[col] = {'mean': mean, 'std': std, 'min': low, 'max': high}
+            fraction, error = sketches[col].fraction_outside(mean - OUTLIER_Z_SCORE * std, mean + OUTLIER_Z_SCORE * std)
+            self.outliers[col] = int(round(fraction * count))
+            outlier_bounds[col] = int(np.ceil(error * count))
+            self.quantile_rank_error = max(self.quantile_rank_error, sketches[col].rank_error())
+
+        self.total_outliers = sum(self.outliers.values())
+        self.percent_outliers = (
+            (self.total_outliers / (self.rows * len(self.outliers))) * 100 if self.outliers and self.rows else 0
+        )
+        self.error_bounds = {
+            'duplicates': duplicates.error_bound,
+            'outliers': outlier_bounds,
+            'total_outliers': sum(outlier_bounds.values())
+        }
+
+        self.score = quality_score(self.percent_missing, self.percent_duplicates, self.percent_outliers)
+
+
+_approximate_quality_cache = ProfileCache(QUALITY_CACHE_SIZE, factory=ApproximateQualityMetrics)
+
+
+def get_approximate_quality_metrics(df):
+    """Return the memoized sketch-based quality metrics of a dataset"""
+    return _approximate_quality_cache.get(df)
@@ -0,0 +1,307 @@
+"""Pluggable SQL engines used to answer questions about a loaded DataFrame
+
+The engine is chosen per deployment with the QUERY_ENGINE environment
+variable (see ENGINES); SQLite is the default.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import weakref
+
+import pandas as pd
+
+TABLE_NAME = "df"
+DEFAULT_ENGINE = "sqlite"
+# SQLite's NULL placement: first when sorting ascending, last when descending
+DUCKDB_NULL_ORDER = "nulls_first_on_asc_last_on_desc"
+
+# id(df) -> (weakref to df, fingerprint, hash state). The app never mutates a
+# loaded DataFrame in place, so an object's fingerprint stays valid for its lifetime.
+_fingerprints = {}
+
+
+def _remember(df, digest):
+    fingerprint = digest.hexdigest()
+    key = id(df)
+    _fingerprints[key] = (weakref.ref(df, lambda _ref: _fingerprints.pop(key, None)), fingerprint, digest)
+    return fingerprint
+
+
+def dataset_fingerprint(df):
+    """Return a content hash of the DataFrame (memoized per object)"""
+    entry = _fingerprints.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+
+    digest = hashlib.sha1()
+    for col, dtype in df.dtypes.items():
+        digest.update(f"{col}\x00{dtype}\x01".encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return _remember(df, digest)
+
+
+def extend_fingerprint(df, combined):
+    """Fingerprint of combined, which is df followed by new rows, hashing only the new rows
+
+    Equal to dataset_fingerprint(combined). Falls back to hashing everything
+    when the dtypes changed or df's hash is not known.
+    """
+    entry = _fingerprints.get(id(df))
+    if entry is None or entry[0]() is not df or not combined.dtypes.equals(df.dtypes):
+        return dataset_fingerprint(combined)
+    digest = entry[2].copy()
+    digest.update(pd.util.hash_pandas_object(combined.iloc[len(df):], index=False).values.tobytes())
+    return _remember(combined, digest)
+
+
+def translate_identifiers(sql_query):
+    """Rewrite [Column Name] and `Column Name` identifiers as "Column Name"
+
+    The system prompt asks the model for SQLite-style bracket quoting, which
+    engines such as DuckDB do not understand. String literals and already
+    double-quoted identifiers are copied through untouched.
+    """
+    out = []
+    i = 0
+    n = len(sql_query)
+    while i < n:
+        ch = sql_query[i]
+        if ch in ("'", '"'):
+            # Copy a literal or quoted identifier, honouring doubled quotes
+            j = i + 1
+            while j < n:
+                if sql_query[j] == ch:
+                    if j + 1 < n and sql_query[j + 1] == ch:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            out.append(sql_query[i:j + 1])
+            i = j + 1
+        elif ch in ("[", "`"):
+            closing = "]" if ch == "[" else "`"
+            j = sql_query.find(closing, i + 1)
+            if j == -1:
+                out.append(sql_query[i:])
+                break
+            name = sql_query[i + 1:j].replace('"', '""')
+            out.append(f'"{name}"')
+            i = j + 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def strip_statement(sql_query):
+    """Drop surrounding whitespace and trailing semicolons so a query can be nested"""
+    return sql_query.strip().rstrip(";").strip()
+
+
+def paged_query(sql_query, limit, offset=0):
+    """Wrap a query so only rows [offset, offset + limit) are produced"""
+    # Newlines keep a trailing -- comment from swallowing the closing parenthesis
+    return f"SELECT * FROM (\n{strip_statement(sql_query)}\n) AS result_page LIMIT {int(limit)} OFFSET {int(offset)}"
+
+
+def count_query(sql_query):
+    """Wrap a query so it returns only its number of rows"""
+    return f"SELECT COUNT(*) AS row_count FROM (\n{strip_statement(sql_query)}\n) AS result_rows"
+
+
+_SQL_TOKEN = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)|\w+|\S", re.DOTALL
+)
+_SELECT_LIST_END = {"from", "where", "group", "having", "window", "order", "limit",
+                    "union", "intersect", "except"}
+
+
+def select_items(sql_query):
+    """Text of each item in the query's top-level select list, or None when it has a *"""
+    depth = 0
+    items = None
+    start = None
+    end = len(sql_query)
+    for match in _SQL_TOKEN.finditer(sql_query):
+        token = match.group()
+        lowered = token.lower()
+        if token.startswith(("--", "/*")):
+            continue
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth:
+            continue
+        elif items is None:
+            if lowered == "select":
+                items, start = [], match.end()
+        elif lowered in ("distinct", "all") and not sql_query[start:match.start()].strip() and not items:
+            start = match.end()
+        elif token == ",":
+            items.append(sql_query[start:match.start()])
+            start = match.end()
+        elif lowered in _SELECT_LIST_END:
+            end = match.start()
+            break
+    if items is None:
+        return None
+    items = [item.strip() for item in items + [sql_query[start:end]]]
+    if any(item == "*" or item.endswith(".*") for item in items):
+        return None
+    return items
+
+
+def sqlite_labels(sql_query, labels):
+    """Rename result columns the way SQLite labels them: unaliased expressions by their text
+
+    labels are the column names another engine gave the query's result,
+    such as DuckDB's count_star() for COUNT(*). Aliases and plain column
+    references keep their names; anything that cannot be matched up is
+    returned unchanged.
+    """
+    items = select_items(sql_query)
+    if items is None or len(items) != len(labels):
+        return list(labels)
+    renamed = []
+    for item, label in zip(items, labels):
+        tokens = _SQL_TOKEN.findall(item)
+        last = tokens[-1] if tokens else ""
+        if last[:1] in ('"', "`", "[") and len(last) > 1:
+            last = last[1:-1]
+        renamed.append(label if label == last else item)
+    return renamed
+
+
+class QueryEngine:
+    """Base class for engines that run generated SQL against one dataset"""
+
+    name = None
+
+    def __init__(self, df):
+        self.df = df
+        self.fingerprint = dataset_fingerprint(df)
+        self._lock = threading.Lock()
+
+    def matches(self, df):
+        """Check whether this engine already holds the given dataset"""
+        return df is self.df or dataset_fingerprint(df) == self.fingerprint
+
+    def execute(self, sql_query):
+        """Run a query against the table 'df' and return a DataFrame"""
+        raise NotImplementedError
+
+    def execute_page(self, sql_query, limit, offset=0):
+        """Return only one page of a query's rows"""
+        return self.execute(paged_query(sql_query, limit, offset))
+
+    def count_rows(self, sql_query):
+        """Number of rows a query returns, without fetching them"""
+        return int(self.execute(count_query(sql_query)).iloc[0, 0])
+
+    def iter_batches(self, sql_query, batch_rows):
+        """Yield a query's rows as DataFrames of at most batch_rows rows"""
+        result = self.execute(sql_query)
+        for start in range(0, len(result), batch_rows):
+            yield result.iloc[start:start + batch_rows]
+
+    def close(self):
+        pass
+
+
+class PandasqlQueryEngine(QueryEngine):
+    """Original behaviour: copy the DataFrame into a fresh SQLite database per query"""
+
+    name = "pandasql"
+
+    def execute(self, sql_query):
+        import pandasql as psql
+        return psql.sqldf(sql_query, {TABLE_NAME: self.df})
+
+
+class SQLiteQueryEngine(QueryEngine):
+    """Loads a DataFrame into SQLite once and reuses the connection for every query"""
+
+    name = "sqlite"
+
+    def __init__(self, df, database=":memory:"):
+        super().__init__(df)
+        # Streamlit reruns the script on different threads, so the connection
+        # is shared across threads and guarded by the lock instead.
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        with self._lock:
+            df.to_sql(TABLE_NAME, self._conn, index=False, if_exists="replace")
+
+    def execute(self, sql_query):
+        with self._lock:
+            return pd.read_sql_query(sql_query, self._conn)
+
+    def iter_batches(self, sql_query, batch_rows):
+        with self._lock:
+            yield from pd.read_sql_query(sql_query, self._conn, chunksize=batch_rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DuckDBQueryEngine(QueryEngine):
+    """Columnar, vectorized execution that scans the DataFrame in place"""
+
+    name = "duckdb"
+
+    def __init__(self, df):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("The duckdb query engine requires the 'duckdb' package (pip install duckdb)") from e
+        super().__init__(df)
+        self._conn = duckdb.connect(":memory:")
+        # register() exposes the DataFrame as a view; no data is copied
+        self._conn.register(TABLE_NAME, df)
+        # Sort NULLs and label columns as SQLite does, so results do not depend on the engine
+        self._conn.execute(f"SET default_null_order = '{DUCKDB_NULL_ORDER}'")
+
+    def _run(self, sql_query, labelled_as):
+        result = self._conn.execute(translate_identifiers(sql_query)).df()
+        result.columns = sqlite_labels(labelled_as, result.columns)
+        return result
+
+    def execute(self, sql_query):
+        with self._lock:
+            return self._run(sql_query, sql_query)
+
+    def execute_page(self, sql_query, limit, offset=0):
+        with self._lock:
+            return self._run(paged_query(sql_query, limit, offset), sql_query)
+
+    def iter_batches(self, sql_query, batch_rows):
+        with self._lock:
+            result = self._conn.execute(translate_identifiers(sql_query))
+            while True:
+                batch = result.fetch_df_chunk(max(1, batch_rows // 2048))
+                if batch.empty:
+                    break
+                batch.columns = sqlite_labels(sql_query, batch.columns)
+                yield batch
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (SQLiteQueryEngine, DuckDBQueryEngine, PandasqlQueryEngine)
+}
+
+
+def create_query_engine(df, engine_name=None):
+    """Create the configured query engine for a dataset"""
+    engine_name = (engine_name or os.getenv("QUERY_ENGINE") or DEFAULT_ENGINE).strip().lower()
+    if engine_name not in ENGINES:
+        raise ValueError(f"Unknown query engine '{engine_name}'. Choose one of: {', '.join(ENGINES)}")
+    return ENGINES[engine_name](df)
@@ -0,0 +1,312 @@
+"""Generated SQL run in a separate worker process, with limits
+
+A WorkerQueryEngine hands every query to a child process that holds its own
+copy of the dataset in the configured engine (see query_engine). The app
+waits for the answer in short polls, so a runaway query (a cartesian
+self-join from a "duplicate check", say) can be stopped:
+
+- after QUERY_TIMEOUT_SECONDS of wall-clock time
+- when a should_cancel() callback says the user has gone, or raises
+- when materializing it would exceed QUERY_MAX_ROWS rows
+- when it needs more than QUERY_MEMORY_LIMIT_MB on top of the loaded data
+  (an address-space limit on the worker, POSIX only)
+
+Stopping a query kills the worker and starts a fresh one in the background;
+the app's own process and memory are never affected.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+import pandas as pd
+
+from data_chat.query_engine import QueryEngine, create_query_engine
+
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_MAX_ROWS = 1_000_000
+DEFAULT_MEMORY_LIMIT_MB = 2048
+POLL_INTERVAL = 0.05
+# Rows fetched at a time while checking the row limit and streaming downloads
+FETCH_BATCH_ROWS = 50_000
+# A worker gets this long to load the dataset before it is considered broken
+STARTUP_TIMEOUT_SECONDS = 600
+
+
+class QueryAbortedError(Exception):
+    """A query was stopped before it finished; the message says why"""
+
+
+class QueryTimeoutError(QueryAbortedError):
+    pass
+
+
+class QueryCancelledError(QueryAbortedError):
+    pass
+
+
+class QueryRowLimitError(QueryAbortedError):
+    pass
+
+
+class QueryMemoryError(QueryAbortedError):
+    pass
+
+
+class QueryWorkerError(Exception):
+    """A query failed inside the worker; carries the engine's error message"""
+
+
+def _address_space():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _limit_memory(headroom_bytes):
+    """Cap the worker's address space at what it uses now plus headroom_bytes"""
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = _address_space() + headroom_bytes
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _read_limited(engine, sql_query, max_rows):
+    parts = []
+    rows = 0
+    for batch in engine.iter_batches(sql_query, FETCH_BATCH_ROWS):
+        rows += len(batch)
+        if max_rows and rows > max_rows:
+            raise QueryRowLimitError(
+                f"The query returns more than {max_rows:,} rows and was stopped. "
+                "Add a filter, an aggregation or a LIMIT."
+            )
+        parts.append(batch)
+    if not parts:
+        return engine.execute(sql_query)
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+
+def _error_reply(error):
+    if isinstance(error, QueryAbortedError):
+        return ("aborted", type(error).__name__, str(error))
+    if isinstance(error, MemoryError) or "out of memory" in str(error).lower():
+        return ("aborted", "QueryMemoryError", "The query needed more memory than the worker is allowed and was stopped")
+    return ("error", type(error).__name__, str(error))
+
+
+def _worker_main(conn, data_path, engine_name, memory_limit_bytes):
+    """Child process: load the dataset once, then answer requests until told to stop"""
+    try:
+        engine = create_query_engine(pd.read_pickle(data_path), engine_name)
+        if memory_limit_bytes:
+            _limit_memory(memory_limit_bytes)
+    except Exception as e:
+        conn.send(_error_reply(e))
+        return
+    conn.send(("ready",))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args = request
+        try:
+            if method == "execute":
+                conn.send(("ok", _read_limited(engine, *args)))
+            elif method == "page":
+                conn.send(("ok", engine.execute_page(*args)))
+            elif method == "count":
+                conn.send(("ok", engine.count_rows(*args)))
+            elif method == "batches":
+                for batch in engine.iter_batches(*args):
+                    conn.send(("batch", batch))
+                conn.send(("ok", None))
+        except Exception as e:
+            conn.send(_error_reply(e))
+    engine.close()
+
+
+def _discard_worker(process, directory):
+    """Stop a worker and delete its copy of the dataset once its engine is gone"""
+    if process.is_alive():
+        process.kill()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+_ABORT_ERRORS = {cls.__name__: cls for cls in (QueryTimeoutError, QueryCancelledError,
+                                               QueryRowLimitError, QueryMemoryError)}
+
+
+class WorkerQueryEngine(QueryEngine):
+    """Runs another engine's queries in a worker process that can be stopped"""
+
+    def __init__(self, df, engine_name=None, timeout=None, max_rows=None, memory_limit_mb=None, should_cancel=None):
+        super().__init__(df)
+        self.engine_name = engine_name
+        self.timeout = timeout or float(os.getenv("QUERY_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT_SECONDS)))
+        self.max_rows = int(os.getenv("QUERY_MAX_ROWS", str(DEFAULT_MAX_ROWS))) if max_rows is None else max_rows
+        if memory_limit_mb is None:
+            memory_limit_mb = float(os.getenv("QUERY_MEMORY_LIMIT_MB", str(DEFAULT_MEMORY_LIMIT_MB)))
+        self.memory_limit_bytes = int(memory_limit_mb * 1024 * 1024)
+        self.should_cancel = should_cancel
+        self.restarts = 0
+        self.name = f"{engine_name or os.getenv('QUERY_ENGINE') or 'sqlite'} (worker process)"
+
+        # The worker reads the dataset from disk; spawn (rather than fork) keeps
+        # it clear of the app's threads and locks
+        self._dir = tempfile.mkdtemp(prefix="dq_query_worker_")
+        self._data_path = os.path.join(self._dir, "data.pkl")
+        df.to_pickle(self._data_path)
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ready = False
+        self._finalizer = None
+        self._start()
+
+    def _start(self):
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self._data_path, self.engine_name, self.memory_limit_bytes),
+            name="query-worker",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+        # Sessions that end without close() must not leave workers behind
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, _discard_worker, self._process, self._dir)
+
+    def _stop_worker(self):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join(timeout=5)
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _restart(self):
+        self._stop_worker()
+        self.restarts += 1
+        self._start()
+
+    def _wait(self, timeout, on_timeout):
+        """Wait for the worker's next message, stopping it on timeout, cancellation or death"""
+        deadline = time.monotonic() + timeout
+        while not self._conn.poll(POLL_INTERVAL):
+            if not self._process.is_alive():
+                exitcode = self._process.exitcode
+                self._restart()
+                raise QueryMemoryError(
+                    f"The query worker stopped unexpectedly (exit code {exitcode}), most likely out of memory"
+                )
+            if self.should_cancel is not None:
+                try:
+                    cancelled = self.should_cancel()
+                except BaseException:
+                    # The callback stopped the caller itself (a Streamlit rerun, say); the query goes too
+                    self._restart()
+                    raise
+                if cancelled:
+                    self._restart()
+                    raise QueryCancelledError("The query was cancelled")
+            if time.monotonic() >= deadline:
+                self._restart()
+                raise on_timeout
+        try:
+            return self._conn.recv()
+        except EOFError:
+            self._restart()
+            raise QueryMemoryError("The query worker stopped unexpectedly, most likely out of memory")
+
+    def _raise(self, reply):
+        if reply[0] == "aborted":
+            raise _ABORT_ERRORS.get(reply[1], QueryAbortedError)(reply[2])
+        raise QueryWorkerError(reply[2])
+
+    def _ensure_ready(self):
+        if self._process is None:
+            self._start()
+        if not self._ready:
+            reply = self._wait(STARTUP_TIMEOUT_SECONDS,
+                               QueryTimeoutError("The query worker did not finish loading the dataset"))
+            if reply[0] != "ready":
+                self._stop_worker()
+                self._raise(reply)
+            self._ready = True
+
+    def _timeout_error(self):
+        return QueryTimeoutError(
+            f"The query did not finish within {self.timeout:g} seconds and was stopped. "
+            "Try a more specific question."
+        )
+
+    def _call(self, method, *args):
+        with self._lock:
+            self._ensure_ready()
+            self._conn.send((method, args))
+            reply = self._wait(self.timeout, self._timeout_error())
+            if reply[0] != "ok":
+                self._raise(reply)
+            return reply[1]
+
+    def execute(self, sql_query):
+        return self._call("execute", sql_query, self.max_rows)
+
+    def execute_page(self, sql_query, limit, offset=0):
+        return self._call("page", sql_query, limit, offset)
+
+    def count_rows(self, sql_query):
+        return self._call("count", sql_query)
+
+    def iter_batches(self, sql_query, batch_rows):
+        """Stream batches from the worker; not bounded by max_rows, the timeout applies per batch"""
+        with self._lock:
+            self._ensure_ready()
+            self._conn.send(("batches", (sql_query, batch_rows)))
+            try:
+                while True:
+                    reply = self._wait(self.timeout, self._timeout_error())
+                    if reply[0] == "batch":
+                        yield reply[1]
+                    elif reply[0] == "ok":
+                        return
+                    else:
+                        self._raise(reply)
+            except GeneratorExit:
+                # Abandoned part-way while the worker is still sending
+                self._restart()
+                raise
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._process is not None and self._process.is_alive():
+                try:
+                    self._conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                self._process.join(timeout=1)
+            self._stop_worker()
+        shutil.rmtree(self._dir, ignore_errors=True)
+        if self._finalizer is not None:
+            self._finalizer.detach()
@@ -0,0 +1,133 @@
+"""Letting the model fix its own SQL from the error it caused
+
+When generated SQL fails validation or execution, repair_sql() sends the
+failing statement and the engine's error back to the model and checks the
+answer the same way, for at most max_attempts rounds. Every failed
+candidate and its error stay in the conversation, so the model does not
+repeat a fix that already failed.
+
+A repair request that has not answered within hedge_after seconds is
+hedged: extra candidates are requested in parallel at a higher temperature
+and the first one that passes the check wins; requests still running then
+are cancelled.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from data_chat.prompt_builder import count_tokens
+from data_chat.sql_generation import MAX_TOKENS, MODEL, SYSTEM_MESSAGE, TEMPERATURE, clean_sql_response, schema_fingerprint
+
+DEFAULT_MAX_ATTEMPTS = 2
+DEFAULT_HEDGE_AFTER_SECONDS = 4.0
+DEFAULT_HEDGE_CANDIDATES = 2
+HEDGE_TEMPERATURE = 0.6
+
+REPAIR_INSTRUCTION = (
+    "That query failed with this error:\n{error}\n\n"
+    "Return only a corrected SQL query for the same question, nothing else."
+)
+
+class RepairLog:
+    """What fixing one question cost: model calls, time and tokens"""
+
+    def __init__(self, question):
+        self.question = question
+        self.attempts = []
+        self.repaired = False
+        self.seconds = 0.0
+
+    @property
+    def prompt_tokens(self):
+        return sum(attempt['prompt_tokens'] for attempt in self.attempts)
+
+    @property
+    def completion_tokens(self):
+        return sum(attempt['completion_tokens'] for attempt in self.attempts)
+
+    def as_dict(self):
+        return {
+            'question': self.question,
+            'attempts': len(self.attempts),
+            'candidates': sum(attempt['candidates'] for attempt in self.attempts),
+            'repaired': self.repaired,
+            'seconds': round(self.seconds, 2),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'errors': [attempt['error'] for attempt in self.attempts if attempt['error']]
+        }
+
+
+def repair_messages(prompt, failures):
+    """Chat messages replaying the failed (sql, error) pairs after the original prompt"""
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+    for sql_query, error in failures:
+        messages.append({"role": "assistant", "content": sql_query})
+        messages.append({"role": "user", "content": REPAIR_INSTRUCTION.format(error=error)})
+    return messages
+
+
+def repair_sql(gateway, prompt, sql_query, error, check, question=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+               hedge_after=DEFAULT_HEDGE_AFTER_SECONDS, hedge_candidates=DEFAULT_HEDGE_CANDIDATES,
+               cache=None, schema_info=None):
+    """Ask the model to fix sql_query until check(sql) succeeds or attempts run out
+
+    check(sql) returns the query's result or raises. Returns
+    (sql, result, log); sql and result are None when no candidate passed.
+    A working fix is stored in the response cache under the original
+    prompt, so the question is answered correctly next time.
+    """
+    log = RepairLog(question)
+    started = time.monotonic()
+    failures = [(sql_query, str(error))]
+    pending = set()
+    try:
+        for _ in range(max_attempts):
+            messages = repair_messages(prompt, failures)
+            prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+            attempt = {'prompt_tokens': 0, 'completion_tokens': 0, 'candidates': 0, 'error': None}
+            log.attempts.append(attempt)
+
+            def submit(temperature):
+                attempt['candidates'] += 1
+                attempt['prompt_tokens'] += prompt_tokens
+                return gateway.submit(MODEL, messages, temperature, MAX_TOKENS)
+
+            pending = {submit(TEMPERATURE)}
+            done, pending = wait(pending, timeout=hedge_after)
+            if not done and hedge_candidates > 1:
+                pending |= {submit(HEDGE_TEMPERATURE) for _ in range(hedge_candidates - 1)}
+
+            while done or pending:
+                if not done:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                try:
+                    response = done.pop().result() or ""
+                except Exception as e:
+                    attempt['error'] = f"The AI service failed: {e}"
+                    continue
+                attempt['completion_tokens'] += count_tokens(response)
+                candidate = clean_sql_response(response)
+                if not candidate or candidate in (failed for failed, _ in failures):
+                    continue
+                try:
+                    result = check(candidate)
+                except Exception as e:
+                    failures.append((candidate, str(e)))
+                    attempt['error'] = str(e)
+                    continue
+                log.repaired = True
+                if cache is not None and schema_info is not None:
+                    cache.store(MODEL, prompt, schema_fingerprint(schema_info), TEMPERATURE, candidate,
+                                question=question)
+                return candidate, result, log
+            if attempt['error'] is None:
+                attempt['error'] = "The model did not return a different query"
+        return None, None, log
+    finally:
+        for future in pending:
+            future.cancel()
+        log.seconds = time.monotonic() - started
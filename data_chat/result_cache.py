@@ -0,0 +1,145 @@
+"""Cache of query results per dataset, keyed by normalized SQL
+
+Different questions often produce the same SQL (SELECT COUNT(*) FROM df for
+every way of asking for the row count), and example buttons and favorites
+re-run identical statements. ResultCache keeps the ResultHandle of each
+statement so a repeat is answered without touching the query engine.
+
+Keys are canonical_sql() of the statement: comments, whitespace, trailing
+semicolons, keyword case and needless identifier quoting do not matter.
+Unaliased columns take their label from the first spelling that ran.
+The cache holds results of one dataset at a time and empties itself as
+soon as it is used with a different dataset fingerprint; entries are
+evicted least recently used first once the rows they hold exceed max_bytes.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from data_chat.sql_validation import split_segments
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 256
+
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+(?:\.\d*)?|\S")
+_PLAIN_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_KEYWORDS = {
+    "select", "distinct", "all", "from", "where", "group", "by", "having", "order", "asc", "desc",
+    "limit", "offset", "as", "and", "or", "not", "null", "is", "in", "like", "glob", "between",
+    "case", "when", "then", "else", "end", "join", "left", "right", "inner", "outer", "cross",
+    "full", "on", "using", "union", "intersect", "except", "with", "cast", "exists", "escape",
+    "count", "sum", "avg", "min", "max", "total", "round", "abs", "length", "lower", "upper",
+    "trim", "coalesce", "ifnull", "nullif", "substr", "true", "false"
+}
+
+
+def canonical_sql(sql_query):
+    """One spelling for equivalent statements: the cache key, never executed"""
+    tokens = []
+    for kind, text in split_segments(sql_query or ""):
+        if kind == "comment":
+            continue
+        if kind == "string":
+            tokens.append(text)
+        elif kind == "identifier":
+            name = text[1:-1]
+            # [Currency], "Currency" and Currency are the same column
+            if _PLAIN_IDENTIFIER.match(name) and name.lower() not in _KEYWORDS:
+                tokens.append(name)
+            else:
+                tokens.append(f"[{name}]")
+        else:
+            tokens.extend(token.lower() if token.lower() in _KEYWORDS else token
+                          for token in _TOKEN.findall(text))
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def _result_bytes(result):
+    memory_bytes = getattr(result, "memory_bytes", None)
+    return memory_bytes() if memory_bytes is not None else 0
+
+
+class ResultCache:
+    """LRU of query results for the current dataset, bounded by the bytes they hold"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # canonical SQL -> result, least recently used first
+        self._lock = threading.Lock()
+
+    def _switch(self, fingerprint):
+        """Forget every result when asked about a different dataset"""
+        if fingerprint != self.fingerprint:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.fingerprint = fingerprint
+
+    def get(self, sql_query, fingerprint):
+        """The cached result of sql_query on this dataset, or None"""
+        key = canonical_sql(sql_query)
+        with self._lock:
+            self._switch(fingerprint)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, sql_query, fingerprint, result):
+        """Cache result under sql_query; call again to add another spelling of the same statement"""
+        key = canonical_sql(sql_query)
+        with self._lock:
+            self._switch(fingerprint)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _distinct_results(self):
+        return {id(result): result for result in self._entries.values()}.values()
+
+    def _evict(self):
+        # Handles fetch pages after they are cached, so sizes are measured now
+        used = sum(_result_bytes(result) for result in self._distinct_results())
+        while self._entries and (used > self.max_bytes or len(self._entries) > self.max_entries):
+            _, result = self._entries.popitem(last=False)
+            if not any(other is result for other in self._entries.values()):
+                used -= _result_bytes(result)
+            self.evictions += 1
+
+    @property
+    def bytes(self):
+        with self._lock:
+            return sum(_result_bytes(result) for result in self._distinct_results())
+
+    def stats(self):
+        """Hit/miss counters and size for the developer report"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits / total) * 100, 2) if total else 0.0,
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.fingerprint = None
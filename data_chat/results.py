@@ -0,0 +1,139 @@
+"""Query results read page by page instead of being held in memory
+
+A ResultHandle keeps only the SQL, a reference to the session's query engine
+and the first page of rows. Other pages are fetched on demand by wrapping
+the query in LIMIT/OFFSET, the total row count comes from a COUNT(*) over
+the query (and only when the first page is full), and downloads read the
+rows batch by batch only when the download button is clicked.
+
+The count runs when the handle is created, next to the first page, so a
+count that is stopped for time fails where the query's errors are already
+handled instead of later, while the result is being formatted.
+
+A FrameResult offers the same interface for an answer computed in pandas,
+whose (small) table is kept in memory.
+"""
+
+import io
+
+import pandas as pd
+
+RESULT_PAGE_SIZE = 10
+DOWNLOAD_BATCH_ROWS = 50_000
+
+
+class ResultHandle:
+    """Lazily paged result of one query on one dataset"""
+
+    def __init__(self, engine, sql_query, page_size=RESULT_PAGE_SIZE):
+        self.engine = engine
+        self.sql_query = sql_query
+        self.page_size = page_size
+        self._materialized = None
+        self._nestable = True
+        self._total_rows = None
+        self._cached_page = (None, None)
+        try:
+            first = engine.execute_page(sql_query, page_size + 1, 0)
+        except Exception:
+            # Statements that cannot be nested in a subquery run as they are;
+            # a genuinely broken query raises its own error here
+            self._nestable = False
+            self._materialized = engine.execute(sql_query)
+            first = self._materialized.head(page_size + 1)
+            self._total_rows = len(self._materialized)
+        self.columns = list(first.columns)
+        self.first_page = first.head(page_size)
+        if len(first) <= page_size:
+            self._total_rows = len(first)
+        elif self._total_rows is None:
+            self._total_rows = engine.count_rows(sql_query)
+
+    @property
+    def total_rows(self):
+        if self._total_rows is None:
+            self._total_rows = self.engine.count_rows(self.sql_query)
+        return self._total_rows
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.total_rows // self.page_size))
+
+    def _all_rows(self):
+        if self._materialized is None:
+            self._materialized = self.engine.execute(self.sql_query)
+        return self._materialized
+
+    def memory_bytes(self):
+        """Bytes of the rows this handle currently holds in memory"""
+        frames = (self.first_page, self._materialized, self._cached_page[1])
+        return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames if frame is not None)
+
+    def release(self):
+        """Drop every fetched row; pages are read from the engine again when needed"""
+        self.first_page = None
+        self._materialized = None
+        self._cached_page = (None, None)
+
+    def page(self, number):
+        """Rows of the given 0-based page"""
+        if number == 0 and self.first_page is not None:
+            return self.first_page
+        if not self._nestable:
+            start = number * self.page_size
+            return self._all_rows().iloc[start:start + self.page_size]
+        cached_number, cached = self._cached_page
+        if cached_number != number:
+            cached = self.engine.execute_page(self.sql_query, self.page_size, number * self.page_size)
+            self._cached_page = (number, cached)
+        return cached
+
+    def head(self, rows):
+        """The first rows of the result"""
+        if rows <= self.page_size or self.total_rows <= self.page_size:
+            return self.page(0).head(rows)
+        if not self._nestable:
+            return self._all_rows().head(rows)
+        return self.engine.execute_page(self.sql_query, rows, 0)
+
+    def write_csv(self, file):
+        """Write every row as CSV to a binary file, one batch at a time"""
+        if not self._nestable:
+            batches = (self._all_rows(),)
+        else:
+            batches = self.engine.iter_batches(self.sql_query, DOWNLOAD_BATCH_ROWS)
+        header = True
+        for batch in batches:
+            file.write(batch.to_csv(index=False, header=header).encode("utf-8"))
+            header = False
+        if header:
+            file.write(pd.DataFrame(columns=self.columns).to_csv(index=False).encode("utf-8"))
+
+    def csv_bytes(self):
+        """All rows as CSV bytes, for st.download_button to build when it is clicked
+
+        Streamlit keeps the bytes in its media storage until the download is
+        served, not in the session state.
+        """
+        buffer = io.BytesIO()
+        self.write_csv(buffer)
+        return buffer.getvalue()
+
+
+class FrameResult(ResultHandle):
+    """Result computed directly from the DataFrame instead of by a query engine"""
+
+    def __init__(self, frame, sql_query, page_size=RESULT_PAGE_SIZE):
+        self.engine = None
+        self.sql_query = sql_query
+        self.page_size = page_size
+        self._materialized = frame.reset_index(drop=True)
+        self._nestable = False
+        self._total_rows = len(frame)
+        self._cached_page = (None, None)
+        self.columns = list(frame.columns)
+        self.first_page = self._materialized.head(page_size)
+
+    def release(self):
+        """Keep the rows: there is no query to read them from again"""
+        self._cached_page = (None, None)
@@ -0,0 +1,213 @@
+"""Fixed-size probabilistic summaries for profiling very large datasets
+
+Approximate profiling reads a dataset in row chunks and folds every chunk
+into sketches whose size does not grow with the number of rows:
+
+- HyperLogLog registers for distinct counts per column
+- a Bloom filter over 64-bit row digests for duplicate estimation
+- a uniform bottom-k sample per numeric column for quantiles and outlier rates
+
+Each sketch reports its own error bound so the UI can show it next to the
+estimate.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+SKETCH_CHUNK_ROWS = 1_000_000
+HLL_PRECISION = 14
+BLOOM_ERROR_RATE = 0.01
+BLOOM_MAX_BYTES = 64 * 1024 * 1024
+QUANTILE_SAMPLE_SIZE = 20_000
+CONFIDENCE_Z = 1.96  # two-sided 95%
+
+
+def iter_chunks(df, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Yield consecutive row slices of df without copying"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def hash_values(values):
+    """64-bit hashes of a Series or DataFrame's rows, consistent across chunks"""
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype="uint64")
+
+
+def _mix(hashes):
+    """splitmix64 finalizer, used to derive an independent second hash"""
+    with np.errstate(over="ignore"):
+        z = hashes + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for uint64 arrays"""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype="uint8")
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[high] += shift
+        values[high] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """Distinct count estimator with relative standard error 1.04 / sqrt(2 ** precision)"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype="uint8")
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        tail_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(tail_bits)).astype("int64")
+        tails = hashes & ((np.uint64(1) << np.uint64(tail_bits)) - np.uint64(1))
+        ranks = (tail_bits - _bit_length(tails).astype("int64") + 1).astype("uint8")
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def add(self, series):
+        self.add_hashes(hash_values(series.dropna()))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype("int64")))
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives, in fixed memory"""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE, max_bytes=BLOOM_MAX_BYTES):
+        capacity = max(1, capacity)
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.size = max(64, min(bits, max_bytes * 8))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype="uint8")
+        self.inserted = 0
+
+    def _positions(self, hashes):
+        step = _mix(hashes) | np.uint64(1)
+        size = np.uint64(self.size)
+        with np.errstate(over="ignore"):
+            return [(hashes + np.uint64(i) * step) % size for i in range(self.hash_count)]
+
+    def contains(self, hashes):
+        found = np.ones(len(hashes), dtype=bool)
+        for positions in self._positions(hashes):
+            found &= (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype("uint8")) & 1 == 1
+        return found
+
+    def add(self, hashes):
+        for positions in self._positions(hashes):
+            np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype("int64"),
+                             (np.uint8(1) << (positions & np.uint64(7)).astype("uint8")))
+        self.inserted += len(hashes)
+
+    def false_positive_rate(self):
+        """Probability that a new, unseen item is reported as present right now"""
+        filled = 1 - math.exp(-self.hash_count * self.inserted / self.size)
+        return filled ** self.hash_count
+
+
+class DuplicateEstimator:
+    """Counts rows whose digest was (probably) seen before, using a Bloom filter
+
+    Duplicates inside a chunk are found exactly; across chunks the filter may
+    report false positives, whose expected number is subtracted from the
+    estimate and reported as its error bound.
+    """
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.filter = BloomFilter(capacity, error_rate)
+        self.observed = 0
+        self.expected_false_positives = 0.0
+
+    def add_hashes(self, hashes):
+        repeated = pd.Series(hashes).duplicated().to_numpy()
+        self.observed += int(repeated.sum())
+        candidates = hashes[~repeated]
+        fp_rate = self.filter.false_positive_rate()
+        seen = self.filter.contains(candidates)
+        self.observed += int(seen.sum())
+        self.expected_false_positives += fp_rate * len(candidates)
+        self.filter.add(candidates[~seen])
+
+    def estimate(self):
+        return max(0, int(round(self.observed - self.expected_false_positives)))
+
+    @property
+    def error_bound(self):
+        return int(math.ceil(self.expected_false_positives))
+
+
+class QuantileSketch:
+    """Uniform sample of a numeric stream (bottom-k on random keys) for quantiles
+
+    Any quantile read from the sample is within rank_error() of the true
+    quantile with 95% confidence (Dvoretzky-Kiefer-Wolfowitz bound).
+    """
+
+    def __init__(self, size=QUANTILE_SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._values = np.empty(0)
+
+    def add(self, values):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        keys = np.concatenate([self._keys, self._rng.random(len(values))])
+        values = np.concatenate([self._values, values])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size - 1)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self._keys, self._values = keys, values
+
+    @property
+    def sample(self):
+        return self._values
+
+    def quantile(self, q):
+        return float(np.quantile(self._values, q)) if len(self._values) else None
+
+    def rank_error(self, delta=0.05):
+        if len(self._values) == 0 or len(self._values) >= self.count:
+            return 0.0
+        return math.sqrt(math.log(2 / delta) / (2 * len(self._values)))
+
+    def fraction_outside(self, low, high):
+        """Estimated share of values outside [low, high] and its 95% error bound"""
+        n = len(self._values)
+        if n == 0:
+            return 0.0, 0.0
+        fraction = float(((self._values < low) | (self._values > high)).mean())
+        if n >= self.count:
+            return fraction, 0.0
+        return fraction, CONFIDENCE_Z * math.sqrt(max(fraction * (1 - fraction), 1 / n) / n)
+
+
+def approximate_distinct_counts(df, precision=HLL_PRECISION, chunk_rows=SKETCH_CHUNK_ROWS):
+    """{column: estimated distinct non-null values}, reading df chunk by chunk"""
+    sketches = {col: HyperLogLog(precision) for col in df.columns}
+    for chunk in iter_chunks(df, chunk_rows):
+        for col in df.columns:
+            sketches[col].add(chunk[col])
+    return {col: sketch.estimate() for col, sketch in sketches.items()}
@@ -0,0 +1,138 @@
+"""Turning a rendered prompt into a SQL query through the LLM gateway"""
+
+import hashlib
+
+from data_chat.prompt_builder import stable_prefix
+from data_chat.sql_validation import split_segments
+
+MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.1
+MAX_TOKENS = 500
+SYSTEM_MESSAGE = "You are an expert SQL analyst. Generate only SQL queries, no explanations."
+
+
+def schema_fingerprint(schema_info):
+    """Hash of the schema text the prompt was built from, without any per-question focus hint"""
+    return hashlib.sha1(stable_prefix(schema_info).encode("utf-8")).hexdigest()
+
+
+def clean_sql_response(sql_query):
+    """Strip whitespace and ```sql fences from a model response"""
+    if not sql_query:
+        return None
+    sql_query = sql_query.strip()
+    # Clean up the response to get just the SQL
+    if sql_query.startswith("```sql"):
+        sql_query = sql_query[6:]
+    if sql_query.endswith("```"):
+        sql_query = sql_query[:-3]
+    return sql_query.strip() or None
+
+
+def _statement_end(sql):
+    """Index just past the first ';' outside quotes, brackets and comments, or -1"""
+    offset = 0
+    for kind, text in split_segments(sql):
+        if kind == "code" and ";" in text:
+            return offset + text.index(";") + 1
+        offset += len(text)
+    return -1
+
+
+class SQLStreamAssembler:
+    """Accumulates streamed tokens and exposes the SQL seen so far
+
+    Markdown fences are stripped as they arrive. The statement counts as
+    complete once a terminating ';' or the closing fence has been received,
+    so the caller can stop reading and start executing immediately.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.sql = ""
+        self.complete = False
+
+    def feed(self, delta):
+        """Add a chunk of model output and return the SQL visible so far"""
+        if self.complete or not delta:
+            return self.sql
+        self.raw += delta
+
+        text = self.raw.lstrip()
+        if text.startswith("```"):
+            newline = text.find("\n")
+            # Wait until the whole opening fence (e.g. ```sql) has arrived
+            text = "" if newline == -1 else text[newline + 1:]
+
+        closing_fence = text.find("```")
+        if closing_fence != -1:
+            text = text[:closing_fence]
+            self.complete = True
+        else:
+            # Hide a closing fence that is still arriving
+            text = text.rstrip("`")
+
+        end = _statement_end(text)
+        if end != -1:
+            text = text[:end]
+            self.complete = True
+
+        self.sql = text.strip()
+        return self.sql
+
+
+def _chat_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def request_sql(gateway, prompt, schema_info, user_question=None, cache=None):
+    """Ask the model for SQL, answering from the response cache when possible"""
+    fingerprint = schema_fingerprint(schema_info)
+    if cache is not None:
+        cached = cache.lookup(MODEL, prompt, fingerprint, TEMPERATURE, question=user_question)
+        if cached is not None:
+            return cached
+
+    response = gateway.complete(MODEL, _chat_messages(prompt), TEMPERATURE, MAX_TOKENS)
+
+    sql_query = clean_sql_response(response)
+    if sql_query and cache is not None:
+        cache.store(MODEL, prompt, fingerprint, TEMPERATURE, sql_query, question=user_question)
+    return sql_query
+
+
+def stream_sql(gateway, prompt, schema_info, user_question=None, cache=None, on_update=None):
+    """Stream SQL from the model, calling on_update(partial_sql) as tokens arrive
+
+    Reading stops as soon as a complete statement has been received.
+    """
+    fingerprint = schema_fingerprint(schema_info)
+    if cache is not None:
+        cached = cache.lookup(MODEL, prompt, fingerprint, TEMPERATURE, question=user_question)
+        if cached is not None:
+            if on_update:
+                on_update(cached)
+            return cached
+
+    stream = gateway.stream(MODEL, _chat_messages(prompt), TEMPERATURE, MAX_TOKENS)
+
+    assembler = SQLStreamAssembler()
+    try:
+        for chunk in stream:
+            previous = assembler.sql
+            sql_so_far = assembler.feed(chunk)
+            if on_update and sql_so_far != previous:
+                on_update(sql_so_far)
+            if assembler.complete:
+                break
+    finally:
+        # Stops the request if we left the loop early
+        stream.close()
+
+    sql_query = assembler.sql or None
+    if sql_query and cache is not None:
+        cache.store(MODEL, prompt, fingerprint, TEMPERATURE, sql_query, question=user_question)
+    return sql_query
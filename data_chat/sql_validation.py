@@ -0,0 +1,277 @@
+"""Checks and rewrites applied to generated SQL before it runs
+
+validate_sql() rejects what should never reach the engine and repairs what
+the model commonly gets wrong, in microseconds and without touching the
+data:
+
+- only a single SELECT (or WITH ... SELECT) statement is accepted
+- column names with spaces, dots or other symbols (Bus. Transac. Type) are
+  bracket-quoted when left bare, and 'Column Name' string literals are
+  turned into [Column Name] where only a column makes sense: in a select,
+  GROUP BY or ORDER BY list, at the start of a condition, or as the
+  argument of an aggregate. Literals in value positions (IN lists,
+  COALESCE and other function arguments, right-hand sides) stay literals
+- an unbounded top-level SELECT * gets a LIMIT
+- the statement is planned with EXPLAIN against an empty table with the
+  dataset's schema, which catches syntax errors and unknown columns,
+  tables and functions
+"""
+
+import difflib
+import re
+
+from data_chat.profile import ProfileCache
+from data_chat.query_engine import create_query_engine
+
+DEFAULT_SELECT_STAR_LIMIT = 10_000
+
+_PLAIN_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\S")
+# Keywords after which the grammar expects a column, so a quoted column name there means the column
+_IDENTIFIER_CONTEXT = {"select", "distinct", "all", "by", "where", "and", "or", "not", "having", "on"}
+# Aggregates whose argument is a column; a literal would make them meaningless
+_COLUMN_FUNCTIONS = {"sum", "avg", "min", "max", "count", "total"}
+_WRITE_KEYWORDS = {"insert", "update", "delete", "replace", "create", "drop", "alter",
+                   "attach", "detach", "pragma", "vacuum", "reindex", "analyze"}
+
+
+class SQLValidationError(ValueError):
+    """Generated SQL that must not or cannot run"""
+
+
+class ValidatedSQL:
+    """A statement ready to run, with notes on anything that was rewritten"""
+
+    def __init__(self, sql, notes):
+        self.sql = sql
+        self.notes = notes
+
+
+def split_segments(sql):
+    """Split SQL into (kind, text) pieces: code, string, identifier or comment"""
+    segments = []
+    code_start = 0
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"', "`", "[") or sql.startswith("--", i) or sql.startswith("/*", i):
+            if i > code_start:
+                segments.append(("code", sql[code_start:i]))
+            if ch in ("'", '"', "`"):
+                # Doubled quotes escape themselves
+                j = i + 1
+                while j < n:
+                    if sql[j] == ch:
+                        if j + 1 < n and sql[j + 1] == ch:
+                            j += 2
+                            continue
+                        break
+                    j += 1
+                kind = "string" if ch == "'" else "identifier"
+            elif ch == "[":
+                j = sql.find("]", i + 1)
+                kind = "identifier"
+            elif sql.startswith("--", i):
+                j = sql.find("\n", i)
+                j = n - 1 if j == -1 else j - 1
+                kind = "comment"
+            else:
+                j = sql.find("*/", i + 2)
+                j = n - 1 if j == -1 else j + 1
+                kind = "comment"
+            j = n - 1 if j == -1 else j
+            segments.append((kind, sql[i:j + 1]))
+            i = code_start = j + 1
+        else:
+            i += 1
+    if code_start < n:
+        segments.append(("code", sql[code_start:]))
+    return segments
+
+
+def _join(segments):
+    return "".join(text for _, text in segments)
+
+
+def _code_tokens(segments):
+    """(lowercased token, paren depth) for the code outside quotes and comments"""
+    tokens = []
+    depth = 0
+    for kind, text in segments:
+        if kind == "comment":
+            continue
+        if kind != "code":
+            tokens.append((kind, depth))
+            continue
+        for token in _WORD.findall(text):
+            if token == ")":
+                depth -= 1
+            tokens.append((token.lower(), depth))
+            if token == "(":
+                depth += 1
+    return tokens
+
+
+def check_statement(segments):
+    """Reject anything but one read-only query"""
+    tokens = _code_tokens(segments)
+    words = [token for token, _ in tokens]
+    semicolons = [i for i, token in enumerate(words) if token == ";"]
+    if semicolons and any(token != ";" for token in words[semicolons[0]:]):
+        raise SQLValidationError("Only a single SQL statement can be run at a time")
+    if not words:
+        raise SQLValidationError("The generated SQL is empty")
+    if words[0] not in ("select", "with"):
+        raise SQLValidationError(f"Only SELECT queries can be run, not {words[0].upper()}")
+    if words[0] == "with":
+        # The statement a CTE list leads into is its first top-level verb
+        verb = next((token for token, depth in tokens[1:]
+                     if depth == 0 and token in _WRITE_KEYWORDS | {"select", "values"}), None)
+        if verb != "select":
+            raise SQLValidationError(f"Only SELECT queries can be run, not {(verb or 'WITH').upper()}")
+
+
+def quote_columns(segments, columns):
+    """Bracket-quote bare or single-quoted references to columns that need quoting
+
+    Returns the new segments and the names that were quoted.
+    """
+    special = sorted((col for col in columns if not _PLAIN_IDENTIFIER.match(col)), key=len, reverse=True)
+    if not special:
+        return segments, []
+    pattern = re.compile(
+        r"(?<![\w\[])(" + "|".join(re.escape(col) for col in special) + r")(?!\w)", re.IGNORECASE
+    )
+    canonical = {col.lower(): col for col in special}
+    special_set = set(special)
+    quoted = []
+    out = []
+    previous = None
+    # What each open parenthesis holds: a clause, an aggregate's column or values
+    contexts = ["clause"]
+    for kind, text in segments:
+        if kind == "code":
+            def bracket(match):
+                name = canonical[match.group(1).lower()]
+                quoted.append(name)
+                return f"[{name}]"
+            text = pattern.sub(bracket, text)
+            for word in _WORD.findall(text):
+                word = word.lower()
+                if word == "(":
+                    if previous in _COLUMN_FUNCTIONS:
+                        contexts.append("column")
+                    elif previous in ("(", ","):
+                        contexts.append(contexts[-1])
+                    elif previous is None or previous in _IDENTIFIER_CONTEXT | {"from", "join", "as"}:
+                        contexts.append("clause")
+                    else:
+                        contexts.append("value")
+                elif word == ")" and len(contexts) > 1:
+                    contexts.pop()
+                elif word == "select":
+                    contexts[-1] = "clause"
+                previous = word
+        elif kind == "string":
+            value = text[1:-1].replace("''", "'")
+            if value in special_set and (previous in _IDENTIFIER_CONTEXT or
+                                         (previous in ("(", ",") and contexts[-1] != "value")):
+                quoted.append(value)
+                kind, text = "identifier", f"[{value}]"
+            previous = "'"
+        elif kind == "identifier":
+            previous = "identifier"
+        out.append((kind, text))
+    return out, sorted(set(quoted), key=quoted.index)
+
+
+def limit_select_star(segments, limit):
+    """Append a LIMIT to an unbounded top-level SELECT *; returns (segments, added)"""
+    tokens = [(token, depth) for token, depth in _code_tokens(segments) if token != ";"]
+    words = [token for token, _ in tokens]
+    if len(words) < 2 or words[0] != "select":
+        return segments, False
+    star = 2 if words[1] in ("distinct", "all") else 1
+    if star >= len(words) or words[star] != "*":
+        return segments, False
+    if any(token == "limit" and depth == 0 for token, depth in tokens):
+        return segments, False
+    # On its own line so a trailing -- comment cannot swallow it
+    return segments + [("code", f"\nLIMIT {int(limit)}")], True
+
+
+def _strip(segments):
+    """Drop trailing comments, semicolons and whitespace"""
+    segments = list(segments)
+    while segments and segments[-1][0] in ("code", "comment"):
+        text = segments[-1][1].rstrip().rstrip(";").rstrip() if segments[-1][0] == "code" else ""
+        if text:
+            segments[-1] = ("code", text)
+            break
+        segments.pop()
+    return segments
+
+
+class SchemaChecker:
+    """Plans queries against an empty copy of a dataset's table in a given engine"""
+
+    def __init__(self, df, engine_name=None):
+        self.columns = [str(col) for col in df.columns]
+        self.engine = create_query_engine(df.iloc[:0], engine_name)
+
+    def explain(self, sql_query):
+        """Raise SQLValidationError when the engine cannot plan the query"""
+        try:
+            self.engine.execute(f"EXPLAIN {sql_query}")
+        except Exception as e:
+            message = str(e)
+            # pandas wraps the engine error as "Execution failed on sql '...': <error>"
+            message = message.rsplit("': ", 1)[-1] if message.startswith("Execution failed on sql") else message
+            missing = re.search(r"no such column: (.+)$", message) or re.search(r'column "?([^"]+)"? not found', message)
+            if missing:
+                name = missing.group(1).strip().strip('"[]`').split(".")[-1]
+                close = difflib.get_close_matches(name, self.columns, n=1, cutoff=0.6)
+                if close:
+                    message += f" (did you mean [{close[0]}]?)"
+            raise SQLValidationError(message) from e
+
+
+_checkers = {}
+
+
+def get_schema_checker(df, engine_name=None):
+    """Schema checker for a dataset and engine, built once per dataset"""
+    cache = _checkers.get(engine_name)
+    if cache is None:
+        cache = _checkers.setdefault(
+            engine_name, ProfileCache(factory=lambda data, fingerprint: SchemaChecker(data, engine_name))
+        )
+    return cache.get(df)
+
+
+def validate_sql(sql_query, columns, checker=None, select_star_limit=DEFAULT_SELECT_STAR_LIMIT):
+    """Check and repair one generated statement; raises SQLValidationError
+
+    columns are the dataset's column names. checker (a SchemaChecker) plans
+    the rewritten statement; without one only the static checks run.
+    """
+    if not sql_query or not sql_query.strip():
+        raise SQLValidationError("The generated SQL is empty")
+    segments = split_segments(sql_query)
+    check_statement(segments)
+    segments = _strip(segments)
+    notes = []
+
+    segments, quoted = quote_columns(segments, [str(col) for col in columns])
+    if quoted:
+        notes.append("Quoted column names: " + ", ".join(f"[{name}]" for name in quoted))
+    if select_star_limit:
+        segments, limited = limit_select_star(segments, select_star_limit)
+        if limited:
+            notes.append(f"Added LIMIT {select_star_limit:,} to SELECT *")
+
+    sql = _join(segments).strip()
+    if checker is not None:
+        checker.explain(sql)
+    return ValidatedSQL(sql, notes)
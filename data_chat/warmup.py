@@ -0,0 +1,121 @@
+"""Answers to the example questions, computed in the background when a dataset loads
+
+The example buttons ask the same questions of every dataset. ExampleWarmup
+runs them through a Pipeline on a background thread as soon as a dataset is
+loaded: the SQL is generated (or served from the response cache), validated
+and run, and the results land in the pipeline's result cache. A click on an
+example is then answered from answer() without waiting for the model or the
+engine. Questions whose warm-up failed are listed in failures and are
+answered the normal way when clicked.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from data_chat.query_engine import dataset_fingerprint
+
+logger = logging.getLogger(__name__)
+
+EXAMPLE_QUESTIONS = [
+    "How many rows are in the dataset?",
+    "What are the column names?",
+    "How many null values are in each column?",
+    "What is the total transaction value?",
+    "Show me the top 5 transactions by value",
+    "What is the average transaction value?",
+    "How many transactions are there per fiscal year?",
+    "What are the unique business transaction types?",
+    "Show me transactions with values greater than 1000000",
+    "What is the distribution of debit vs credit transactions?"
+]
+# Questions generated at once; their queries still run one at a time on the engine
+DEFAULT_WARMUP_WORKERS = 4
+
+
+class ExampleWarmup:
+    """Answers a fixed list of questions about one dataset on a background thread"""
+
+    def __init__(self, pipeline, questions=EXAMPLE_QUESTIONS, workers=DEFAULT_WARMUP_WORKERS):
+        self.pipeline = pipeline
+        self.questions = list(questions)
+        self.workers = workers
+        self.fingerprint = dataset_fingerprint(pipeline.df)
+        self.answers = {}
+        self.failures = {}
+        self.seconds = None
+        self._started = None
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="example-warmup", daemon=True)
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        pending = queue.SimpleQueue()
+        for question in self.questions:
+            pending.put(question)
+
+        def work():
+            while not self._cancelled.is_set():
+                try:
+                    question = pending.get_nowait()
+                except queue.Empty:
+                    return
+                self._warm(question)
+
+        # Daemon threads, unlike a ThreadPoolExecutor's, do not hold up interpreter exit
+        threads = [threading.Thread(target=work, name=f"example-warmup-{i}", daemon=True)
+                   for i in range(max(1, min(self.workers, len(self.questions))))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.seconds = time.monotonic() - self._started
+
+    def _warm(self, question):
+        try:
+            outcome = self.pipeline.ask(question)
+            if outcome["result"] is None:
+                raise ValueError("The model did not return a SQL query")
+        except Exception as e:
+            # Errors from a dataset that was replaced meanwhile are expected
+            if not self._cancelled.is_set():
+                logger.warning("Example warm-up failed for %r: %s", question, e)
+                self.failures[question] = str(e)
+            return
+        self.answers[question] = outcome
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def matches(self, df):
+        return dataset_fingerprint(df) == self.fingerprint
+
+    def answer(self, question):
+        """The precomputed outcome of Pipeline.ask for question, or None"""
+        if self._cancelled.is_set():
+            return None
+        return self.answers.get(question)
+
+    def cancel(self):
+        """Skip the questions not started yet and forget the answers"""
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self.running
+
+    def stats(self):
+        """Progress and failures for the app and the developer report"""
+        return {
+            'questions': len(self.questions),
+            'ready': len(self.answers),
+            'running': self.running,
+            'seconds': round(self.seconds, 2) if self.seconds is not None else None,
+            'failed': [{'question': question, 'error': error} for question, error in self.failures.items()]
+        }
@@ -1,17 +1,39 @@
 import streamlit as st
 import pandas as pd
-import pandasql as psql
-from openai import OpenAI
 from datetime import datetime
 import json
+import logging
 import os
+import time
 from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from data_chat.chat_history import ChatHistory
+from data_chat.dataset_cache import load_csv_cached
+from data_chat.llm_cache import ResponseCache
+from data_chat.llm_gateway import LLMGateway, LLMGatewayError
+from data_chat.optimize import optimize_dtypes
+from data_chat.profile import get_profile
+from data_chat.pipeline import (
+    DEFAULT_COLUMN_TOP_K, PROMPT_TEMPLATE_FILE, Pipeline, favorite_matches, format_result, read_prompt_template,
+    schema_prompt_for
+)
+from data_chat.prompt_builder import DEFAULT_TOKEN_BUDGET, measure_prompt
+from data_chat.ingest import concat_frames
+from data_chat.intents import match_intent
+from data_chat.quality import IncrementalQualityMetrics, get_approximate_quality_metrics, get_quality_metrics
+from data_chat.query_engine import create_query_engine, dataset_fingerprint, extend_fingerprint
+from data_chat.query_worker import QueryAbortedError, WorkerQueryEngine
+from data_chat.repair import DEFAULT_MAX_ATTEMPTS, repair_sql
+from data_chat.result_cache import DEFAULT_MAX_BYTES, ResultCache
+from data_chat.results import ResultHandle
+from data_chat.sql_generation import SYSTEM_MESSAGE, request_sql, stream_sql
+from data_chat.sql_validation import DEFAULT_SELECT_STAR_LIMIT, SQLValidationError, get_schema_checker, validate_sql
+from data_chat.warmup import EXAMPLE_QUESTIONS, ExampleWarmup
 
 # Load environment variables
 load_dotenv()
 
-# Configure OpenAI API
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
 # Page configuration
 st.set_page_config(
@@ -21,16 +43,65 @@ st.set_page_config(
 )
 
 FAVORITES_FILE = "data/favorites.json"
+SAMPLE_DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+# Render generated SQL token by token (set STREAM_SQL_GENERATION=false to disable)
+STREAM_SQL_GENERATION = os.getenv("STREAM_SQL_GENERATION", "true").lower() != "false"
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+# Result tables kept in memory per session before older ones spill to disk
+CHAT_HISTORY_MEMORY_MB = float(os.getenv("CHAT_HISTORY_MEMORY_MB", "50"))
+# Only the most recent messages are rendered on every rerun
+CHAT_HISTORY_EAGER_MESSAGES = int(os.getenv("CHAT_HISTORY_EAGER_MESSAGES", "20"))
+# Datasets wider than this send only the question's most relevant columns in detail
+COLUMN_RETRIEVAL_TOP_K = int(os.getenv("COLUMN_RETRIEVAL_TOP_K", str(DEFAULT_COLUMN_TOP_K)))
+# Run generated SQL in a worker process that can be stopped (QUERY_TIMEOUT_SECONDS,
+# QUERY_MAX_ROWS, QUERY_MEMORY_LIMIT_MB), one per dataset shared by all sessions;
+# set QUERY_WORKER_PROCESS=false to run in-process
+QUERY_WORKER_PROCESS = os.getenv("QUERY_WORKER_PROCESS", "true").lower() != "false"
+# Seconds between updates of a running query's status line
+QUERY_STATUS_INTERVAL = 0.5
+# Unbounded SELECT * queries are cut to this many rows (0 disables)
+SELECT_STAR_LIMIT = int(os.getenv("SELECT_STAR_LIMIT", str(DEFAULT_SELECT_STAR_LIMIT)))
+# Rounds of sending a failing query and its error back to the model (0 disables)
+SQL_REPAIR_ATTEMPTS = int(os.getenv("SQL_REPAIR_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS)))
+# Rows of repeated queries' results kept per session
+RESULT_CACHE_MB = float(os.getenv("RESULT_CACHE_MB", str(DEFAULT_MAX_BYTES // (1024 * 1024))))
+# Answer the example questions in the background when a dataset loads (set EXAMPLE_WARMUP=false to disable)
+EXAMPLE_WARMUP = os.getenv("EXAMPLE_WARMUP", "true").lower() != "false"
+# Answer common data-quality questions straight from the data (set INTENT_FAST_PATH=false to always ask the AI)
+INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() != "false"
+
+@st.cache_resource
+def get_llm_gateway():
+    """OpenAI gateway shared by all sessions (pooled client, retries, concurrency limit)"""
+    return LLMGateway(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+    )
+
+@st.cache_resource
+def get_response_cache():
+    """Persistent LLM response cache shared by all sessions"""
+    return ResponseCache()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_favorites_file(path, modified_ns):
+    """Parsed favorites file, re-read only when its modification time changes"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return []
 
 def load_favorites_from_file():
     if os.path.exists(FAVORITES_FILE):
-        try:
-            with open(FAVORITES_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
+        return read_favorites_file(FAVORITES_FILE, os.stat(FAVORITES_FILE).st_mtime_ns)
     return []
 
+def table_rows(content):
+    """The rows of a table message, from memory or from the session's spill directory"""
+    return st.session_state.messages.table_data(content)
+
 def save_favorites_to_file(favorites):
     try:
         with open(FAVORITES_FILE, "w", encoding="utf-8") as f:
@@ -40,7 +111,7 @@ def save_favorites_to_file(favorites):
 
 # Initialize session state
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = ChatHistory(memory_cap_bytes=CHAT_HISTORY_MEMORY_MB * 1024 * 1024)
 if 'df' not in st.session_state:
     st.session_state.df = None
 if 'df_name' not in st.session_state:
@@ -59,54 +130,55 @@ if 'favorites' not in st.session_state:
     st.session_state.favorites = load_favorites_from_file()
 if 'run_favorite' not in st.session_state:
     st.session_state.run_favorite = None
+if 'query_engine' not in st.session_state:
+    st.session_state.query_engine = None
+if 'df_source' not in st.session_state:
+    st.session_state.df_source = None
+if 'df_optimization' not in st.session_state:
+    st.session_state.df_optimization = None
+if 'dq_incremental' not in st.session_state:
+    st.session_state.dq_incremental = None
+if 'appended_batches' not in st.session_state:
+    st.session_state.appended_batches = []
+if 'approximate_profiling' not in st.session_state:
+    st.session_state.approximate_profiling = False
+if 'prompt_token_log' not in st.session_state:
+    st.session_state.prompt_token_log = []
+if 'last_query_error' not in st.session_state:
+    st.session_state.last_query_error = None
+if 'repair_log' not in st.session_state:
+    st.session_state.repair_log = []
+if 'result_cache' not in st.session_state:
+    st.session_state.result_cache = ResultCache(max_bytes=int(RESULT_CACHE_MB * 1024 * 1024))
+if 'example_warmup' not in st.session_state:
+    st.session_state.example_warmup = None
+if 'intent_log' not in st.session_state:
+    st.session_state.intent_log = []
+if 'query_status' not in st.session_state:
+    st.session_state.query_status = None
+if 'query_stopped' not in st.session_state:
+    st.session_state.query_stopped = False
 
-def get_schema_info(df):
-    """Generate schema information for the AI prompt"""
-    schema_info = "Database Schema:\n"
-    schema_info += f"Table name: 'df' (DataFrame)\n"
-    schema_info += f"Number of rows: {len(df)}\n"
-    schema_info += f"Number of columns: {len(df.columns)}\n\n"
-    schema_info += "Columns:\n"
-    
-    for col in df.columns:
-        dtype = str(df[col].dtype)
-        null_count = df[col].isnull().sum()
-        unique_count = df[col].nunique()
-        schema_info += f"- {col}: {dtype}, {null_count} null values, {unique_count} unique values\n"
-    
-    # Add sample data for context
-    schema_info += f"\nSample data (first 3 rows):\n{df.head(3).to_string()}\n"
-    
-    return schema_info
+def current_profile(df):
+    """Dataset profile in the profiling mode selected in the sidebar"""
+    return get_profile(df, approximate=st.session_state.approximate_profiling)
 
-def generate_sql_query(user_question, schema_info):
-    """Use OpenAI to generate SQL query from natural language question"""
-    
-    # Load the system prompt from file
-    try:
-        with open("system_prompt.txt", "r") as f:
-            prompt_template = f.read()
-    except FileNotFoundError:
+def load_prompt_template():
+    """Read the SQL prompt template, falling back to a built-in one"""
+    if not os.path.exists(PROMPT_TEMPLATE_FILE):
         st.error("System prompt file not found. Using default prompt.")
-        prompt_template = """
-You are an expert SQL analyst. 
+    return read_prompt_template()
 
-Given the following database schema and a user question, generate a SQL query to answer the question.
+def get_schema_prompt(df, user_question=None):
+    """Schema block for the AI prompt, fitted to PROMPT_TOKEN_BUDGET, with the question's columns described after it"""
+    return schema_prompt_for(current_profile(df), user_question, load_prompt_template(),
+                             PROMPT_TOKEN_BUDGET, COLUMN_RETRIEVAL_TOP_K)
 
-{schema_info}
-
-User Question: {user_question}
-
-Instructions:
-1. Generate ONLY the SQL query, nothing else
-2. Use the table name 'df' 
-3. Make sure the query is valid and will execute successfully
-4. For aggregation questions, use appropriate functions like COUNT(), SUM(), AVG(), etc.
-5. For data quality questions, check for nulls, duplicates, outliers, etc.
-6. Keep the query simple and focused on answering the question
-
-SQL Query:
-"""
+def generate_sql_query(user_question, schema_prompt):
+    """Use OpenAI to generate SQL query from natural language question"""
+    
+    prompt_template = load_prompt_template()
+    schema_info = schema_prompt.text
     
     # Format the prompt with the actual data
     prompt = prompt_template.format(
@@ -114,136 +186,244 @@ SQL Query:
         user_question=user_question
     )
 
+    # Token accounting for the developer report
+    st.session_state.prompt_token_log.append({
+        'question': user_question,
+        **measure_prompt(prompt, user_question, SYSTEM_MESSAGE, schema_prompt)
+    })
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert SQL analyst. Generate only SQL queries, no explanations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.1
-        )
-        
-        sql_query = response.choices[0].message.content
-        if sql_query:
-            sql_query = sql_query.strip()
-            # Clean up the response to get just the SQL
-            if sql_query.startswith("```sql"):
-                sql_query = sql_query[6:]
-            if sql_query.endswith("```"):
-                sql_query = sql_query[:-3]
-            
-            return sql_query.strip()
-        return None
+        if STREAM_SQL_GENERATION:
+            sql_placeholder = st.empty()
+            return stream_sql(
+                get_llm_gateway(), prompt, schema_info, user_question,
+                cache=get_response_cache(),
+                on_update=lambda partial_sql: sql_placeholder.code(partial_sql, language="sql")
+            )
+        return request_sql(get_llm_gateway(), prompt, schema_info, user_question, cache=get_response_cache())
     
+    except LLMGatewayError as e:
+        st.warning(f"⏳ {str(e)}")
+        return None
     except Exception as e:
         st.error(f"Error generating SQL query: {str(e)}")
         return None
 
-def execute_query(sql_query, df):
-    """Execute SQL query on the DataFrame using pandasql"""
+@st.cache_resource(show_spinner="Starting the query worker...", max_entries=4)
+def get_query_worker(fingerprint, _df):
+    """Worker process for one dataset, shared by every session that loads it
+
+    The dataset is copied to the worker once rather than once per session;
+    queries from different sessions take turns on it.
+    """
+    return WorkerQueryEngine(_df, should_cancel=query_interrupted)
+
+def get_query_engine(df):
+    """Return the session's query engine, reloading it only when the dataset changes"""
+    engine = st.session_state.query_engine
+    if engine is None or not engine.matches(df):
+        # Shared workers stay with the resource cache; only a session's own engine is closed
+        if engine is not None and not isinstance(engine, WorkerQueryEngine):
+            engine.close()
+        # Results of the previous dataset must not answer questions about this one
+        st.session_state.result_cache.clear()
+        if QUERY_WORKER_PROCESS:
+            engine = get_query_worker(dataset_fingerprint(df), df)
+        else:
+            engine = create_query_engine(df)
+        st.session_state.query_engine = engine
+    return engine
+
+def stop_query():
+    st.session_state.query_stopped = True
+
+def query_interrupted():
+    """Polled while the worker runs a query; refreshes its status line and never asks to cancel
+
+    Streamlit stops a script run at its next command once the user clicks
+    something (the Stop button, say) or leaves. The status update is such a
+    command, so the rerun raises out of here and the worker engine stops the
+    query with it. Threads outside a script run, like the example warm-up,
+    are not interrupted.
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return False
+    status = st.session_state.get('query_status')
+    if status is None:
+        return False
+    elapsed = time.monotonic() - status['started']
+    if elapsed - status['shown'] >= QUERY_STATUS_INTERVAL:
+        if not status['shown']:
+            status['button'].button("⏹️ Stop query", key=f"stop_query_{status['started']}", on_click=stop_query)
+        status['shown'] = elapsed
+        status['line'].caption(f"⏳ The query has been running for {elapsed:.0f}s")
+    return False
+
+def run_stoppable(run):
+    """Call run(), showing elapsed time and a Stop button while it takes longer than a moment"""
+    status = {'line': st.empty(), 'button': st.empty(), 'started': time.monotonic(), 'shown': 0.0}
+    st.session_state.query_status = status
+    try:
+        return run()
+    finally:
+        st.session_state.query_status = None
+        if status['shown']:
+            status['line'].empty()
+            status['button'].empty()
+
+def ensure_example_warmup(df):
+    """Start answering the example questions in the background once per loaded dataset"""
+    warmup = st.session_state.example_warmup
+    if not EXAMPLE_WARMUP or (warmup is not None and warmup.matches(df)):
+        return
+    if warmup is not None:
+        warmup.cancel()
+    # Shares the session's engine and result cache, so warm results also answer typed questions
+    pipeline = Pipeline(
+        df, get_llm_gateway(), cache=get_response_cache(), token_budget=PROMPT_TOKEN_BUDGET,
+        top_k=COLUMN_RETRIEVAL_TOP_K, approximate=st.session_state.approximate_profiling,
+        prompt_template=load_prompt_template(), repair_attempts=SQL_REPAIR_ATTEMPTS,
+        result_cache=st.session_state.result_cache, engine=get_query_engine(df),
+        select_star_limit=SELECT_STAR_LIMIT, use_intents=INTENT_FAST_PATH
+    )
+    st.session_state.example_warmup = ExampleWarmup(pipeline).start()
+
+def warmed_example(question, df):
+    """Return (sql_query, result) precomputed for an example question, or (None, None)"""
+    warmup = st.session_state.example_warmup
+    outcome = warmup.answer(question) if warmup is not None and warmup.matches(df) else None
+    if outcome is None:
+        return None, None
+    return outcome["sql_query"], outcome["result"]
+
+def answer_common_question(question, df):
+    """Answer a recognized data-quality question from the data without the AI, returning (sql_query, result)"""
+    match = match_intent(question, df) if INTENT_FAST_PATH else None
+    if match is None:
+        return None, None
+    result = match.answer(df, current_profile(df))
+    st.session_state.intent_log.append({'question': question, 'intent': match.name})
+    st.caption("⚡ Answered directly from the data, no AI call needed")
+    return result.sql_query, result
+
+def execute_query(sql_query, df, show_tips=True):
+    """Validate SQL, then execute it on the DataFrame using the configured query engine
+
+    The returned handle's sql_query is the statement that actually ran,
+    after any automatic fixes. Statements that already ran on this dataset
+    are answered from the session's result cache.
+    """
+    results = st.session_state.result_cache
     try:
-        result = psql.sqldf(sql_query, locals())
+        engine = get_query_engine(df)
+        fingerprint = dataset_fingerprint(df)
+        result = results.get(sql_query, fingerprint)
+        if result is not None:
+            st.session_state.last_query_error = None
+            return result
+        # Rejected or unplannable SQL fails here, before touching the data
+        validated = validate_sql(sql_query, df.columns, get_schema_checker(df), SELECT_STAR_LIMIT)
+        for note in validated.notes:
+            st.caption(f"🔧 {note}")
+        # Only the first page (and the row count) is fetched here; the rest is read on demand
+        result = run_stoppable(lambda: ResultHandle(engine, validated.sql))
+        results.put(sql_query, fingerprint, result)
+        results.put(result.sql_query, fingerprint, result)
+        st.session_state.last_query_error = None
         return result
+    except QueryAbortedError as e:
+        # Timed out, cancelled, or over the row/memory limit: the worker was stopped
+        st.session_state.last_query_error = e
+        return None
     except Exception as e:
-        error_msg = str(e)
-        
-        # Provide more helpful error messages
-        if "syntax error" in error_msg.lower():
-            if "transaction" in error_msg.lower():
-                st.warning("💡 **Tip:** Column names with spaces need to be quoted. Try using `[Transaction Value]` or `'Transaction Value'` in your question.")
-            else:
-                st.warning("💡 **Tip:** There's a syntax error in the SQL. This might be due to column names with spaces or special characters.")
-        elif "no such column" in error_msg.lower():
-            st.warning("💡 **Tip:** The column name might not exist or might have spaces. Check the schema for exact column names.")
-        elif "ambiguous column name" in error_msg.lower():
-            st.warning("💡 **Tip:** Multiple columns have similar names. Be more specific about which column you want.")
-        else:
-            st.warning(f"💡 **Tip:** {error_msg}")
-        
+        st.session_state.last_query_error = e
+        if show_tips:
+            show_query_tips(e)
         return None
 
-def format_result(result):
-    """Format the query result for display"""
-    if result is None or result.empty:
-        return "No results found."
-    
-    # Check if this is a single count result (common for null checks, totals, etc.)
-    if len(result) == 1 and len(result.columns) == 1:
-        # Single value result
-        value = result.iloc[0, 0]
-        column_name = result.columns[0]
-        return f"**Result:** {value}"
-    
-    # Check if this looks like a null count result (all numeric values in first row)
-    elif len(result) == 1 and all(isinstance(val, (int, float)) for val in result.iloc[0]):
-        # This is likely a count result - format it nicely
-        result_text = "**Null Count Results:**\n\n"
-        
-        # Check if these are null counts (columns with "_nulls" suffix)
-        null_columns = [col for col in result.columns if '_nulls' in col.lower()]
-        if null_columns:
-            # Format as null counts
-            for col, val in result.iloc[0].items():
-                if hasattr(val, 'item'):
-                    val = val.item()
-                # Clean up column name for display
-                clean_name = col.replace('_nulls', '').replace('_', ' ').title()
-                result_text += f"• **{clean_name}**: {val} null values\n"
-        else:
-            # Format as general counts
-            for col, val in result.iloc[0].items():
-                if hasattr(val, 'item'):
-                    val = val.item()
-                result_text += f"• **{col}**: {val}\n"
-        
-        return result_text
-    
-    # Check if this looks like a malformed result (all column names as headers)
-    elif len(result) == 1 and len(result.columns) > 10 and all(str(val).isdigit() for val in result.iloc[0]):
-        # This might be a malformed query result - try to interpret it as counts
-        result_text = "**Results (interpreted as counts):**\n\n"
-        for col, val in result.iloc[0].items():
-            if hasattr(val, 'item'):
-                val = val.item()
-            result_text += f"• **{col}**: {val}\n"
-        return result_text
-    
-    # Check if this is a null count result with multiple rows (one per column)
-    elif len(result) > 1 and len(result.columns) == 1 and 'null_count' in str(result.columns[0]).lower():
-        # This is likely a null count query that returned multiple rows
-        result_text = "**Null Count Results:**\n\n"
-        for i, (idx, row) in enumerate(result.iterrows()):
-            val = row.iloc[0]
-            if hasattr(val, 'item'):
-                val = val.item()
-            result_text += f"• **Column {i + 1}**: {val} null values\n"
-        return result_text
-    
-    # Check if this is a simple count result with multiple rows
-    elif len(result) > 1 and len(result.columns) == 1:
-        # This might be a count query that returned multiple rows
-        result_text = "**Count Results:**\n\n"
-        for i, (idx, row) in enumerate(result.iterrows()):
-            val = row.iloc[0]
-            if hasattr(val, 'item'):
-                val = val.item()
-            result_text += f"• **Count {i + 1}**: {val}\n"
-        return result_text
+def show_query_tips(error):
+    """Explain a failed query based on the engine's error message"""
+    error_msg = str(error)
+    if isinstance(error, QueryAbortedError):
+        return
     
+    # Provide more helpful error messages
+    if "syntax error" in error_msg.lower():
+        if "transaction" in error_msg.lower():
+            st.warning("💡 **Tip:** Column names with spaces need to be quoted. Try using `[Transaction Value]` or `'Transaction Value'` in your question.")
+        else:
+            st.warning("💡 **Tip:** There's a syntax error in the SQL. This might be due to column names with spaces or special characters.")
+    elif "no such column" in error_msg.lower():
+        st.warning("💡 **Tip:** The column name might not exist or might have spaces. Check the schema for exact column names.")
+    elif "ambiguous column name" in error_msg.lower():
+        st.warning("💡 **Tip:** Multiple columns have similar names. Be more specific about which column you want.")
     else:
-        # Regular table result - return the DataFrame object for Streamlit to render
-        if len(result) <= 10:  # Show full table for small results
-            return {"type": "table", "data": result, "message": f"**Results ({len(result)} rows):**"}
-        else:  # Show first 10 rows for large results
-            return {"type": "table", "data": result.head(10), "message": f"**Results ({len(result)} rows, showing first 10):**"}
+        st.warning(f"💡 **Tip:** {error_msg}")
+
+def repair_failed_query(user_question, schema_info, sql_query, error):
+    """Send failing SQL and its error back to the model until a fix runs; returns a ResultHandle or None"""
+    prompt = load_prompt_template().format(schema_info=schema_info, user_question=user_question)
+
+    def check(candidate):
+        result = execute_query(candidate, st.session_state.df, show_tips=False)
+        if result is None:
+            raise st.session_state.last_query_error
+        return result
+
+    try:
+        with st.spinner("🛠️ The query failed, asking the AI to fix it..."):
+            _, result, log = repair_sql(
+                get_llm_gateway(), prompt, sql_query, error, check, question=user_question,
+                max_attempts=SQL_REPAIR_ATTEMPTS, cache=get_response_cache(), schema_info=schema_info
+            )
+    except Exception as e:
+        logger.warning("SQL repair failed: %s", e)
+        st.session_state.last_query_error = error
+        return None
+
+    st.session_state.repair_log.append(log.as_dict())
+    if result is None:
+        # Report the original failure, not the last candidate's
+        st.session_state.last_query_error = error
+        return None
+    st.caption(f"🛠️ The first query failed ({error}); fixed automatically after {len(log.attempts)} repair attempt(s).")
+    return result
+
+def show_table_result(content, key):
+    """Render a table result one page at a time, with a CSV download built on click"""
+    st.markdown(content["message"])
+    handle = content.get("result")
+    data = table_rows(content)
+    if handle is not None and handle.page_count > 1:
+        page = st.number_input(
+            f"Page (of {handle.page_count})", min_value=1, max_value=handle.page_count, value=1, key=f"page_{key}"
+        )
+        try:
+            data = handle.page(page - 1)
+        except QueryAbortedError as e:
+            st.warning(f"⏱️ {e}")
+        except Exception:
+            st.caption("These results belong to a dataset that is no longer loaded; showing the first page.")
+    st.dataframe(data, use_container_width=True)
+    if handle is not None:
+        st.download_button(
+            "📥 Download all rows (CSV)",
+            data=handle.csv_bytes,
+            file_name="query_result.csv",
+            mime="text/csv",
+            key=f"download_{key}"
+        )
 
 def get_query_suggestions(user_question, error_type):
     """Get suggestions for improving the user question based on error type"""
     suggestions = []
     
-    if "syntax error" in error_type.lower():
+    if error_type == "stopped":
+        suggestions.append("Ask for a summary (counts, totals, averages) instead of every row")
+        suggestions.append("Narrow the question down, e.g. to one fiscal year or company code")
+        suggestions.append("Ask for the top N rows only")
+    
+    elif "syntax error" in error_type.lower():
         suggestions.append("Try rephrasing your question to be more specific about column names")
         suggestions.append("Use simpler language and avoid complex conditions")
         suggestions.append("Mention the exact column name you want to analyze")
@@ -271,7 +451,8 @@ def save_to_favorites(question, sql_query, result_summary):
         "question": question,
         "sql_query": sql_query,
         "result_summary": result_summary,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "schema_fingerprint": current_profile(st.session_state.df).schema_fingerprint
     }
     for existing in st.session_state.favorites:
         if existing["question"] == question and existing["sql_query"] == sql_query:
@@ -280,81 +461,155 @@ def save_to_favorites(question, sql_query, result_summary):
     save_favorites_to_file(st.session_state.favorites)
     return True
 
+def load_dataset(source):
+    """Load a CSV through the columnar cache and compact its dtypes, showing progress"""
+    progress = st.progress(0.0, text="Loading data...")
+    try:
+        df = load_csv_cached(
+            source,
+            progress_callback=lambda fraction, rows: progress.progress(fraction, text=f"Loaded {rows:,} rows...")
+        )
+        progress.progress(1.0, text="Optimizing column types...")
+        df, st.session_state.df_optimization = optimize_dtypes(df)
+        return df
+    finally:
+        progress.empty()
+
+def current_quality_metrics(df):
+    """Running metrics once batches were appended, otherwise the cached (or sketched) scan"""
+    if st.session_state.dq_incremental is not None:
+        return st.session_state.dq_incremental
+    if st.session_state.approximate_profiling:
+        return get_approximate_quality_metrics(df)
+    return get_quality_metrics(df)
+
+def append_batch(source):
+    """Append a CSV of new rows to the dataset, updating quality metrics from those rows only
+
+    The fingerprint is extended from the new rows too, but the profile is
+    computed again and the query engine reloads the combined dataset on the
+    next question.
+    """
+    df = st.session_state.df
+    batch, _ = optimize_dtypes(load_csv_cached(source))
+    if list(batch.columns) != list(df.columns):
+        raise ValueError("The batch must have the same columns as the loaded dataset")
+    combined = concat_frames([df, batch])
+    metrics = st.session_state.dq_incremental
+    if metrics is None:
+        # First append: one pass over the original rows seeds the running aggregates
+        metrics = IncrementalQualityMetrics().update(combined.iloc[:len(df)])
+    metrics.update(combined.iloc[len(df):])
+    extend_fingerprint(df, combined)
+    st.session_state.df = combined
+    st.session_state.dq_incremental = metrics
+    if st.session_state.get('dq_report') is not None:
+        st.session_state.dq_report = metrics
+    return len(batch)
+
+def reset_appended_batches():
+    st.session_state.dq_incremental = None
+    st.session_state.appended_batches = []
+
 def remove_from_favorites(favorite_id):
     st.session_state.favorites = [f for f in st.session_state.favorites if f["id"] != favorite_id]
     save_favorites_to_file(st.session_state.favorites)
 
+def replay_favorite(favorite, df):
+    """Run a favorite's stored SQL directly, returning (sql_query, result)
+
+    Returns (None, None) when the favorite was saved against a different
+    schema or its SQL no longer runs, so the caller can regenerate it.
+    """
+    if not favorite_matches(favorite, current_profile(df)):
+        return None, None
+    result = execute_query(favorite["sql_query"], df, show_tips=False)
+    if result is None:
+        return None, None
+    return result.sql_query, result
+
 def generate_developer_report(df, messages):
     """Generate a comprehensive developer report"""
     report = {}
+    profile = current_profile(df)
+    quality = current_quality_metrics(df)
+    rows = max(1, profile.rows)
     
     # Basic dataset info
     report['dataset_info'] = {
-        'rows': len(df),
-        'columns': len(df.columns),
-        'memory_usage_mb': df.memory_usage(deep=True).sum() / (1024 * 1024),
-        'null_values_total': df.isnull().sum().sum(),
-        'duplicate_rows': df.duplicated().sum()
+        'rows': profile.rows,
+        'columns': profile.column_count,
+        'memory_usage_mb': profile.memory_usage_bytes / (1024 * 1024),
+        'null_values_total': profile.null_values_total,
+        'duplicate_rows': quality.duplicates
     }
+    optimization = st.session_state.get('df_optimization')
+    if optimization:
+        report['dataset_info']['memory_before_optimization_mb'] = optimization['memory_before_bytes'] / (1024 * 1024)
+        report['dataset_info']['memory_saved_percentage'] = optimization['memory_saved_percentage']
+        report['dtype_optimizations'] = optimization['conversions']
     
     # Column analysis
     column_analysis = []
-    for col in df.columns:
+    for col in profile.columns:
         col_info = {
-            'column_name': col,
-            'data_type': str(df[col].dtype),
-            'null_count': int(df[col].isnull().sum()),
-            'null_percentage': round((df[col].isnull().sum() / len(df)) * 100, 2),
-            'unique_count': int(df[col].nunique()),
-            'unique_percentage': round((df[col].nunique() / len(df)) * 100, 2)
+            'column_name': col.name,
+            'data_type': col.dtype,
+            'null_count': col.null_count,
+            'null_percentage': round((col.null_count / rows) * 100, 2),
+            'unique_count': col.unique_count,
+            'unique_percentage': round((col.unique_count / rows) * 100, 2)
         }
         
         # Add sample values
-        sample_values = df[col].dropna().head(5).tolist()
-        col_info['sample_values'] = [str(v) for v in sample_values]
+        col_info['sample_values'] = col.sample_values
         
         # Add statistics for numeric columns
-        if df[col].dtype in ['int64', 'float64']:
-            col_info['min'] = float(df[col].min()) if not df[col].isnull().all() else None
-            col_info['max'] = float(df[col].max()) if not df[col].isnull().all() else None
-            col_info['mean'] = float(df[col].mean()) if not df[col].isnull().all() else None
-            col_info['std'] = float(df[col].std()) if not df[col].isnull().all() else None
+        if col.is_numeric:
+            col_info['min'] = col.min
+            col_info['max'] = col.max
+            col_info['mean'] = col.mean
+            col_info['std'] = col.std
         
         column_analysis.append(col_info)
     
     report['column_analysis'] = column_analysis
     
     # Data quality metrics
-    import numpy as np
     quality_metrics = {}
     
     # Missing values analysis
-    missing_per_col = df.isnull().sum()
+    missing_by_column = profile.missing_by_column
     quality_metrics['missing_values'] = {
-        'total_missing': int(missing_per_col.sum()),
-        'percentage_missing': round((missing_per_col.sum() / (len(df) * len(df.columns))) * 100, 2),
-        'columns_with_missing': int((missing_per_col > 0).sum()),
-        'missing_by_column': missing_per_col.to_dict()
+        'total_missing': profile.null_values_total,
+        'percentage_missing': round((profile.null_values_total / (rows * max(1, profile.column_count))) * 100, 2),
+        'columns_with_missing': sum(1 for count in missing_by_column.values() if count > 0),
+        'missing_by_column': missing_by_column
     }
     
     # Duplicate analysis
     quality_metrics['duplicates'] = {
-        'duplicate_rows': int(df.duplicated().sum()),
-        'duplicate_percentage': round((df.duplicated().sum() / len(df)) * 100, 2)
+        'duplicate_rows': quality.duplicates,
+        'duplicate_percentage': round(quality.percent_duplicates, 2)
     }
     
     # Outlier analysis for numeric columns
     outlier_analysis = {}
-    for col in df.select_dtypes(include=[np.number]).columns:
-        if not df[col].isnull().all():
-            z_scores = np.abs((df[col] - df[col].mean()) / df[col].std())
-            outliers = (z_scores > 3).sum()
-            outlier_analysis[col] = {
-                'outlier_count': int(outliers),
-                'outlier_percentage': round((outliers / len(df)) * 100, 2)
-            }
+    for col in quality.column_stats:
+        outliers = quality.outliers[col]
+        outlier_analysis[col] = {
+            'outlier_count': outliers,
+            'outlier_percentage': round((outliers / rows) * 100, 2)
+        }
     
     quality_metrics['outliers'] = outlier_analysis
+    quality_metrics['score'] = quality.score
+    if getattr(quality, 'approximate', False):
+        quality_metrics['error_bounds'] = {
+            'duplicate_rows': quality.error_bounds['duplicates'],
+            'total_outliers': quality.error_bounds['total_outliers'],
+            'distinct_count_relative_error': round(profile.distinct_relative_error * 100, 2)
+        }
     
     # Chat history analysis
     chat_analysis = {
@@ -368,10 +623,10 @@ def generate_developer_report(df, messages):
     
     # Extract SQL queries and their results
     sql_queries = []
-    for msg in messages:
+    for position, msg in enumerate(messages):
         if msg.get('sql_query'):
             sql_queries.append({
-                'question': next((m['content'] for m in messages[:messages.index(msg)] if m['role'] == 'user'), 'Unknown'),
+                'question': next((m['content'] for m in reversed(messages[:position]) if m['role'] == 'user'), 'Unknown'),
                 'sql_query': msg['sql_query'],
                 'success': not msg.get('error', False),
                 'result_type': 'table' if isinstance(msg.get('content'), dict) and msg.get('content', {}).get('type') == 'table' else 'text'
@@ -379,6 +634,39 @@ def generate_developer_report(df, messages):
     
     report['quality_metrics'] = quality_metrics
     report['chat_analysis'] = chat_analysis
+    report['llm_cache'] = get_response_cache().stats()
+    report['result_cache'] = st.session_state.result_cache.stats()
+    warmup = st.session_state.get('example_warmup')
+    report['example_warmup'] = warmup.stats() if warmup is not None else None
+    intent_log = st.session_state.get('intent_log', [])
+    by_intent = {}
+    for entry in intent_log:
+        by_intent[entry['intent']] = by_intent.get(entry['intent'], 0) + 1
+    report['intent_fast_path'] = {
+        'enabled': INTENT_FAST_PATH,
+        'answered_without_ai': len(intent_log),
+        'by_intent': by_intent,
+        'per_question': intent_log
+    }
+
+    token_log = st.session_state.get('prompt_token_log', [])
+    report['prompt_tokens'] = {
+        'budget': PROMPT_TOKEN_BUDGET,
+        'requests': len(token_log),
+        'total_prompt_tokens': sum(entry['prompt_tokens'] for entry in token_log),
+        'average_prompt_tokens': round(sum(entry['prompt_tokens'] for entry in token_log) / len(token_log), 1) if token_log else 0,
+        'stable_prefix_tokens': token_log[-1]['stable_prefix_tokens'] if token_log else 0,
+        'per_request': token_log
+    }
+    repair_log = st.session_state.get('repair_log', [])
+    report['self_repair'] = {
+        'failed_first_queries': len(repair_log),
+        'repaired': sum(1 for entry in repair_log if entry['repaired']),
+        'average_attempts': round(sum(entry['attempts'] for entry in repair_log) / len(repair_log), 2) if repair_log else 0,
+        'average_seconds': round(sum(entry['seconds'] for entry in repair_log) / len(repair_log), 2) if repair_log else 0,
+        'total_tokens': sum(entry['prompt_tokens'] + entry['completion_tokens'] for entry in repair_log),
+        'per_question': repair_log
+    }
     report['sql_queries'] = sql_queries
     
     return report
@@ -400,9 +688,13 @@ with st.sidebar:
     if data_option == "Use Sample Data":
         if st.button("Load Sample Data"):
             try:
-                df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+                df = load_dataset(SAMPLE_DATA_FILE)
                 st.session_state.df = df
                 st.session_state.df_name = "Sample Data (Accrual Accounts)"
+                st.session_state.df_source = SAMPLE_DATA_FILE
+                reset_appended_batches()
+                current_profile(df)
+                current_quality_metrics(df)
                 st.success("Sample data loaded successfully!")
             except Exception as e:
                 st.error(f"Error loading sample data: {str(e)}")
@@ -414,14 +706,48 @@ with st.sidebar:
             help="Upload a CSV file to analyze"
         )
         
-        if uploaded_file is not None:
+        # The uploader keeps its file across reruns; only parse a newly uploaded one
+        if uploaded_file is not None and uploaded_file.file_id != st.session_state.df_source:
             try:
-                df = pd.read_csv(uploaded_file)
+                df = load_dataset(uploaded_file)
                 st.session_state.df = df
                 st.session_state.df_name = uploaded_file.name
+                st.session_state.df_source = uploaded_file.file_id
+                reset_appended_batches()
+                current_profile(df)
+                current_quality_metrics(df)
                 st.success(f"File '{uploaded_file.name}' loaded successfully!")
+            except MemoryError:
+                st.error(f"File '{uploaded_file.name}' is too large to fit in memory. Try exporting fewer columns or rows.")
             except Exception as e:
                 st.error(f"Error loading file: {str(e)}")
+
+    st.checkbox(
+        "⚡ Approximate profiling",
+        key="approximate_profiling",
+        help="For very large datasets: estimate unique counts, duplicates and outliers with "
+             "fixed-size sketches (HyperLogLog, Bloom filter, sampling) instead of exact scans"
+    )
+
+    # Appending rows to the loaded dataset keeps quality metrics incremental
+    if st.session_state.df is not None:
+        batch_file = st.file_uploader(
+            "➕ Append a batch of rows",
+            type=['csv'],
+            key="append_batch",
+            help="Upload a CSV with the same columns to add its rows to the current dataset"
+        )
+        if batch_file is not None and batch_file.file_id not in st.session_state.appended_batches:
+            try:
+                added = append_batch(batch_file)
+                st.session_state.appended_batches.append(batch_file.file_id)
+                st.success(f"Appended {added:,} rows from '{batch_file.name}'")
+            except MemoryError:
+                st.error(f"File '{batch_file.name}' is too large to fit in memory.")
+            except Exception as e:
+                st.error(f"Error appending batch: {str(e)}")
+        if st.session_state.appended_batches:
+            st.caption(f"{len(st.session_state.appended_batches)} batch(es) appended")
     
     # Favorites section
     st.header("⭐ Favorites")
@@ -436,7 +762,7 @@ with st.sidebar:
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     if st.button("🔄 Run Again", key=f"run_fav_{favorite['id']}"):
-                        st.session_state.run_favorite = favorite['question']
+                        st.session_state.run_favorite = favorite
                         st.rerun()
                 with col2:
                     if st.button("🗑️ Remove", key=f"remove_fav_{favorite['id']}"):
@@ -451,52 +777,30 @@ with st.sidebar:
 # Main chat interface
 if st.session_state.df is not None:
     st.header(f"📊 Analyzing: {st.session_state.df_name}")
+    ensure_example_warmup(st.session_state.df)
     
     # Display data info
+    profile = current_profile(st.session_state.df)
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Rows", len(st.session_state.df))
+        st.metric("Rows", profile.rows)
     with col2:
-        st.metric("Columns", len(st.session_state.df.columns))
+        st.metric("Columns", profile.column_count)
     with col3:
-        st.metric("Memory Usage", f"{st.session_state.df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+        optimization = st.session_state.df_optimization
+        saved_kb = (optimization['memory_before_bytes'] - optimization['memory_after_bytes']) / 1024 if optimization else 0
+        st.metric(
+            "Memory Usage", f"{profile.memory_usage_bytes / 1024:.1f} KB",
+            delta=f"-{saved_kb:.1f} KB optimized" if saved_kb > 0 else None, delta_color="inverse"
+        )
     with col4:
-        null_count = st.session_state.df.isnull().sum().sum()
-        st.metric("Null Values", null_count)
+        st.metric("Null Values", profile.null_values_total)
     
     # Data Quality Dashboard Button
     if st.button("🧪 Generate Data Quality Dashboard", key="dq_dashboard_btn"):
-        df = st.session_state.df
-        dq_report = {}
-        # Missing values
-        missing_per_col = df.isnull().sum()
-        total_missing = missing_per_col.sum()
-        percent_missing = (total_missing / (df.shape[0] * df.shape[1])) * 100
-        dq_report['missing'] = missing_per_col
-        dq_report['total_missing'] = total_missing
-        dq_report['percent_missing'] = percent_missing
-        # Duplicates
-        duplicate_rows = df.duplicated().sum()
-        dq_report['duplicates'] = duplicate_rows
-        percent_duplicates = (duplicate_rows / df.shape[0]) * 100 if df.shape[0] > 0 else 0
-        dq_report['percent_duplicates'] = percent_duplicates
-        # Outliers (z-score > 3 or < -3 for numeric columns)
-        import numpy as np
-        outlier_counts = {}
-        for col in df.select_dtypes(include=[np.number]).columns:
-            col_z = (df[col] - df[col].mean()) / df[col].std(ddof=0)
-            outliers = ((col_z > 3) | (col_z < -3)).sum()
-            outlier_counts[col] = int(outliers)
-        dq_report['outliers'] = outlier_counts
-        total_outliers = sum(outlier_counts.values())
-        dq_report['total_outliers'] = total_outliers
-        percent_outliers = (total_outliers / (df.shape[0] * max(1, len(outlier_counts)))) * 100 if len(outlier_counts) > 0 else 0
-        dq_report['percent_outliers'] = percent_outliers
-        # Data Quality Score (simple formula: 100 - weighted sum of issues)
-        score = 100 - (percent_missing * 0.5 + percent_duplicates * 0.3 + percent_outliers * 0.2)
-        score = max(0, min(100, round(score, 1)))
-        dq_report['score'] = score
-        st.session_state.dq_report = dq_report
+        # Computed once per dataset (or kept up to date per appended batch)
+        # and shared with the developer report
+        st.session_state.dq_report = current_quality_metrics(st.session_state.df)
         st.session_state.show_dq_dashboard = True
         st.rerun()
 
@@ -505,31 +809,37 @@ if st.session_state.df is not None:
         dq = st.session_state.dq_report
         st.subheader('🧪 Data Quality Dashboard')
         # Score visual
-        if dq['score'] >= 90:
+        if dq.score >= 90:
             emoji = '🟢'
-        elif dq['score'] >= 70:
+        elif dq.score >= 70:
             emoji = '🟡'
         else:
             emoji = '🔴'
-        st.markdown(f"### {emoji} Data Quality Score: **{dq['score']} / 100**")
-        st.progress(dq['score'] / 100)
+        st.markdown(f"### {emoji} Data Quality Score: **{dq.score} / 100**")
+        st.progress(dq.score / 100)
         # Metrics
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Missing Values", f"{dq['total_missing']}", delta=f"{dq['percent_missing']:.2f}%")
+            st.metric("Missing Values", f"{dq.total_missing}", delta=f"{dq.percent_missing:.2f}%")
         with col2:
-            st.metric("Duplicate Rows", f"{dq['duplicates']}", delta=f"{dq['percent_duplicates']:.2f}%")
+            st.metric("Duplicate Rows", f"{dq.duplicates}", delta=f"{dq.percent_duplicates:.2f}%")
         with col3:
-            st.metric("Outliers (numeric)", f"{dq['total_outliers']}", delta=f"{dq['percent_outliers']:.2f}%")
+            st.metric("Outliers (numeric)", f"{dq.total_outliers}", delta=f"{dq.percent_outliers:.2f}%")
+        if getattr(dq, 'approximate', False):
+            st.caption(
+                f"≈ Approximate profile (95% error bounds): duplicates ±{dq.error_bounds['duplicates']:,}, "
+                f"outliers ±{dq.error_bounds['total_outliers']:,}, "
+                f"distinct counts ±{current_profile(st.session_state.df).distinct_relative_error * 200:.1f}%"
+            )
         # Missing values per column
         st.markdown("#### Missing Values by Column")
-        missing_df = dq['missing'].to_frame('Missing Count')
+        missing_df = dq.missing.to_frame('Missing Count')
         missing_df = missing_df[missing_df['Missing Count'] != 0]
         st.dataframe(missing_df)
         # Outliers per column
-        if dq['outliers']:
+        if dq.outliers:
             st.markdown("#### Outliers by Numeric Column")
-            outlier_df = pd.DataFrame.from_dict(dq['outliers'], orient='index').reset_index()
+            outlier_df = pd.DataFrame.from_dict(dq.outliers, orient='index').reset_index()
             outlier_df.columns = ["Column", "Outlier Count"]
             outlier_df = outlier_df[outlier_df["Outlier Count"] != 0]
             st.dataframe(outlier_df)
@@ -541,8 +851,13 @@ if st.session_state.df is not None:
     # Chat interface
     st.subheader("💬 Ask Questions About Your Data")
     
-    # Display chat messages
+    # Display chat messages; older ones only when asked for
+    first_shown = max(0, len(st.session_state.messages) - CHAT_HISTORY_EAGER_MESSAGES)
+    if first_shown and st.toggle(f"Show {first_shown} earlier messages", key="show_earlier_messages"):
+        first_shown = 0
     for idx, message in enumerate(st.session_state.messages):
+        if idx < first_shown:
+            continue
         with st.chat_message(message["role"]):
             if message["role"] == "user":
                 st.write(message["content"])
@@ -550,8 +865,7 @@ if st.session_state.df is not None:
                 # Handle different content types
                 content = message["content"]
                 if isinstance(content, dict) and content.get("type") == "table":
-                    st.markdown(content["message"])
-                    st.dataframe(content["data"], use_container_width=True)
+                    show_table_result(content, idx)
                 else:
                     st.write(content)
                 
@@ -569,7 +883,7 @@ if st.session_state.df is not None:
                         if st.button("⭐ Save to Favorites", key=f"save_fav_{idx}"):
                             # Create a summary of the result
                             if isinstance(content, dict) and content.get("type") == "table":
-                                result_summary = f"Table with {len(content['data'])} rows"
+                                result_summary = f"Table with {content['rows']} rows"
                             else:
                                 result_summary = str(content)[:100] + "..." if len(str(content)) > 100 else str(content)
                             if save_to_favorites(user_question, message["sql_query"], result_summary):
@@ -577,6 +891,11 @@ if st.session_state.df is not None:
                             else:
                                 st.warning("⚠️ This query is already in your favorites!")
                             st.rerun()
+    # Paging through results fetches rows; spill the oldest tables if that went over the cap
+    st.session_state.messages.enforce_cap()
+    if st.session_state.query_stopped:
+        st.session_state.query_stopped = False
+        st.info("⏹️ The query was stopped. Ask again, or narrow the question down.")
     
     # Chat input
     if st.session_state.edit_question is not None:
@@ -608,6 +927,8 @@ if st.session_state.df is not None:
     
         # Process any pending question (from chat input, edit, or example)
     prompt_to_process = None
+    favorite_to_replay = None
+    example_to_answer = False
     
     if 'prompt' in locals() and prompt:
         prompt_to_process = prompt.strip()
@@ -615,10 +936,12 @@ if st.session_state.df is not None:
         prompt_to_process = edited_question.strip()
     elif hasattr(st.session_state, 'process_example') and st.session_state.process_example:
         prompt_to_process = st.session_state.process_example.strip()
+        example_to_answer = True
         # Clear the example flag after processing
         st.session_state.process_example = None
     elif hasattr(st.session_state, 'run_favorite') and st.session_state.run_favorite:
-        prompt_to_process = st.session_state.run_favorite.strip()
+        favorite_to_replay = st.session_state.run_favorite
+        prompt_to_process = favorite_to_replay['question'].strip()
         # Clear the favorite flag after processing
         st.session_state.run_favorite = None
     
@@ -626,17 +949,39 @@ if st.session_state.df is not None:
         # Generate and execute SQL query
         with st.chat_message("assistant"):
             with st.spinner("Analyzing your data..."):
-                # Get schema information
-                schema_info = get_schema_info(st.session_state.df)
-                print("[DEBUG] Schema Info:\n", schema_info)
+                # Common data-quality questions skip the LLM and the query engine
+                sql_query, result = answer_common_question(prompt_to_process, st.session_state.df)
                 
-                # Generate SQL query
-                sql_query = generate_sql_query(prompt_to_process, schema_info)
+                # Favorites replay their stored SQL without calling the LLM
+                if result is None and favorite_to_replay is not None:
+                    sql_query, result = replay_favorite(favorite_to_replay, st.session_state.df)
                 
-                if sql_query:
-                    # Execute query
-                    result = execute_query(sql_query, st.session_state.df)
+                # Example questions are answered from the background warm-up once it has them
+                if result is None and example_to_answer:
+                    sql_query, result = warmed_example(prompt_to_process, st.session_state.df)
+                
+                if result is None:
+                    # Get schema information
+                    schema_prompt = get_schema_prompt(st.session_state.df, prompt_to_process)
+                    schema_info = schema_prompt.text
+                    print("[DEBUG] Schema Info:\n", schema_info)
+                    
+                    # Generate SQL query
+                    sql_query = generate_sql_query(prompt_to_process, schema_prompt)
                     
+                    if sql_query:
+                        # Execute query
+                        result = execute_query(sql_query, st.session_state.df, show_tips=False)
+                        query_error = st.session_state.last_query_error
+                        # Broken (not stopped) queries go back to the model with their error
+                        if result is None and SQL_REPAIR_ATTEMPTS and not isinstance(query_error, QueryAbortedError):
+                            result = repair_failed_query(prompt_to_process, schema_info, sql_query, query_error)
+                        if result is not None:
+                            sql_query = result.sql_query
+                        else:
+                            show_query_tips(st.session_state.last_query_error)
+                
+                if sql_query:
                     if result is not None:
                         # Format and display result
                         formatted_result = format_result(result)
@@ -644,8 +989,7 @@ if st.session_state.df is not None:
                         # Handle different result types
                         if isinstance(formatted_result, dict) and formatted_result.get("type") == "table":
                             # Display table result
-                            st.markdown(formatted_result["message"])
-                            st.dataframe(formatted_result["data"], use_container_width=True)
+                            show_table_result(formatted_result, len(st.session_state.messages))
                             
                             # Add assistant message to chat
                             st.session_state.messages.append({
@@ -668,7 +1012,7 @@ if st.session_state.df is not None:
                         if st.button("⭐ Save to Favorites", key=f"save_fav_{len(st.session_state.messages)}"):
                             # Create a summary of the result
                             if isinstance(formatted_result, dict) and formatted_result.get("type") == "table":
-                                result_summary = f"Table with {len(formatted_result['data'])} rows"
+                                result_summary = f"Table with {formatted_result['rows']} rows"
                             else:
                                 result_summary = str(formatted_result)[:100] + "..." if len(str(formatted_result)) > 100 else str(formatted_result)
                             
@@ -678,18 +1022,34 @@ if st.session_state.df is not None:
                                 st.warning("⚠️ This query is already in your favorites!")
                             st.rerun()
                     else:
+                        # Don't serve the failing SQL from the cache next time
+                        get_response_cache().discard_response(sql_query)
+                        
                         # Handle query execution error gracefully
-                        error_message = "❌ **Query Execution Failed**\n\n"
-                        error_message += "The generated SQL query couldn't be executed. This might be due to:\n"
-                        error_message += "• Column names with spaces or special characters\n"
-                        error_message += "• Invalid SQL syntax\n"
-                        error_message += "• Data type mismatches\n\n"
+                        query_error = st.session_state.last_query_error
+                        if isinstance(query_error, QueryAbortedError):
+                            # Timeout, cancellation, row or memory limit
+                            error_type = "stopped"
+                            error_message = "⏱️ **Query Stopped**\n\n"
+                            error_message += f"{query_error}\n\n"
+                        elif isinstance(query_error, SQLValidationError):
+                            # Caught by the checks before execution
+                            error_type = str(query_error)
+                            error_message = "❌ **Query Rejected**\n\n"
+                            error_message += f"The generated SQL was not run: {query_error}\n\n"
+                        else:
+                            error_type = "syntax error"
+                            error_message = "❌ **Query Execution Failed**\n\n"
+                            error_message += "The generated SQL query couldn't be executed. This might be due to:\n"
+                            error_message += "• Column names with spaces or special characters\n"
+                            error_message += "• Invalid SQL syntax\n"
+                            error_message += "• Data type mismatches\n\n"
                         
                         # Show the problematic SQL
                         error_message += f"**Generated SQL:**\n```sql\n{sql_query}\n```\n\n"
                         
                         # Get suggestions based on the error
-                        suggestions = get_query_suggestions(prompt_to_process, "syntax error")
+                        suggestions = get_query_suggestions(prompt_to_process, error_type)
                         if suggestions:
                             error_message += "**💡 Suggestions:**\n"
                             for suggestion in suggestions:
@@ -753,7 +1113,7 @@ if st.session_state.df is not None:
     
     # Clear chat button
     if st.button("🗑️ Clear Chat"):
-        st.session_state.messages = []
+        st.session_state.messages.clear()
         st.rerun()
     
     # Help interfaces
@@ -778,10 +1138,8 @@ if st.session_state.df is not None:
         
         # Show column names with data types
         col_info = []
-        for col in st.session_state.df.columns:
-            dtype = str(st.session_state.df[col].dtype)
-            null_count = st.session_state.df[col].isnull().sum()
-            col_info.append(f"• **{col}** ({dtype}) - {null_count} null values")
+        for col in current_profile(st.session_state.df).columns:
+            col_info.append(f"• **{col.name}** ({col.dtype}) - {col.null_count} null values")
         
         st.markdown("\n".join(col_info))
         
@@ -809,6 +1167,16 @@ if st.session_state.df is not None:
         with col4:
             st.metric("Duplicate Rows", info['duplicate_rows'])
         
+        if report.get('dtype_optimizations'):
+            st.caption(
+                f"Column types optimized: {info['memory_before_optimization_mb']:.2f} MB → "
+                f"{info['memory_usage_mb']:.2f} MB ({info['memory_saved_percentage']:.1f}% saved)"
+            )
+            st.dataframe(
+                pd.DataFrame(list(report['dtype_optimizations'].items()), columns=["Column", "Conversion"]),
+                use_container_width=True
+            )
+        
         # Data Quality Summary
         st.markdown("#### 🔍 Data Quality Analysis")
         qm = report['quality_metrics']
@@ -829,8 +1197,14 @@ if st.session_state.df is not None:
         with col1:
             st.metric("Duplicate Rows", dup_info['duplicate_rows'], delta=f"{dup_info['duplicate_percentage']:.2f}%")
         with col2:
-            total_outliers = sum(qm['outliers'].values()) if qm['outliers'] else 0
+            total_outliers = sum(info['outlier_count'] for info in qm['outliers'].values())
             st.metric("Total Outliers", total_outliers)
+        if 'error_bounds' in qm:
+            bounds = qm['error_bounds']
+            st.caption(
+                f"≈ Approximate profile (95% error bounds): duplicates ±{bounds['duplicate_rows']:,}, "
+                f"outliers ±{bounds['total_outliers']:,}, unique counts ±{bounds['distinct_count_relative_error'] * 2:.1f}%"
+            )
         
         # Column Analysis
         st.markdown("#### 📋 Column Analysis")
@@ -850,6 +1224,85 @@ if st.session_state.df is not None:
         with col4:
             st.metric("Failed Queries", chat_info['failed_queries'])
         
+        # LLM response cache
+        st.markdown("#### ⚡ LLM Response Cache")
+        cache_info = report['llm_cache']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Cache Hits", cache_info['hits'])
+        with col2:
+            st.metric("Cache Misses", cache_info['misses'])
+        with col3:
+            st.metric("Hit Rate", f"{cache_info['hit_rate']:.2f}%")
+        
+        # Query results reused for repeated SQL
+        st.markdown("#### 🗃️ Query Result Cache")
+        result_cache_info = report['result_cache']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Cache Hits", result_cache_info['hits'])
+        with col2:
+            st.metric("Cache Misses", result_cache_info['misses'])
+        with col3:
+            st.metric("Hit Rate", f"{result_cache_info['hit_rate']:.2f}%")
+        with col4:
+            st.metric("Cached Results", result_cache_info['entries'],
+                      help=f"{result_cache_info['bytes'] / 1024:,.1f} KB of {result_cache_info['max_bytes'] / (1024 * 1024):,.0f} MB, "
+                           f"{result_cache_info['evictions']} evicted, cleared {result_cache_info['invalidations']} time(s) for a new dataset")
+        
+        # Questions answered from the intent catalog
+        st.markdown("#### 🎯 Answered Without AI")
+        intent_info = report['intent_fast_path']
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Direct Answers", intent_info['answered_without_ai'], help="Common data-quality questions answered from the data, skipping the LLM and SQL")
+        with col2:
+            st.metric("Intents Used", len(intent_info['by_intent']))
+        if intent_info['per_question']:
+            st.dataframe(pd.DataFrame(intent_info['per_question']), use_container_width=True)
+        
+        # Example questions answered in the background
+        warmup_info = report['example_warmup']
+        if warmup_info is not None:
+            st.markdown("#### 🔥 Example Question Warm-up")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Answers Ready", f"{warmup_info['ready']}/{warmup_info['questions']}")
+            with col2:
+                st.metric("Failed", len(warmup_info['failed']))
+            with col3:
+                st.metric("Warm-up Time", "running" if warmup_info['running'] else f"{warmup_info['seconds']}s")
+            if warmup_info['failed']:
+                st.dataframe(pd.DataFrame(warmup_info['failed']), use_container_width=True)
+        
+        # Prompt size per request
+        st.markdown("#### 🧮 Prompt Tokens")
+        token_info = report['prompt_tokens']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Average Prompt Tokens", token_info['average_prompt_tokens'], help=f"Budget: {token_info['budget']} tokens")
+        with col2:
+            st.metric("Stable Prefix Tokens", token_info['stable_prefix_tokens'], help="Question-independent start of the prompt, reusable by provider-side prompt caching")
+        with col3:
+            st.metric("Total Prompt Tokens", token_info['total_prompt_tokens'])
+        if token_info['per_request']:
+            st.dataframe(pd.DataFrame(token_info['per_request']), use_container_width=True)
+        
+        # Automatic repair of failing queries
+        st.markdown("#### 🛠️ Query Self-Repair")
+        repair_info = report['self_repair']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Failed First Queries", repair_info['failed_first_queries'])
+        with col2:
+            st.metric("Repaired", repair_info['repaired'])
+        with col3:
+            st.metric("Average Repair Attempts", repair_info['average_attempts'], help=f"Average time: {repair_info['average_seconds']}s")
+        with col4:
+            st.metric("Repair Tokens", repair_info['total_tokens'])
+        if repair_info['per_question']:
+            st.dataframe(pd.DataFrame(repair_info['per_question']), use_container_width=True)
+        
         # SQL Queries Summary
         if report['sql_queries']:
             st.markdown("#### 🔍 SQL Queries Executed")
@@ -885,21 +1338,16 @@ if st.session_state.df is not None:
     
     # Example questions
     st.subheader("💡 Example Questions You Can Ask")
-    example_questions = [
-        "How many rows are in the dataset?",
-        "What are the column names?",
-        "How many null values are in each column?",
-        "What is the total transaction value?",
-        "Show me the top 5 transactions by value",
-        "What is the average transaction value?",
-        "How many transactions are there per fiscal year?",
-        "What are the unique business transaction types?",
-        "Show me transactions with values greater than 1000000",
-        "What is the distribution of debit vs credit transactions?"
-    ]
+    warmup = st.session_state.example_warmup
+    if warmup is not None:
+        warmup_info = warmup.stats()
+        if warmup_info['running']:
+            st.caption(f"⏳ Preparing answers in the background ({warmup_info['ready']}/{warmup_info['questions']} ready)")
+        for failure in warmup_info['failed']:
+            st.caption(f"⚠️ Could not prepare \"{failure['question']}\" in advance: {failure['error']}")
     
     cols = st.columns(2)
-    for i, question in enumerate(example_questions):
+    for i, question in enumerate(EXAMPLE_QUESTIONS):
         with cols[i % 2]:
             if st.button(question, key=f"example_{i}"):
                 # Add the question to chat and process it immediately
@@ -914,7 +1362,7 @@ else:
     # Show sample data preview
     st.subheader("📋 Sample Data Preview")
     try:
-        sample_df = pd.read_csv("data/Data Dump - Accrual Accounts.csv", nrows=5)
+        sample_df = pd.read_csv(SAMPLE_DATA_FILE, nrows=5)
         st.dataframe(sample_df)
         st.caption("This is a preview of the sample data. Load it to start asking questions!")
     except:
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the HTTP API with a stubbed LLM
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_cache import ResponseCache
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+def answer(messages):
+    # The original prompt, so repair requests for a broken query stay broken
+    question = messages[1]["content"].rsplit("User Question:", 1)[-1].lower()
+    if "top" in question:
+        return "```sql\nSELECT [Transaction Value], Currency FROM df ORDER BY [Transaction Value] DESC LIMIT 5\n```"
+    if "broken" in question:
+        return "SELECT no_such_column FROM df"
+    if "fixable" in question:
+        # Fixed once the error was sent back
+        return "SELECT COUNT(*) FROM df" if "failed with this error" in messages[-1]["content"] else "SELECT nrows FROM df"
+    return "SELECT COUNT(*) FROM df"
+
+def test_api():
+    """Register a dataset, ask questions and replay a favorite over HTTP"""
+    print("🧪 Testing the HTTP API...")
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("⚠️  fastapi not installed, skipping")
+        return
+    from data_chat.api import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        favorites_file = os.path.join(tmp, "favorites.json")
+        with open(favorites_file, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1, "question": "Rows kept as a favorite", "sql_query": "SELECT COUNT(*) AS n FROM df"}], f)
+        provider = FakeProvider(answer)
+        app = create_app(gateway=LLMGateway(provider), cache=ResponseCache(os.path.join(tmp, "cache.sqlite")),
+                         favorites_file=favorites_file)
+
+        with TestClient(app) as client:
+            # Paths are resolved inside the data directory and may not leave it
+            assert client.post("/datasets", json={"path": "../requirements.txt"}).status_code == 403
+            assert client.post("/datasets", json={"path": os.path.abspath("requirements.txt")}).status_code == 403
+            assert client.post("/datasets", json={"path": "missing.csv"}).status_code == 400
+            response = client.post("/datasets", json={"path": os.path.basename(DATA_FILE)})
+            assert response.status_code == 201, response.text
+            dataset = response.json()
+            rows = dataset["rows"]
+            assert rows > 0 and any(col["name"] == "Transaction Value" for col in dataset["columns"])
+            url = f"/datasets/{dataset['dataset_id']}"
+            assert client.get(url).json()["rows"] == rows
+
+            body = client.post(f"{url}/ask", json={"question": "Rows booked in any currency"}).json()
+            assert body["answer"] == {"type": "text", "message": f"**Result:** {rows}"}
+            assert body["prompt_tokens"]["prompt_tokens"] > 0 and body["intent"] is None
+
+            # Common questions are answered from the data without the model
+            calls = provider.calls
+            body = client.post(f"{url}/ask", json={"question": "How many rows?"}).json()
+            assert body["intent"] == "row_count" and body["answer"]["message"] == f"**Result:** {rows}"
+            assert body["prompt_tokens"] is None and provider.calls == calls
+
+            body = client.post(f"{url}/ask", json={"question": "Top 5 transactions"}).json()
+            assert body["answer"]["type"] == "table"
+            assert body["answer"]["total_rows"] == 5 and len(body["answer"]["rows"]) == 5
+            assert body["answer"]["columns"] == ["Transaction Value", "Currency"]
+
+            calls = provider.calls
+            body = client.post(f"{url}/favorites/1/run").json()
+            assert body["replayed"] and body["answer"]["message"] == f"**Result:** {rows}"
+            assert provider.calls == calls
+
+            assert client.post(f"{url}/ask", json={"question": "broken query"}).status_code == 422
+            body = client.post(f"{url}/ask", json={"question": "fixable query"}).json()
+            assert body["repair"]["repaired"] and body["answer"]["message"] == f"**Result:** {rows}"
+            assert client.post(f"{url}/ask", json={"question": "  "}).status_code == 400
+            # Bodies are validated against their models: wrong or missing fields are 422, not 500
+            assert client.post(f"{url}/ask", json={}).status_code == 422
+            assert client.post(f"{url}/ask", json={"question": 5}).status_code == 422
+            assert client.post("/datasets", json={"csv": 5}).status_code == 422
+            schemas = client.get("/openapi.json").json()["components"]["schemas"]
+            assert "question" in schemas["AskRequest"]["properties"] and "csv" in schemas["DatasetRequest"]["properties"]
+            assert client.post(f"{url}/favorites/9/run").status_code == 404
+            assert client.post("/datasets/unknown/ask", json={"question": "rows?"}).status_code == 404
+
+            inline = client.post("/datasets", json={"csv": "a,b\n1,x\n2,y\n"}).json()
+            assert inline["rows"] == 2
+            assert client.delete(f"/datasets/{inline['dataset_id']}").status_code == 204
+            assert client.get(f"/datasets/{inline['dataset_id']}").status_code == 404
+        app.state.gateway.close()
+    print("✅ HTTP API test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting HTTP API tests...\n")
+    test_api()
+    print("\n🎉 All HTTP API tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded chat history store
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.chat_history import ChatHistory
+from data_chat.query_engine import create_query_engine
+from data_chat.results import ResultHandle
+
+def table_message(frame, handle=None):
+    return {"role": "assistant", "sql_query": "SELECT 1",
+            "content": {"type": "table", "data": frame, "rows": len(frame), "result": handle,
+                        "message": f"**Results ({len(frame)} rows):**"}}
+
+def test_tables_spill_past_memory_cap():
+    """Older tables move to Parquet once the cap is exceeded and read back unchanged"""
+    print("🧪 Testing chat history spill-to-disk...")
+    frame = pd.DataFrame({"a": range(1000), "b": ["x"] * 1000})
+    size = int(frame.memory_usage(deep=True).sum())
+    history = ChatHistory(memory_cap_bytes=int(size * 2.5))
+
+    for _ in range(5):
+        history.append({"role": "user", "content": "question"})
+        history.append(table_message(frame.copy()))
+
+    assert len(history) == 10
+    assert history.resident_bytes <= history.memory_cap_bytes
+    assert history.spilled == 3
+    oldest = history[1]["content"]
+    assert oldest["data"] is None and os.path.exists(oldest["data_file"])
+    pd.testing.assert_frame_equal(history.table_data(oldest), frame)
+    # Read-back tables are kept per session, within their own small cap
+    read_back = history.table_data(oldest)
+    assert history.table_data(oldest) is read_back
+    history.read_back_cap_bytes = size
+    history.table_data(history[3]["content"])
+    assert history.table_data(oldest) is not read_back
+    assert history[-1]["content"]["data"] is not None
+
+    spill_dir = history.spill_dir
+    history.pop(1)
+    assert not os.path.exists(oldest["data_file"])
+    history.clear()
+    assert len(history) == 0 and history.resident_bytes == 0
+    del history
+    assert not os.path.exists(spill_dir)
+    print("✅ Chat history spill test passed!")
+
+def test_spilling_releases_result_pages():
+    """A spilled table's result handle drops its rows and refetches pages on demand"""
+    engine = create_query_engine(pd.DataFrame({"a": range(50)}), "sqlite")
+    handle = ResultHandle(engine, "SELECT a FROM df ORDER BY a")
+    history = ChatHistory(memory_cap_bytes=0)
+    history.append(table_message(handle.page(0), handle))
+    assert handle.first_page is None
+    assert handle.page(0)["a"].tolist() == list(range(10))
+    assert handle.page(4)["a"].tolist() == list(range(40, 50))
+    engine.close()
+
+def test_cap_counts_fetched_pages():
+    """Pages a result handle fetches after the message was stored count against the cap"""
+    engine = create_query_engine(pd.DataFrame({"a": range(5000), "b": ["x" * 20] * 5000}), "sqlite")
+    handle = ResultHandle(engine, "SELECT a, b FROM df ORDER BY a", page_size=1000)
+    page_bytes = handle.memory_bytes()
+    history = ChatHistory(memory_cap_bytes=int(page_bytes * 1.5))
+    history.append(table_message(handle.page(0), handle))
+    assert history.spilled == 0 and history.resident_bytes == page_bytes
+
+    handle.page(3)
+    assert history.resident_bytes > history.memory_cap_bytes
+    history.enforce_cap()
+    assert history.spilled == 1 and history.resident_bytes == 0
+    # A spilled table stays savable: its row count does not depend on the rows in memory
+    assert history[0]["content"]["data"] is None and history[0]["content"]["rows"] == 1000
+    engine.close()
+
+if __name__ == "__main__":
+    test_tables_spill_past_memory_cap()
+    test_spilling_releases_result_pages()
+    test_cap_counts_fetched_pages()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for question-relevant column retrieval
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.column_index import get_column_index, tokenize
+from data_chat.profile import get_profile
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, schema_prompt_for
+from data_chat.prompt_builder import count_tokens, measure_prompt
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+def test_abbreviated_column_names_match():
+    """Questions in plain words find abbreviated column names and coded values"""
+    print("🧪 Testing column retrieval...")
+    index = get_column_index(get_profile(pd.read_csv(DATA_FILE)))
+    assert index.top_columns("What are the unique business transaction types?", 3)[0] == "Bus. Transac. Type"
+    assert index.top_columns("What is the average transaction value?", 3)[0] == "Transaction Value"
+    assert "Currency" in index.top_columns("Show transactions in CAD", 3)
+    assert "Fiscal Year.2" in index.top_columns("transactions per fiscal year", 5)
+    # Nothing column-specific: caller falls back to the full schema
+    assert index.top_columns("How many rows are in the dataset?", 5) == []
+    assert tokenize("postingPeriod") == ["posting", "period"]
+    print("✅ Column retrieval test passed!")
+
+def test_focused_schema_prompt():
+    """The question's columns are described after a schema block that is the same for every question"""
+    profile = get_profile(pd.read_csv(DATA_FILE))
+    currency = schema_prompt_for(profile, "Show transactions in CAD", DEFAULT_PROMPT_TEMPLATE, 700)
+    types = schema_prompt_for(profile, "What are the unique business transaction types?", DEFAULT_PROMPT_TEMPLATE, 700)
+    assert currency.detail == "compact" and currency.focus[0] == "Currency"
+    assert currency.stable_text == types.stable_text and currency.text.startswith(currency.stable_text)
+    hint = currency.text[len(currency.stable_text):]
+    assert "- Currency: str, 0 null values" in hint and "Country Key" not in hint
+    assert currency.tokens <= 700
+
+    prompt = DEFAULT_PROMPT_TEMPLATE.format(schema_info=currency.text, user_question="Show transactions in CAD")
+    stats = measure_prompt(prompt, "Show transactions in CAD", schema_prompt=currency)
+    assert stats['focus_columns'] == len(currency.focus)
+    assert stats['stable_prefix_tokens'] == count_tokens(prompt.split(hint)[0])
+
+if __name__ == "__main__":
+    test_abbreviated_column_names_match()
+    test_focused_schema_prompt()
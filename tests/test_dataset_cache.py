@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the Parquet dataset cache
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.dataset_cache import content_hash, load_csv_cached
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+def test_cache_round_trip():
+    """The second load is served from Parquet with identical contents"""
+    print("🧪 Testing Parquet cache round trip...")
+    cache_dir = tempfile.mkdtemp()
+    first = load_csv_cached(DATA_FILE, cache_dir)
+    parquet_files = [f for f in os.listdir(cache_dir) if f.endswith(".parquet")]
+    assert len(parquet_files) == 1
+
+    second = load_csv_cached(DATA_FILE, cache_dir)
+    pd.testing.assert_frame_equal(first, second)
+
+    # Values are unchanged from a plain CSV parse, repeated codes are categorical
+    plain = pd.read_csv(DATA_FILE)
+    assert str(first["Currency"].dtype) == "category"
+    assert first["Currency"].astype(str).tolist() == plain["Currency"].astype(str).tolist()
+    assert first["Transaction Value"].equals(plain["Transaction Value"])
+    print("✅ Parquet cache round trip test passed!")
+
+def test_uploads_keyed_by_content():
+    """Uploaded bytes are keyed by content, not by file name"""
+    print("🧪 Testing upload cache keys...")
+    cache_dir = tempfile.mkdtemp()
+    upload = io.BytesIO(b"Currency,Transaction Value\nUSD,1.5\nEUR,2.0\n")
+    same = io.BytesIO(b"Currency,Transaction Value\nUSD,1.5\nEUR,2.0\n")
+    other = io.BytesIO(b"Currency,Transaction Value\nUSD,9.0\n")
+
+    assert content_hash(upload, cache_dir) == content_hash(same, cache_dir)
+    assert content_hash(upload, cache_dir) != content_hash(other, cache_dir)
+
+    df = load_csv_cached(upload, cache_dir)
+    assert df["Transaction Value"].sum() == 3.5
+    assert load_csv_cached(same, cache_dir).equals(df)
+    print("✅ Upload cache key test passed!")
+
+if __name__ == "__main__":
+    test_cache_round_trip()
+    test_uploads_keyed_by_content()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the rule-based answers to common data-quality questions
+"""
+
+import io
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.intents import match_intent, resolve_column
+from data_chat.pipeline import format_result
+from data_chat.profile import get_profile
+
+def make_df():
+    return pd.DataFrame({
+        "Transaction Value": [10.0, 20.0, None, 20.0, 5.0],
+        "Currency": ["USD", "CAD", "USD", "CAD", None],
+        "Fiscal Year": [2023, 2024, 2024, 2024, 2023],
+    })
+
+def test_matching():
+    """Known phrasings match their intent; anything more specific goes to the model"""
+    print("🧪 Testing intent matching...")
+    df = make_df()
+    expected = {
+        "How many rows are in the dataset?": "row_count",
+        "What is the number of records?": "row_count",
+        "How many columns does the table have?": "column_count",
+        "What are the column names?": "column_names",
+        "What are the data types of each column?": "data_types",
+        "How many null values are in each column?": "nulls_per_column",
+        "missing values per column": "nulls_per_column",
+        "How many null values are there in the data?": "total_nulls",
+        "Which columns have missing values?": "columns_with_nulls",
+        "Are there any duplicate rows?": "duplicate_rows",
+        "How many unique values per column?": "distinct_per_column",
+        "How many nulls does Currency have?": "column_nulls",
+        "How many unique currencies?": "column_distinct_count",
+        "What are the distinct currencies?": "column_distinct_values",
+        "What is the total transaction value?": "column_aggregate",
+    }
+    for question, intent in expected.items():
+        match = match_intent(question, df)
+        assert match is not None and match.name == intent, (question, match and match.name)
+
+    for question in ["Show me the top 5 transactions by value",
+                     "How many rows have null values?",
+                     "What is the total transaction value per fiscal year?",
+                     "What is the total currency?",
+                     "How many null values are in Country?",
+                     "Explain the dataset"]:
+        assert match_intent(question, df) is None, question
+    assert resolve_column("transaction values", list(df.columns)) == "Transaction Value"
+    assert resolve_column("fiscal year", ["Fiscal Year", "fiscal_year"]) is None
+    print("✅ Intent matching test passed!")
+
+def test_answers():
+    """Answers agree with pandas and come back in shapes format_result displays cleanly"""
+    print("🧪 Testing intent answers...")
+    df = make_df()
+    profile = get_profile(df)
+
+    def answer(question):
+        return match_intent(question, df).answer(df, profile)
+
+    assert format_result(answer("How many rows are there?")) == "**Result:** 5"
+    assert format_result(answer("What is the total transaction value?")) == "**Result:** 55.0"
+    assert format_result(answer("What is the average transaction value?")) == "**Result:** 13.75"
+    # Rows 2 and 4 are identical
+    assert format_result(answer("How many duplicate rows?")) == "**Result:** 1"
+    assert format_result(answer("How many null values are there?")) == "**Result:** 2"
+
+    nulls = answer("How many null values are in each column?")
+    assert nulls.sql_query.startswith("--") and nulls.total_rows == 3
+    table = format_result(nulls)
+    assert table["type"] == "table"
+    assert table["data"].set_index("Column")["Null Values"].to_dict() == df.isna().sum().to_dict()
+
+    values = answer("What are the distinct currencies?").page(0)
+    assert values.set_index("Currency")["Rows"].to_dict() == {"USD": 2, "CAD": 2}
+    assert list(answer("What are the column names?").page(0)["Column"]) == list(df.columns)
+
+    complete = df.dropna()
+    result = match_intent("Which columns have missing values?", complete).answer(complete)
+    assert format_result(result) == "**Result:** No column has null values"
+    print("✅ Intent answers test passed!")
+
+def test_frame_result():
+    """Pandas answers page, download and survive release() like query results"""
+    print("🧪 Testing FrameResult...")
+    df = pd.DataFrame({f"col_{i}": range(3) for i in range(25)})
+    result = match_intent("What are the column names?", df).answer(df)
+    assert result.page_count == 3 and len(result.page(2)) == 5
+    result.release()
+    assert len(result.head(25)) == 25
+    out = io.BytesIO()
+    result.write_csv(out)
+    assert out.getvalue().decode("utf-8").count("\n") == 26
+    print("✅ FrameResult test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting intent tests...\n")
+    test_matching()
+    test_answers()
+    test_frame_result()
+    print("\n🎉 All intent tests passed!")
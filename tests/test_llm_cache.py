@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM response cache, using the offline fake provider
+"""
+
+import os
+import sys
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_cache import ResponseCache, normalize_question
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.prompt_builder import FOCUS_HEADER
+from data_chat.sql_generation import request_sql
+
+TEMPLATE = "Schema:\n{schema_info}\n\nUser Question: {user_question}"
+SCHEMA = "Columns:\n- Transaction Value: float64"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def fake_gateway():
+    return LLMGateway(FakeProvider("```sql\nSELECT COUNT(*) FROM df\n```"))
+
+def ask(gateway, cache, question, schema=SCHEMA):
+    prompt = TEMPLATE.format(schema_info=schema, user_question=question)
+    return request_sql(gateway, prompt, schema, question, cache=cache)
+
+def test_exact_and_reworded_hits():
+    """Repeated and trivially reworded questions skip the API"""
+    print("🧪 Testing response cache hits...")
+    gateway = fake_gateway()
+    cache = ResponseCache(":memory:")
+
+    assert ask(gateway, cache, "How many rows are in the dataset?") == "SELECT COUNT(*) FROM df"
+    assert ask(gateway, cache, "How many rows are in the dataset?") == "SELECT COUNT(*) FROM df"
+    assert ask(gateway, cache, "how many rows are in the dataset") == "SELECT COUNT(*) FROM df"
+    assert gateway.provider.calls == 1
+    assert cache.hits == 2 and cache.misses == 1
+
+    # A different schema must not reuse the answer
+    ask(gateway, cache, "How many rows are in the dataset?", schema=SCHEMA + "\n- Currency: object")
+    assert gateway.provider.calls == 2
+    print("✅ Response cache hit test passed!")
+
+def test_focus_hint_not_in_question_key():
+    """Rewordings share an entry even when their focus hints differ"""
+    gateway = fake_gateway()
+    cache = ResponseCache(":memory:")
+    ask(gateway, cache, "Total value by currency?", schema=SCHEMA + FOCUS_HEADER + "- Currency: object\n")
+    ask(gateway, cache, "total value by the currency", schema=SCHEMA + FOCUS_HEADER + "- Country Key: object\n")
+    assert gateway.provider.calls == 1 and cache.hits == 1
+
+def test_ttl_expiry():
+    """Entries older than the TTL are treated as misses"""
+    print("🧪 Testing response cache TTL...")
+    clock = FakeClock()
+    gateway = fake_gateway()
+    cache = ResponseCache(":memory:", ttl_seconds=60, clock=clock)
+
+    ask(gateway, cache, "What is the total transaction value?")
+    clock.now += 61
+    ask(gateway, cache, "What is the total transaction value?")
+    assert gateway.provider.calls == 2
+    print("✅ Response cache TTL test passed!")
+
+def test_lru_eviction():
+    """The least recently used entries are evicted over the limit"""
+    print("🧪 Testing response cache LRU eviction...")
+    clock = FakeClock()
+    cache = ResponseCache(":memory:", max_entries=2, clock=clock)
+
+    for i, question in enumerate(["q1", "q2", "q3"]):
+        clock.now += 1
+        cache.store("model", question, "schema", 0.1, f"SELECT {i}")
+    assert cache.lookup("model", "q1", "schema", 0.1) is None
+    assert cache.lookup("model", "q3", "schema", 0.1) == "SELECT 2"
+    assert cache.stats()['entries'] == 2
+
+    cache.discard_response("SELECT 2")
+    assert cache.lookup("model", "q3", "schema", 0.1) is None
+    print("✅ Response cache LRU test passed!")
+
+def test_normalize_question():
+    assert normalize_question("Can you tell me the Total Value?") == normalize_question("total value")
+
+if __name__ == "__main__":
+    test_exact_and_reworded_hits()
+    test_focus_hint_not_in_question_key()
+    test_ttl_expiry()
+    test_lru_eviction()
+    test_normalize_question()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM gateway (retries, deadlines, concurrency) with the fake provider
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import (
+    FakeProvider,
+    LLMGateway,
+    LLMGatewayError,
+    TransientLLMError,
+    backoff_delay,
+)
+
+MESSAGES = [{"role": "user", "content": "How many rows are in the dataset?"}]
+
+class RateLimited(Exception):
+    status_code = 429
+
+def complete(gateway, **kwargs):
+    return gateway.complete("fake-model", MESSAGES, 0.1, 100, **kwargs)
+
+def test_retries_transient_errors():
+    """429s and timeouts are retried until the provider answers"""
+    print("🧪 Testing retry on transient errors...")
+    provider = FakeProvider("SELECT 1", failures=[RateLimited("429"), TransientLLMError("timeout")])
+    gateway = LLMGateway(provider, base_delay=0.001, max_delay=0.01)
+    assert complete(gateway) == "SELECT 1"
+    assert provider.calls == 3
+    assert gateway.retries == 2
+    gateway.close()
+    print("✅ Retry test passed!")
+
+def test_gives_up_with_gateway_error():
+    """Exhausted retries surface as LLMGatewayError, other errors pass through"""
+    print("🧪 Testing retry exhaustion...")
+    gateway = LLMGateway(FakeProvider(failures=[RateLimited("429")] * 3), max_retries=2, base_delay=0.001)
+    try:
+        complete(gateway)
+        raise AssertionError("Expected LLMGatewayError")
+    except LLMGatewayError:
+        pass
+
+    gateway.provider = FakeProvider(failures=[ValueError("bad request")])
+    try:
+        complete(gateway)
+        raise AssertionError("Expected ValueError")
+    except ValueError:
+        assert gateway.provider.calls == 1
+    gateway.close()
+    print("✅ Retry exhaustion test passed!")
+
+def test_deadline():
+    """A slow provider is abandoned once the deadline passes"""
+    print("🧪 Testing request deadline...")
+    gateway = LLMGateway(FakeProvider(delay=1.0), base_delay=0.001)
+    start = time.monotonic()
+    try:
+        complete(gateway, deadline=0.2)
+        raise AssertionError("Expected LLMGatewayError")
+    except LLMGatewayError:
+        assert time.monotonic() - start < 0.9
+    gateway.close()
+    print("✅ Deadline test passed!")
+
+def test_bounded_concurrency():
+    """No more than max_concurrency requests are in flight at once"""
+    print("🧪 Testing bounded concurrency...")
+    in_flight = 0
+    peak = 0
+
+    class TrackingProvider(FakeProvider):
+        async def complete(self, model, messages, temperature, max_tokens):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return "SELECT 1"
+
+    gateway = LLMGateway(TrackingProvider(), max_concurrency=2)
+    threads = [threading.Thread(target=complete, args=(gateway,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+    gateway.close()
+    print("✅ Bounded concurrency test passed!")
+
+def test_stream_and_backoff():
+    """Streams yield the whole reply and backoff delays stay within bounds"""
+    gateway = LLMGateway(FakeProvider("SELECT COUNT(*) FROM df", failures=[TransientLLMError()]), base_delay=0.001)
+    assert "".join(gateway.stream("fake-model", MESSAGES, 0.1, 100)) == "SELECT COUNT(*) FROM df"
+    gateway.close()
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.5, 8.0) <= 8.0
+
+if __name__ == "__main__":
+    test_retries_transient_errors()
+    test_gives_up_with_gateway_error()
+    test_deadline()
+    test_bounded_concurrency()
+    test_stream_and_backoff()
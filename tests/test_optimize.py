@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the dtype optimization stage
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.ingest import read_csv_chunked
+from data_chat.optimize import optimize_dtypes
+from data_chat.query_engine import create_query_engine
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+QUERIES = [
+    "SELECT COUNT(*) FROM df WHERE [Debit/Credit ind] = 'S'",
+    "SELECT [Fiscal Year.1], COUNT(*) AS n FROM df GROUP BY [Fiscal Year.1] ORDER BY [Fiscal Year.1]",
+    "SELECT SUM([Transaction Value]) FROM df WHERE [Document Is Back-Posted] = 'X'",
+    "SELECT COUNT(*) FROM df WHERE [Clearing Fiscal Year] IS NULL",
+]
+
+def test_optimize_sample_data():
+    """Repeated codes and whole-number floats get compact dtypes"""
+    print("🧪 Testing dtype optimization...")
+    raw = pd.read_csv(DATA_FILE)
+    df, report = optimize_dtypes(raw)
+
+    assert str(df["Currency"].dtype) == "category"
+    assert str(df["Debit/Credit ind"].dtype) == "category"
+    assert str(df["Fiscal Year.1"].dtype) == "Int16"
+    assert str(df["Transaction Value"].dtype) == "float64"
+    assert report["memory_after_bytes"] < report["memory_before_bytes"] / 2
+    assert "Fiscal Year.1" in report["conversions"]
+    print(f"✅ Memory reduced by {report['memory_saved_percentage']}%")
+
+def test_sql_results_unchanged():
+    """Queries return the same answers before and after optimization"""
+    print("🧪 Testing SQL on optimized data...")
+    raw = pd.read_csv(DATA_FILE)
+    df, _ = optimize_dtypes(raw)
+    for engine_name in ["sqlite", "duckdb"]:
+        try:
+            before = create_query_engine(raw, engine_name)
+        except ImportError:
+            continue
+        after = create_query_engine(df, engine_name)
+        for query in QUERIES:
+            pd.testing.assert_frame_equal(before.execute(query), after.execute(query), check_dtype=False)
+    print("✅ SQL results unchanged!")
+
+def test_boolean_text_stays_text():
+    """True/False text keeps its values, so comparisons with 'True' still match"""
+    raw = pd.DataFrame({"flag": ["True", None, "False", "True"], "code": ["X", None, "X", "X"]})
+    df, report = optimize_dtypes(raw)
+    assert str(df["flag"].dtype) != "boolean" and df["flag"].tolist()[0] == "True"
+    assert str(df["code"].dtype) == "category"
+    query = "SELECT COUNT(*) FROM df WHERE flag = 'True'"
+    assert create_query_engine(df, "sqlite").execute(query).iloc[0, 0] == 2
+
+def test_report_includes_ingest():
+    """Savings are measured against a plain read_csv, including columns made categorical while loading"""
+    df, report = optimize_dtypes(read_csv_chunked(DATA_FILE, chunk_rows=1000))
+    assert report["memory_before_bytes"] == int(pd.read_csv(DATA_FILE).memory_usage(deep=True).sum())
+    assert report["memory_after_bytes"] == int(df.memory_usage(deep=True).sum())
+    assert report["conversions"]["Currency"].endswith("→ category")
+    assert report["memory_saved_percentage"] > 50
+
+if __name__ == "__main__":
+    test_optimize_sample_data()
+    test_sql_results_unchanged()
+    test_boolean_text_stays_text()
+    test_report_includes_ingest()
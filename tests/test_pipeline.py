@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the UI-free NL-to-SQL pipeline with a stubbed LLM
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, Pipeline, format_result, read_prompt_template
+
+def make_pipeline(responses):
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    provider = FakeProvider(responses)
+    return Pipeline(df, LLMGateway(provider), prompt_template=DEFAULT_PROMPT_TEMPLATE), provider
+
+def test_ask():
+    """A question is answered with the model's SQL and the prompt carries the schema"""
+    print("🧪 Testing Pipeline.ask...")
+    prompts = []
+    pipeline, _ = make_pipeline(lambda messages: prompts.append(messages[-1]["content"]) or "SELECT COUNT(*) FROM df")
+    outcome = pipeline.ask("How many rows were booked in USD?")
+    assert outcome["sql_query"] == "SELECT COUNT(*) FROM df"
+    assert format_result(outcome["result"]) == f"**Result:** {len(pipeline.df)}"
+    assert "Transaction Value" in prompts[0] and prompts[0].rstrip().endswith("SQL Query:")
+    assert outcome["tokens"]["prompt_tokens"] > outcome["tokens"]["schema_tokens"] > 0
+    pipeline.close()
+    pipeline.gateway.close()
+    print("✅ Pipeline.ask test passed!")
+
+def test_run_favorite():
+    """Favorites replay their SQL while the schema matches and are regenerated otherwise"""
+    print("🧪 Testing Pipeline.run_favorite...")
+    pipeline, provider = make_pipeline("SELECT COUNT(*) FROM df")
+    favorite = {
+        "question": "Top 5 transactions",
+        "sql_query": "SELECT * FROM df ORDER BY [Transaction Value] DESC LIMIT 5",
+        "schema_fingerprint": pipeline.profile.schema_fingerprint
+    }
+    outcome = pipeline.run_favorite(favorite)
+    assert outcome["replayed"] and provider.calls == 0
+    assert outcome["result"].total_rows == 5
+
+    outcome = pipeline.run_favorite({**favorite, "schema_fingerprint": "other schema"})
+    assert not outcome["replayed"] and provider.calls == 1
+    assert outcome["sql_query"] == "SELECT COUNT(*) FROM df"
+
+    outcome = pipeline.run_favorite({**favorite, "sql_query": "SELECT missing_column FROM df"})
+    assert not outcome["replayed"] and provider.calls == 2
+    pipeline.close()
+    pipeline.gateway.close()
+    print("✅ Pipeline.run_favorite test passed!")
+
+def test_prompt_template_fallback():
+    """A missing template file falls back to the built-in template"""
+    print("🧪 Testing prompt template fallback...")
+    assert read_prompt_template("no/such/template.txt") == DEFAULT_PROMPT_TEMPLATE
+    assert "{schema_info}" in read_prompt_template()
+    print("✅ Prompt template fallback test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting pipeline tests...\n")
+    test_ask()
+    test_run_favorite()
+    test_prompt_template_fallback()
+    print("\n🎉 All pipeline tests passed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached dataset profile
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.profile import ProfileCache, get_profile
+
+def test_profile_matches_pandas():
+    """The profile's counts agree with pandas and are computed once per dataset"""
+    print("🧪 Testing profile statistics...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    profile = get_profile(df)
+    assert [col.name for col in profile.columns] == list(df.columns)
+    assert profile.missing_by_column == df.isnull().sum().to_dict()
+    assert [col.unique_count for col in profile.columns] == df.nunique().tolist()
+    assert profile.null_values_total == int(df.isnull().sum().sum())
+    assert profile.memory_usage_bytes == int(df.memory_usage(deep=True).sum())
+    assert get_profile(df.copy()) is profile
+    print("✅ Profile statistics test passed!")
+
+def test_profile_cache_eviction():
+    """The least recently used profile is evicted first"""
+    print("🧪 Testing profile cache eviction...")
+    cache = ProfileCache(maxsize=2)
+    first = pd.DataFrame({"a": [1]})
+    second = pd.DataFrame({"a": [2]})
+    third = pd.DataFrame({"a": [3]})
+
+    first_profile = cache.get(first)
+    cache.get(second)
+    assert cache.get(first) is first_profile  # refresh first
+    cache.get(third)  # evicts second
+
+    assert len(cache) == 2
+    assert cache.get(first) is first_profile
+    print("✅ Profile cache eviction test passed!")
+
+if __name__ == "__main__":
+    test_profile_matches_pandas()
+    test_profile_cache_eviction()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-budgeted schema prompt builder
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.profile import get_profile
+from data_chat.prompt_builder import (
+    build_schema_prompt, count_tokens, measure_prompt, rank_columns, schema_token_budget
+)
+
+def wide_frame(columns=200, rows=50):
+    data = np.random.default_rng(0).integers(0, 100, (rows, columns))
+    df = pd.DataFrame(data, columns=[f"Metric column {i}" for i in range(columns)])
+    df[df.columns[-1]] = np.nan  # an empty column ranks last
+    return df
+
+def test_full_detail_when_it_fits():
+    """Small schemas keep counts and representative values, without raw head rows"""
+    print("🧪 Testing schema prompt builder...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    schema = build_schema_prompt(get_profile(df), 3000)
+    assert schema.detail == "full" and not schema.omitted
+    assert "- Currency: " in schema.text and "e.g. USD, CAD" in schema.text
+    assert "Sample data" not in schema.text
+    # Smaller than listing every column plus df.head(3), as the prompt used to
+    assert schema.tokens < count_tokens(schema.text + df.head(3).to_string())
+    print(f"✅ Full schema fits in {schema.tokens} tokens")
+
+def test_budget_is_respected():
+    """Wide schemas are compressed until they fit, dropping the lowest-ranked columns last"""
+    print("🧪 Testing schema token budget...")
+    profile = get_profile(wide_frame())
+    for budget in (2000, 800, 300):
+        schema = build_schema_prompt(profile, budget)
+        assert schema.tokens <= budget, (budget, schema.tokens)
+    tight = build_schema_prompt(profile, 300)
+    assert tight.detail == "names" and tight.omitted
+    assert rank_columns(profile)[-1] == "Metric column 199"
+    assert "Metric column 199" in tight.omitted
+    assert build_schema_prompt(profile, 300) is tight  # cached, so the prefix is stable
+    print(f"✅ Budget test passed! {len(tight.omitted)} columns omitted at 300 tokens")
+
+def test_prompt_measurement():
+    """The stable prefix is everything before the question"""
+    template = "Schema:\n{schema_info}\n\nUser Question: {user_question}"
+    assert schema_token_budget(1000, template) < 1000
+    prompt = template.format(schema_info="- a: int64", user_question="How many rows?")
+    stats = measure_prompt(prompt, "How many rows?", "system")
+    assert stats['stable_prefix_tokens'] < stats['prompt_tokens']
+
+if __name__ == "__main__":
+    test_full_detail_when_it_fits()
+    test_budget_is_respected()
+    test_prompt_measurement()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared data quality engine
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.ingest import concat_frames
+from data_chat.quality import IncrementalQualityMetrics, QualityMetrics, get_quality_metrics, quality_score
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+def test_matches_per_column_computation():
+    """The single-pass engine agrees with the old per-column loops"""
+    print("🧪 Testing data quality engine...")
+    df = pd.read_csv(DATA_FILE)
+    df = pd.concat([df, df.head(25)], ignore_index=True)  # add known duplicates
+    metrics = get_quality_metrics(df)
+
+    assert metrics.total_missing == int(df.isnull().sum().sum())
+    assert metrics.missing.equals(df.isnull().sum())
+    assert metrics.duplicates == int(df.duplicated().sum()) == 25
+
+    for col in df.select_dtypes(include=[np.number]).columns:
+        z = (df[col] - df[col].mean()) / df[col].std(ddof=0)
+        assert metrics.outliers[col] == int(((z > 3) | (z < -3)).sum()), col
+
+    expected_score = quality_score(metrics.percent_missing, metrics.percent_duplicates, metrics.percent_outliers)
+    assert metrics.score == expected_score
+    assert get_quality_metrics(df.copy()) is metrics
+    print(f"✅ Data quality engine test passed! Score: {metrics.score}")
+
+def test_empty_and_null_columns():
+    """All-null numeric columns and empty frames do not break the engine"""
+    df = pd.DataFrame({"a": [np.nan, np.nan], "b": [1.0, 1.0]})
+    metrics = get_quality_metrics(df)
+    assert metrics.outliers == {"a": 0, "b": 0}
+    assert "a" not in metrics.column_stats
+    assert metrics.duplicates == 1
+
+    empty = get_quality_metrics(pd.DataFrame({"a": pd.Series([], dtype=float)}))
+    assert empty.score == 100
+
+def test_incremental_batches_match_full_scan():
+    """Running aggregates over appended batches agree with a scan of the whole frame"""
+    print("🧪 Testing incremental data quality metrics...")
+    df = pd.read_csv(DATA_FILE)
+    batches = [df.iloc[:5000], df.iloc[5000:], df.head(40)]  # last batch repeats earlier rows
+    combined = concat_frames(batches)
+
+    metrics = IncrementalQualityMetrics()
+    start = 0
+    for batch in batches:
+        metrics.update(combined.iloc[start:start + len(batch)])
+        start += len(batch)
+    full = QualityMetrics(combined)
+
+    assert metrics.rows == full.rows and metrics.batches == 3
+    assert metrics.missing.equals(full.missing)
+    assert metrics.duplicates == full.duplicates == 40
+    # New digests are merged in place: still sorted, one per distinct row
+    digests = metrics._digests
+    assert len(digests) == len(combined) - 40 and (digests[1:] > digests[:-1]).all()
+    for col, stats in full.column_stats.items():
+        for key in ("mean", "std", "min", "max"):
+            assert np.isclose(metrics.column_stats[col][key], stats[key]), (col, key)
+    assert metrics.score == quality_score(metrics.percent_missing, metrics.percent_duplicates, metrics.percent_outliers)
+
+    try:
+        metrics.update(df[["Currency"]])
+        assert False, "mismatched columns should be rejected"
+    except ValueError:
+        pass
+    print(f"✅ Incremental metrics test passed! Score: {metrics.score} (full scan {full.score})")
+
+if __name__ == "__main__":
+    test_matches_per_column_computation()
+    test_empty_and_null_columns()
+    test_incremental_batches_match_full_scan()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent SQLite query engine
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pandasql as psql
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.query_engine import (
+    SQLiteQueryEngine,
+    create_query_engine,
+    dataset_fingerprint,
+    extend_fingerprint,
+    translate_identifiers,
+)
+
+DATA_FILE = "data/Data Dump - Accrual Accounts.csv"
+
+def test_engine_matches_pandasql():
+    """Bracket-quoted queries return the same results as pandasql"""
+    print("🧪 Testing SQLite engine against pandasql...")
+    df = pd.read_csv(DATA_FILE)
+    engine = SQLiteQueryEngine(df)
+
+    queries = [
+        "SELECT COUNT(*) as total_rows FROM df",
+        "SELECT COUNT(*) as null_count FROM df WHERE [Transaction Value] IS NULL",
+        "SELECT [Fiscal Year.2], SUM([Transaction Value]) as total FROM df GROUP BY [Fiscal Year.2] ORDER BY 1",
+    ]
+    for query in queries:
+        expected = psql.sqldf(query, {"df": df})
+        result = engine.execute(query)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    engine.close()
+    print("✅ SQLite engine results match pandasql!")
+
+def test_engine_reuse():
+    """The engine recognizes the dataset it was loaded with"""
+    print("🧪 Testing engine reuse across datasets...")
+    df = pd.DataFrame({"Transaction Value": [1.0, 2.0, None], "Currency": ["USD", "EUR", "USD"]})
+    engine = SQLiteQueryEngine(df)
+
+    assert engine.matches(df)
+    assert engine.matches(df.copy())
+    assert not engine.matches(df.head(2))
+    assert engine.execute("SELECT SUM([Transaction Value]) FROM df").iloc[0, 0] == 3.0
+    engine.close()
+    print("✅ Engine reuse test passed!")
+
+def test_fingerprint():
+    """Fingerprints depend on content, not object identity"""
+    print("🧪 Testing dataset fingerprints...")
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    assert dataset_fingerprint(df) == dataset_fingerprint(df.copy())
+    assert dataset_fingerprint(df) != dataset_fingerprint(df.rename(columns={"a": "b"}))
+    assert dataset_fingerprint(df) != dataset_fingerprint(pd.DataFrame({"a": [1, 2, 4]}))
+    # Appended rows extend the fingerprint without hashing the old rows again
+    combined = pd.concat([df, pd.DataFrame({"a": [4, 5]})], ignore_index=True)
+    assert extend_fingerprint(df, combined) == dataset_fingerprint(combined.copy())
+    print("✅ Fingerprint test passed!")
+
+def test_translate_identifiers():
+    """Bracket and backtick identifiers become double-quoted, literals are untouched"""
+    print("🧪 Testing identifier dialect shim...")
+    sql = "SELECT [Bus. Transac. Type], `Currency` FROM df WHERE [Country Key] = '[US]'"
+    expected = "SELECT \"Bus. Transac. Type\", \"Currency\" FROM df WHERE \"Country Key\" = '[US]'"
+    assert translate_identifiers(sql) == expected
+    assert translate_identifiers('SELECT "A [b]" FROM df') == 'SELECT "A [b]" FROM df'
+    print("✅ Dialect shim test passed!")
+
+def test_duckdb_engine():
+    """The columnar engine answers bracket-quoted aggregations like SQLite"""
+    print("🧪 Testing DuckDB engine...")
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        print("⚠️  duckdb not installed, skipping")
+        return
+    df = pd.read_csv(DATA_FILE)
+    query = "SELECT [Fiscal Year.2] AS fy, SUM([Transaction Value]) AS total FROM df GROUP BY [Fiscal Year.2] ORDER BY fy"
+    sqlite_engine = create_query_engine(df, "sqlite")
+    duckdb_engine = create_query_engine(df, "duckdb")
+    pd.testing.assert_frame_equal(duckdb_engine.execute(query), sqlite_engine.execute(query), check_dtype=False)
+    sqlite_engine.close()
+    duckdb_engine.close()
+
+    # Unaliased expressions are labelled and NULLs sorted as SQLite does
+    df = pd.DataFrame({"Transaction Value": [1.0, None, 3.0], "Currency": ["USD", None, "EUR"]})
+    query = ("SELECT Currency, COUNT(*), SUM([Transaction Value]) total, [Transaction Value] * 2 "
+             "FROM df GROUP BY Currency, [Transaction Value] ORDER BY Currency")
+    sqlite_engine = create_query_engine(df, "sqlite")
+    duckdb_engine = create_query_engine(df, "duckdb")
+    expected = sqlite_engine.execute(query)
+    assert list(expected.columns) == ["Currency", "COUNT(*)", "total", "[Transaction Value] * 2"]
+    pd.testing.assert_frame_equal(duckdb_engine.execute(query), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(duckdb_engine.execute_page(query, 2, 1), sqlite_engine.execute_page(query, 2, 1),
+                                  check_dtype=False)
+    sqlite_engine.close()
+    duckdb_engine.close()
+    print("✅ DuckDB engine test passed!")
+
+def test_unknown_engine():
+    """Misconfigured engine names are rejected"""
+    try:
+        create_query_engine(pd.DataFrame({"a": [1]}), "oracle")
+    except ValueError:
+        return
+    raise AssertionError("Expected ValueError for an unknown engine")
+
+if __name__ == "__main__":
+    test_engine_matches_pandasql()
+    test_engine_reuse()
+    test_fingerprint()
+    test_translate_identifiers()
+    test_duckdb_engine()
+    test_unknown_engine()
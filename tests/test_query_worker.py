@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for running SQL in a worker process with timeouts and limits
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, Pipeline
+from data_chat.query_engine import create_query_engine
+from data_chat.query_worker import (
+    QueryCancelledError,
+    QueryMemoryError,
+    QueryRowLimitError,
+    QueryTimeoutError,
+    QueryWorkerError,
+    WorkerQueryEngine,
+)
+from data_chat.results import ResultHandle
+
+CARTESIAN_COUNT = "SELECT COUNT(*) FROM df a, df b"
+# The first page of this comes back at once; counting all of it does not
+CARTESIAN_ROWS = "SELECT a.[Transaction Value] FROM df a, df b"
+
+def load():
+    return pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+
+def test_results_match_in_process_engine():
+    """Queries, pages, counts and batches come back as the in-process engine returns them"""
+    print("🧪 Testing worker results...")
+    df = load()
+    engine = WorkerQueryEngine(df, timeout=30)
+    local = create_query_engine(df)
+    query = "SELECT [Transaction Value], Currency FROM df ORDER BY [Transaction Value] DESC, [Unnamed: 0]"
+    pd.testing.assert_frame_equal(engine.execute(query), local.execute(query))
+    handle = ResultHandle(engine, query, page_size=25)
+    assert handle.total_rows == len(df)
+    pd.testing.assert_frame_equal(handle.page(3), local.execute_page(query, 25, 75))
+    assert sum(len(batch) for batch in engine.iter_batches(query, 5000)) == len(df)
+    try:
+        engine.execute("SELECT no_such_column FROM df")
+        raise AssertionError("Expected QueryWorkerError")
+    except QueryWorkerError as e:
+        assert "no such column" in str(e)
+    assert engine.restarts == 0
+    engine.close()
+    local.close()
+    print("✅ Worker results test passed!")
+
+def test_timeout_and_cancellation():
+    """Runaway queries are stopped and the worker keeps answering afterwards"""
+    print("🧪 Testing timeout and cancellation...")
+    engine = WorkerQueryEngine(load(), timeout=1)
+    engine.count_rows("SELECT * FROM df")  # wait for the worker to load
+    start = time.monotonic()
+    try:
+        engine.execute(CARTESIAN_COUNT)
+        raise AssertionError("Expected QueryTimeoutError")
+    except QueryTimeoutError as e:
+        assert "1 seconds" in str(e)
+    assert time.monotonic() - start < 5
+    assert engine.execute("SELECT COUNT(*) AS n FROM df").iloc[0, 0] > 0
+
+    engine.timeout = 60
+    cancel_at = time.monotonic() + 0.3
+    engine.should_cancel = lambda: time.monotonic() > cancel_at
+    try:
+        engine.execute(CARTESIAN_COUNT)
+        raise AssertionError("Expected QueryCancelledError")
+    except QueryCancelledError:
+        pass
+    assert engine.restarts == 2
+
+    # A callback that stops its caller (as a Streamlit rerun does) takes the query down with it
+    class Rerun(BaseException):
+        pass
+
+    def rerun():
+        raise Rerun()
+    engine.should_cancel = rerun
+    try:
+        engine.execute(CARTESIAN_COUNT)
+        raise AssertionError("Expected Rerun")
+    except Rerun:
+        pass
+    engine.should_cancel = None
+    assert engine.restarts == 3 and engine.execute("SELECT COUNT(*) AS n FROM df").iloc[0, 0] > 0
+    engine.close()
+    print("✅ Timeout and cancellation test passed!")
+
+def test_slow_count_fails_with_the_query():
+    """A count that times out after a quick first page is raised where the query runs, not when formatting"""
+    print("🧪 Testing a slow count behind a fast first page...")
+    df = load()
+    engine = WorkerQueryEngine(df, timeout=1)
+    assert len(engine.execute_page(CARTESIAN_ROWS, 11)) == 11
+    try:
+        ResultHandle(engine, CARTESIAN_ROWS)
+        raise AssertionError("Expected QueryTimeoutError")
+    except QueryTimeoutError:
+        pass
+
+    pipeline = Pipeline(df, LLMGateway(FakeProvider(CARTESIAN_ROWS)),
+                        prompt_template=DEFAULT_PROMPT_TEMPLATE, engine=engine, use_intents=False)
+    try:
+        pipeline.ask("Every value paired with every row")
+        raise AssertionError("Expected QueryTimeoutError")
+    except QueryTimeoutError:
+        pass
+    assert pipeline.gateway.provider.calls == 1  # stopped queries are not sent for repair
+    pipeline.gateway.close()
+    engine.close()
+    print("✅ Slow count test passed!")
+
+def test_row_and_memory_limits():
+    """Materializing too many rows or too much memory is refused"""
+    print("🧪 Testing row and memory limits...")
+    engine = WorkerQueryEngine(load(), timeout=60, max_rows=1000)
+    try:
+        engine.execute("SELECT * FROM df")
+        raise AssertionError("Expected QueryRowLimitError")
+    except QueryRowLimitError:
+        pass
+    # Pages stay available however large the full result is
+    assert len(ResultHandle(engine, "SELECT * FROM df").first_page) == 10
+    engine.close()
+
+    if sys.platform.startswith("linux"):
+        engine = WorkerQueryEngine(load(), timeout=60, max_rows=0, memory_limit_mb=100)
+        try:
+            engine.execute("SELECT a.*, b.* FROM df a, df b LIMIT 3000000")
+            raise AssertionError("Expected QueryMemoryError")
+        except QueryMemoryError:
+            pass
+        engine.close()
+    print("✅ Row and memory limit test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting query worker tests...\n")
+    test_results_match_in_process_engine()
+    test_timeout_and_cancellation()
+    test_slow_count_fails_with_the_query()
+    test_row_and_memory_limits()
+    print("\n🎉 All query worker tests passed!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM self-repair loop with a stubbed LLM
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_cache import ResponseCache
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, Pipeline
+from data_chat.repair import repair_messages, repair_sql
+from data_chat.sql_generation import MODEL, TEMPERATURE, schema_fingerprint
+
+BROKEN_SQL = "SELECT [Transaction Valu] FROM df"
+FIXED_SQL = "SELECT SUM([Transaction Value]) FROM df"
+
+def fix_after_error(messages):
+    """Answer with the broken SQL first and with the fix once an error was sent back"""
+    return FIXED_SQL if "failed with this error" in messages[-1]["content"] else BROKEN_SQL
+
+def test_repair_messages():
+    """Each failed query and its error are replayed to the model"""
+    print("🧪 Testing repair messages...")
+    messages = repair_messages("prompt", [("SELECT a FROM df", "no such column: a"), ("SELECT b FROM df", "no such column: b")])
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user", "assistant", "user"]
+    assert messages[2]["content"] == "SELECT a FROM df" and "no such column: b" in messages[-1]["content"]
+    print("✅ Repair messages test passed!")
+
+def test_repair_sql():
+    """The first candidate that passes the check wins and is cached under the original prompt"""
+    print("🧪 Testing repair_sql...")
+    gateway = LLMGateway(FakeProvider(fix_after_error))
+    cache = ResponseCache(":memory:")
+    checked = []
+
+    def check(sql_query):
+        checked.append(sql_query)
+        return "result"
+
+    sql_query, result, log = repair_sql(gateway, "prompt", BROKEN_SQL, "no such column", check,
+                                        question="Total value", cache=cache, schema_info="schema")
+    assert (sql_query, result) == (FIXED_SQL, "result") and checked == [FIXED_SQL]
+    report = log.as_dict()
+    assert report["repaired"] and report["attempts"] == 1 and report["completion_tokens"] > 0
+    assert cache.lookup(MODEL, "prompt", schema_fingerprint("schema"), TEMPERATURE) == FIXED_SQL
+
+    # A model that keeps returning the failing SQL gives up after max_attempts
+    gateway = LLMGateway(FakeProvider(BROKEN_SQL))
+    sql_query, result, log = repair_sql(gateway, "prompt", BROKEN_SQL, "no such column", check, max_attempts=2)
+    assert sql_query is None and result is None
+    assert log.as_dict()["attempts"] == 2 and not log.repaired
+    gateway.close()
+    print("✅ repair_sql test passed!")
+
+def test_hedged_candidates():
+    """A slow repair request is hedged with parallel candidates"""
+    print("🧪 Testing hedged repair requests...")
+    provider = FakeProvider(FIXED_SQL, delay=0.3)
+    gateway = LLMGateway(provider)
+    started = time.monotonic()
+    sql_query, _, log = repair_sql(gateway, "prompt", BROKEN_SQL, "error", lambda sql: sql,
+                                   hedge_after=0.05, hedge_candidates=3)
+    assert sql_query == FIXED_SQL and time.monotonic() - started < 1.0
+    assert log.as_dict()["candidates"] == 3
+    gateway.close()
+    print("✅ Hedged repair test passed!")
+
+def test_pipeline_repairs():
+    """Pipeline.ask repairs SQL that fails validation and reports what it cost"""
+    print("🧪 Testing Pipeline self-repair...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    pipeline = Pipeline(df, LLMGateway(FakeProvider(fix_after_error)), prompt_template=DEFAULT_PROMPT_TEMPLATE)
+    outcome = pipeline.ask("What is the total transaction value in USD?")
+    assert outcome["sql_query"] == FIXED_SQL
+    assert outcome["repair"]["repaired"] and outcome["repair"]["attempts"] == 1
+
+    pipeline.repair_attempts = 0
+    try:
+        pipeline.run("What is the total transaction value in USD?", BROKEN_SQL)
+        assert False, "Broken SQL should fail without repair"
+    except Exception as e:
+        assert "did you mean" in str(e)
+    pipeline.close()
+    pipeline.gateway.close()
+    print("✅ Pipeline self-repair test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting self-repair tests...\n")
+    test_repair_messages()
+    test_repair_sql()
+    test_hedged_candidates()
+    test_pipeline_repairs()
+    print("\n🎉 All self-repair tests passed!")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script checking that Streamlit reruns do no work proportional to the dataset
+"""
+
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+# The background example warm-up would scan the data while the reruns are measured
+os.environ.setdefault("EXAMPLE_WARMUP", "false")
+
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_chat_demo.py")
+
+def test_rerun_reuses_cached_dataset_work():
+    """After the first render, reruns hash, profile and scan nothing"""
+    print("🧪 Testing rerun caching...")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Transaction Value": rng.normal(size=200_000),
+        "Currency": rng.choice(["USD", "CAD"], 200_000),
+    })
+    at = AppTest.from_file(APP_FILE, default_timeout=120)
+    at.run()
+    at.session_state["df"] = df
+    at.session_state["df_name"] = "Synthetic"
+    at.session_state["show_query_help"] = True
+    at.run()  # first render computes and caches the profile
+    assert not at.exception
+
+    real_hash = pd.util.hash_pandas_object
+    with mock.patch("pandas.util.hash_pandas_object", side_effect=real_hash) as hashed, \
+            mock.patch.object(pd.DataFrame, "memory_usage", autospec=True, side_effect=pd.DataFrame.memory_usage) as scanned:
+        for _ in range(3):
+            at.run()
+    assert not at.exception
+    assert hashed.call_count == 0 and scanned.call_count == 0
+    assert at.metric[0].value == "200000"
+    print("✅ Rerun caching test passed!")
+
+if __name__ == "__main__":
+    test_rerun_reuses_cached_dataset_work()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the query result cache
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, Pipeline
+from data_chat.result_cache import ResultCache, canonical_sql
+
+class FakeResult:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+def test_canonical_sql():
+    """Spelling differences that do not change a statement share a key"""
+    print("🧪 Testing canonical SQL...")
+    key = canonical_sql("SELECT COUNT(*) FROM df")
+    assert canonical_sql("select   count(*)\nfrom df;") == key
+    assert canonical_sql("SELECT COUNT(*) FROM [df] -- row count") == key
+    assert canonical_sql('SELECT "Currency" FROM df') == canonical_sql("SELECT [Currency] FROM df") == canonical_sql("SELECT Currency FROM df")
+    assert canonical_sql("SELECT [Transaction Value] FROM df") == canonical_sql('SELECT "Transaction Value" FROM df')
+    # String literals are compared exactly
+    assert canonical_sql("SELECT * FROM df WHERE Currency = 'EUR'") != canonical_sql("SELECT * FROM df WHERE Currency = 'eur'")
+    assert canonical_sql("SELECT * FROM df LIMIT 5") != canonical_sql("SELECT * FROM df LIMIT 50")
+    print("✅ Canonical SQL test passed!")
+
+def test_lru_and_invalidation():
+    """Entries are evicted by bytes, least recently used first, and dropped for a new dataset"""
+    print("🧪 Testing result cache eviction and invalidation...")
+    cache = ResultCache(max_bytes=250)
+    first, second, third = FakeResult(100), FakeResult(100), FakeResult(100)
+    cache.put("SELECT 1", "data", first)
+    cache.put("SELECT 2", "data", second)
+    assert cache.get("select 1", "data") is first
+    cache.put("SELECT 3", "data", third)
+    # SELECT 2 was least recently used
+    assert cache.get("SELECT 2", "data") is None
+    assert cache.get("SELECT 1", "data") is first and cache.get("SELECT 3", "data") is third
+    assert cache.bytes == 200 and cache.evictions == 1
+
+    # Another spelling of a cached statement does not count its rows twice
+    cache.put("SELECT 3;", "data", third)
+    assert cache.bytes == 200
+
+    assert cache.get("SELECT 1", "other data") is None
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['invalidations'] == 1
+    assert stats['hits'] == 3 and stats['misses'] == 2 and stats['hit_rate'] == 60.0
+    print("✅ Result cache eviction and invalidation test passed!")
+
+def test_pipeline_reuses_results():
+    """Repeated SQL is answered without running the query again"""
+    print("🧪 Testing result reuse in the pipeline...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    pipeline = Pipeline(df, LLMGateway(FakeProvider()), prompt_template=DEFAULT_PROMPT_TEMPLATE)
+    calls = []
+    execute_page = pipeline.engine.execute_page
+    pipeline.engine.execute_page = lambda *args: calls.append(args) or execute_page(*args)
+
+    first = pipeline.execute("SELECT COUNT(*) FROM df")
+    again = pipeline.execute("select count(*) from df;")
+    assert again is first and len(calls) == 1
+    # The rewritten statement is cached too
+    limited = pipeline.execute("SELECT * FROM df")
+    assert pipeline.execute(limited.sql_query) is limited and len(calls) == 2
+    assert pipeline.results.stats()['hits'] == 2
+    pipeline.close()
+    pipeline.gateway.close()
+    print("✅ Pipeline result reuse test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting result cache tests...\n")
+    test_canonical_sql()
+    test_lru_and_invalidation()
+    test_pipeline_reuses_results()
+    print("\n🎉 All result cache tests passed!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the approximate (sketch-based) profiling mode
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.profile import get_profile
+from data_chat.prompt_builder import build_schema_prompt
+from data_chat.quality import ApproximateQualityMetrics, QualityMetrics
+from data_chat.sketches import DuplicateEstimator, HyperLogLog, QuantileSketch, hash_values, iter_chunks
+
+def make_frame(rows=300_000, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Transaction Value": rng.normal(1000, 250, rows).round(2),
+        "Ref. Doc. Line Item": rng.integers(0, 120_000, rows),
+        "Currency": rng.choice(["USD", "CAD"], rows),
+    })
+
+def test_hyperloglog_within_error():
+    """Distinct counts stay within a few standard errors of nunique()"""
+    print("🧪 Testing HyperLogLog distinct counts...")
+    series = make_frame()["Ref. Doc. Line Item"]
+    sketch = HyperLogLog()
+    for chunk in iter_chunks(series, 50_000):
+        sketch.add(chunk)
+    exact = series.nunique()
+    assert abs(sketch.estimate() - exact) <= 4 * sketch.relative_error * exact
+    assert sketch.registers.nbytes == 2 ** 14  # fixed size, independent of rows
+    print(f"✅ HyperLogLog test passed! {sketch.estimate()} vs {exact}")
+
+def test_duplicate_estimate_across_chunks():
+    """Bloom-filter duplicate estimate matches duplicated() within its error bound"""
+    df = make_frame(100_000)[["Ref. Doc. Line Item", "Currency"]]
+    estimator = DuplicateEstimator(len(df))
+    for chunk in iter_chunks(df, 10_000):
+        estimator.add_hashes(hash_values(chunk))
+    exact = int(df.duplicated().sum())
+    assert abs(estimator.estimate() - exact) <= estimator.error_bound + 0.001 * len(df)
+
+def test_quantile_sketch_bounded():
+    """The sample never grows past its size and quantiles respect the rank error"""
+    values = np.random.default_rng(3).normal(size=200_000)
+    sketch = QuantileSketch(size=5_000)
+    for i in range(0, len(values), 20_000):
+        sketch.add(values[i:i + 20_000])
+    assert len(sketch.sample) == 5_000 and sketch.count == len(values)
+    median_rank = (values < sketch.quantile(0.5)).mean()
+    assert abs(median_rank - 0.5) <= sketch.rank_error()
+
+def test_approximate_quality_metrics():
+    """Sketched quality metrics land within their reported error bounds"""
+    print("🧪 Testing approximate quality metrics...")
+    df = make_frame()
+    df = pd.concat([df, df.head(500)], ignore_index=True)
+    approx = ApproximateQualityMetrics(df)
+    exact = QualityMetrics(df)
+
+    assert approx.total_missing == exact.total_missing
+    assert abs(approx.duplicates - exact.duplicates) <= approx.error_bounds['duplicates'] + 5
+    for col, count in exact.outliers.items():
+        assert abs(approx.outliers[col] - count) <= approx.error_bounds['outliers'][col] * 2 + 5, col
+        assert np.isclose(approx.column_stats[col]['std'], exact.column_stats[col]['std'])
+
+    profile = get_profile(df, approximate=True)
+    assert profile.approximate and "~" in build_schema_prompt(profile).text
+    assert profile is not get_profile(df)
+    print(f"✅ Approximate quality test passed! Score: {approx.score} (exact {exact.score})")
+
+if __name__ == "__main__":
+    test_hyperloglog_within_error()
+    test_duplicate_estimate_across_chunks()
+    test_quantile_sketch_bounded()
+    test_approximate_quality_metrics()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed SQL generation, using the offline fake provider
+"""
+
+import os
+import sys
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.sql_generation import SQLStreamAssembler, clean_sql_response, stream_sql
+
+class CountingProvider(FakeProvider):
+    """Streams fixed pieces and records how many were consumed"""
+
+    def __init__(self, pieces):
+        super().__init__()
+        self.pieces = pieces
+        self.consumed = 0
+        self.closed = False
+
+    async def stream(self, model, messages, temperature, max_tokens):
+        try:
+            for piece in self.pieces:
+                self.consumed += 1
+                yield piece
+        finally:
+            self.closed = True
+
+def test_assembler_strips_fences():
+    """Fences are hidden while streaming and the closing fence completes the SQL"""
+    print("🧪 Testing incremental fence stripping...")
+    assembler = SQLStreamAssembler()
+    assert assembler.feed("``") == ""
+    assert assembler.feed("`sql\nSELECT COUNT(*)") == "SELECT COUNT(*)"
+    assert assembler.feed(" FROM df\n`") == "SELECT COUNT(*) FROM df"
+    assert not assembler.complete
+    assert assembler.feed("``\nExplanation") == "SELECT COUNT(*) FROM df"
+    assert assembler.complete
+    print("✅ Fence stripping test passed!")
+
+def test_assembler_statement_end():
+    """A ';' inside quotes, brackets or comments does not end the statement"""
+    assembler = SQLStreamAssembler()
+    assembler.feed("SELECT * FROM df WHERE [a;b] = 'x;y'")
+    assert not assembler.complete
+    assembler.feed("; SELECT 2")
+    assert assembler.complete
+    assert assembler.sql == "SELECT * FROM df WHERE [a;b] = 'x;y';"
+
+    assembler = SQLStreamAssembler()
+    assembler.feed("SELECT a -- first; then b\nFROM df /* x; */")
+    assert not assembler.complete
+    assembler.feed(" -- the user's column\nWHERE a > 1;")
+    assert assembler.complete
+    assert assembler.sql == "SELECT a -- first; then b\nFROM df /* x; */ -- the user's column\nWHERE a > 1;"
+
+def test_stream_stops_early():
+    """Generation stops reading once a complete statement has arrived"""
+    print("🧪 Testing early stop on complete statement...")
+    provider = CountingProvider(["```sql\n", "SELECT COUNT(*) ", "FROM df", "\n```", "\nThis counts rows.", " More text."])
+    gateway = LLMGateway(provider)
+    updates = []
+    sql = stream_sql(gateway, "prompt", "schema", on_update=updates.append)
+    gateway.close()
+
+    assert sql == "SELECT COUNT(*) FROM df"
+    assert sql == clean_sql_response("```sql\nSELECT COUNT(*) FROM df\n```")
+    assert provider.consumed == 4
+    assert provider.closed
+    assert updates[-1] == sql
+    print("✅ Early stop test passed!")
+
+if __name__ == "__main__":
+    test_assembler_strips_fences()
+    test_assembler_statement_end()
+    test_stream_stops_early()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for validating and repairing generated SQL before execution
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.query_engine import create_query_engine
+from data_chat.sql_validation import SQLValidationError, get_schema_checker, validate_sql
+
+def load():
+    return pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+
+def rejected(sql_query, columns, checker=None):
+    try:
+        validate_sql(sql_query, columns, checker)
+    except SQLValidationError as e:
+        return str(e)
+    raise AssertionError(f"Expected {sql_query!r} to be rejected")
+
+def test_rejects_non_select():
+    """Writes, multiple statements and empty SQL never reach the engine"""
+    print("🧪 Testing statement checks...")
+    columns = ["Currency"]
+    assert "not DELETE" in rejected("DELETE FROM df", columns)
+    assert "not DROP" in rejected("drop table df;", columns)
+    assert "single SQL statement" in rejected("SELECT 1; DROP TABLE df", columns)
+    assert "not DELETE" in rejected("WITH x AS (SELECT * FROM df) DELETE FROM df", columns)
+    assert "empty" in rejected("  ", columns)
+    # Keywords inside literals and comments do not count
+    assert validate_sql("SELECT 'DROP TABLE df; x' AS s FROM df; -- DELETE", columns).sql == \
+        "SELECT 'DROP TABLE df; x' AS s FROM df"
+    print("✅ Statement check test passed!")
+
+def test_quotes_columns():
+    """Bare and single-quoted multi-word column names become bracket identifiers"""
+    print("🧪 Testing column quoting...")
+    columns = ["Bus. Transac. Type", "Transaction Value", "Currency"]
+    validated = validate_sql("SELECT bus. transac. type, SUM('Transaction Value') FROM df "
+                             "WHERE Currency = 'Transaction Value' GROUP BY Bus. Transac. Type", columns)
+    assert validated.sql == ("SELECT [Bus. Transac. Type], SUM([Transaction Value]) FROM df "
+                             "WHERE Currency = 'Transaction Value' GROUP BY [Bus. Transac. Type]")
+    assert validated.notes == ["Quoted column names: [Bus. Transac. Type], [Transaction Value]"]
+    # Literals in value positions stay literals, even when they match a column name
+    for sql_query in ("SELECT Currency FROM df WHERE Currency IN ('Transaction Value')",
+                      "SELECT COALESCE(Currency, 'Transaction Value') FROM df",
+                      "SELECT CASE WHEN Currency = 'USD' THEN 'Transaction Value' END FROM df"):
+        assert validate_sql(sql_query, columns).sql == sql_query
+    validated = validate_sql("SELECT 'Currency' FROM df WHERE 'Transaction Value' > 0 "
+                             "ORDER BY MAX('Transaction Value'), 'Bus. Transac. Type'", columns)
+    assert validated.sql == ("SELECT 'Currency' FROM df WHERE [Transaction Value] > 0 "
+                             "ORDER BY MAX([Transaction Value]), [Bus. Transac. Type]")
+    # Already quoted names are left alone
+    sql_query = 'SELECT [Transaction Value], "Bus. Transac. Type" FROM df'
+    assert validate_sql(sql_query, columns).sql == sql_query
+    print("✅ Column quoting test passed!")
+
+def test_limits_select_star():
+    """Only an unbounded top-level SELECT * gets a LIMIT"""
+    print("🧪 Testing SELECT * limit...")
+    columns = ["Currency"]
+    assert validate_sql("SELECT * FROM df; -- everything", columns, select_star_limit=500).sql == \
+        "SELECT * FROM df\nLIMIT 500"
+    for sql_query in ("SELECT * FROM df LIMIT 5", "SELECT Currency FROM df",
+                      "SELECT COUNT(*) FROM (SELECT * FROM df)"):
+        assert validate_sql(sql_query, columns, select_star_limit=500).sql == sql_query
+    print("✅ SELECT * limit test passed!")
+
+def test_plans_against_schema():
+    """Unknown columns and syntax errors are caught without running the query"""
+    print("🧪 Testing planning against the schema...")
+    df = load()
+    for engine_name in ("sqlite", "duckdb"):
+        if engine_name == "duckdb":
+            try:
+                import duckdb  # noqa: F401
+            except ImportError:
+                print("⚠️  duckdb not installed, skipping")
+                continue
+        checker = get_schema_checker(df, engine_name)
+        assert get_schema_checker(df, engine_name) is checker
+        message = rejected("SELECT [Transacton Value] FROM df", df.columns, checker)
+        assert "did you mean [Transaction Value]" in message, message
+        assert "syntax" in rejected("SELECT Currency FRM df WHERE", df.columns, checker).lower()
+
+        validated = validate_sql("SELECT Currency, COUNT(*) AS n FROM df WHERE Transaction Value > 0 GROUP BY Currency",
+                                 df.columns, checker)
+        engine = create_query_engine(df, engine_name)
+        assert engine.execute(validated.sql)["n"].sum() == (df["Transaction Value"] > 0).sum()
+        engine.close()
+    print("✅ Schema planning test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting SQL validation tests...\n")
+    test_rejects_non_select()
+    test_quotes_columns()
+    test_limits_select_star()
+    test_plans_against_schema()
+    print("\n🎉 All SQL validation tests passed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the background warm-up of the example questions
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+# Make the data_chat package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_chat.llm_gateway import FakeProvider, LLMGateway
+from data_chat.pipeline import DEFAULT_PROMPT_TEMPLATE, Pipeline
+from data_chat.warmup import EXAMPLE_QUESTIONS, ExampleWarmup
+
+def answer(messages):
+    question = messages[1]["content"].rsplit("User Question:", 1)[-1].lower()
+    if "broken" in question:
+        return "SELECT no_such_column FROM df"
+    if "top 5" in question:
+        return "SELECT * FROM df ORDER BY [Transaction Value] DESC LIMIT 5"
+    return "SELECT COUNT(*) FROM df"
+
+def test_example_warmup():
+    """Example questions are answered in the background and failures are reported"""
+    print("🧪 Testing example warm-up...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    pipeline = Pipeline(df, LLMGateway(FakeProvider(answer)), prompt_template=DEFAULT_PROMPT_TEMPLATE,
+                        repair_attempts=0)
+    questions = ["How many rows were booked?", "Show me the top 5 transactions by value", "A broken question",
+                 "How many null values are in each column?"]
+    warmup = ExampleWarmup(pipeline, questions).start()
+    assert warmup.wait(timeout=60)
+
+    stats = warmup.stats()
+    assert stats['ready'] == 3 and not stats['running'] and stats['seconds'] is not None
+    assert [failure['question'] for failure in stats['failed']] == ["A broken question"]
+    assert warmup.answer("Show me the top 5 transactions by value")["result"].total_rows == 5
+    assert warmup.answer("A broken question") is None and warmup.matches(df)
+    # Catalog questions are answered without the model
+    assert warmup.answer("How many null values are in each column?")["intent"] == "nulls_per_column"
+    assert pipeline.gateway.provider.calls == 3
+
+    # The warm results also answer the same SQL asked another way
+    assert pipeline.execute("select count(*) from df") is warmup.answer("How many rows were booked?")["result"]
+
+    warmup.cancel()
+    assert warmup.answer("How many rows were booked?") is None
+    pipeline.close()
+    pipeline.gateway.close()
+    print("✅ Example warm-up test passed!")
+
+def test_shared_engine():
+    """A pipeline given an engine leaves closing it to its owner"""
+    print("🧪 Testing warm-up pipelines on a shared engine...")
+    df = pd.read_csv("data/Data Dump - Accrual Accounts.csv")
+    owner = Pipeline(df, LLMGateway(FakeProvider()), prompt_template=DEFAULT_PROMPT_TEMPLATE)
+    shared = Pipeline(df, owner.gateway, prompt_template=DEFAULT_PROMPT_TEMPLATE, engine=owner.engine,
+                      result_cache=owner.results)
+    warmup = ExampleWarmup(shared, EXAMPLE_QUESTIONS[:3]).start()
+    assert warmup.wait(timeout=60) and warmup.stats()['ready'] == 3
+    shared.close()
+    assert owner.execute("SELECT COUNT(*) FROM df").total_rows == 1
+    owner.close()
+    owner.gateway.close()
+    print("✅ Shared engine test passed!")
+
+if __name__ == "__main__":
+    print("🚀 Starting example warm-up tests...\n")
+    test_example_warmup()
+    test_shared_engine()
+    print("\n🎉 All example warm-up tests passed!")